@@ -1,6 +1,7 @@
 """
 Base settings to build other settings files upon.
 """
+
 from pathlib import Path
 from google.oauth2 import service_account
 import environ
@@ -134,6 +135,7 @@
     "thetatauCMT.objectives.apps.ObjectivesConfig",
     "thetatauCMT.trainings.apps.TrainingsConfig",
     "thetatauCMT.configs.apps.ConfigsConfig",
+    "thetatauCMT.taskapp.celery.CeleryConfig",
     # Added after any apps which contain models for which to create signals
     "email_signals",
 ]
@@ -305,6 +307,20 @@
 )
 EMAIL_FILE_PATH = str(ROOT_DIR / "email_tests")
 EMAIL_TIMEOUT = 5
+
+# CELERY
+# ------------------------------------------------------------------------------
+# https://docs.celeryq.dev/en/stable/userguide/configuration.html
+CELERY_BROKER_URL = env("CELERY_BROKER_URL", default="redis://127.0.0.1:6379/1")
+CELERY_RESULT_BACKEND = None
+CELERY_TASK_ALWAYS_EAGER = env.bool("CELERY_TASK_ALWAYS_EAGER", False)
+CELERY_BEAT_SCHEDULE = {
+    # Sends anything queued while the worker or broker was unavailable
+    "send-notification-outbox": {
+        "task": "send_notification_outbox",
+        "schedule": 60.0,
+    },
+}
 # ADMIN
 # ------------------------------------------------------------------------------
 # Django Admin URL.
@@ -494,6 +510,10 @@
 ED_ID = env("ED_ID", default=None)
 ED_SECRET = env("ED_SECRET", default=None)
 
+# watson or postgres, see users.search
+# postgres needs the index built with: python manage.py build_member_search
+MEMBER_SEARCH_BACKEND = env("MEMBER_SEARCH_BACKEND", default="watson")
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 EMAIL_SIGNAL_DEFAULT_SENDER = DEFAULT_FROM_EMAIL
 
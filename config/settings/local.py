@@ -56,6 +56,9 @@
     }
     INSTALLED_APPS += ["anymail"]
 
+# Send notifications without a celery worker
+CELERY_TASK_ALWAYS_EAGER = env.bool("CELERY_TASK_ALWAYS_EAGER", True)
+
 # TEMPLATES
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#templates
@@ -32,6 +32,14 @@
     }
 }
 
+# CELERY
+# ------------------------------------------------------------------------------
+# The celeryworker and celerybeat services share the cache redis
+CELERY_BROKER_URL = env(
+    "CELERY_BROKER_URL",
+    default=f'{env("REDIS_URL", default="redis://127.0.0.1:6379")}/1',
+)
+
 # SECURITY
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#secure-proxy-ssl-header
@@ -64,5 +64,9 @@
 # https://docs.djangoproject.com/en/dev/ref/settings/#email-port
 EMAIL_PORT = 1025
 
+# CELERY
+# ------------------------------------------------------------------------------
+CELERY_TASK_ALWAYS_EAGER = True
+
 # Your stuff...
 # ------------------------------------------------------------------------------
@@ -1,7 +1,7 @@
 import math
-from haversine import haversine
 from django.conf import settings
-from django.db.models import Q
+from django.db.models import F, Q, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
 from dal import autocomplete
 from address.models import (
     InconsistentDictError,
@@ -15,6 +15,13 @@
 from chapters.models import Chapter
 from forms.models import DisciplinaryProcess
 
+EARTH_RADIUS_MILES = 3958.8
+# Half the circumference, every point is within this distance
+MAX_DISTANCE_MILES = math.pi * EARTH_RADIUS_MILES
+MILES_PER_DEGREE = 69.172
+# Keeps the longitude span finite near the poles
+MIN_LNG_SCALE = 0.01
+
 
 def xstr(s):
     return s or ""
@@ -214,49 +221,72 @@ def fix_address(address):
     return address
 
 
+def great_circle_miles(latitude, longitude):
+    """
+    Haversine distance in miles from the point to the Address coordinates,
+    calculated by the database
+    """
+    half_lat = Radians(F("latitude") - latitude) / 2
+    half_lng = Radians(F("longitude") - longitude) / 2
+    hav = Power(Sin(half_lat), 2) + math.cos(math.radians(latitude)) * Cos(
+        Radians(F("latitude"))
+    ) * Power(Sin(half_lng), 2)
+    # Rounding can put near antipodal points just above the domain of asin
+    return 2 * EARTH_RADIUS_MILES * ASin(Least(Sqrt(hav), Value(1.0)))
+
+
+def addresses_in_radius(point, distance):
+    """
+    Addresses within distance miles of the (latitude, longitude) point
+    The bounding box uses the latitude/longitude index on Address, the
+    great circle distance then removes the corners
+    :return: Address queryset annotated with distance
+    """
+    latitude, longitude = point
+    distance = float(distance)
+    if not distance <= MAX_DISTANCE_MILES:
+        # Also nan and inf
+        distance = MAX_DISTANCE_MILES
+    lat_delta = distance / MILES_PER_DEGREE
+    # A degree of longitude shrinks with the cos of the latitude in radians
+    lng_scale = max(math.cos(math.radians(latitude)), MIN_LNG_SCALE)
+    lng_delta = distance / (MILES_PER_DEGREE * lng_scale)
+    return (
+        Address.objects.filter(
+            latitude__range=(latitude - lat_delta, latitude + lat_delta),
+            longitude__range=(longitude - lng_delta, longitude + lng_delta),
+        )
+        .annotate(distance=great_circle_miles(latitude, longitude))
+        .filter(distance__lte=distance)
+    )
+
+
 def isinradius(zip, distance):
     """Takes a zip, and a distance in miles.
-    Returns a list of zipcodes near the zip."""
-    zips_in_radius = list()
+    Returns a queryset of the addresses near the zip."""
     if not distance:
         distance = 1
-    try:
-        locality = Locality.objects.filter(postal_code=zip).first()
-        if locality:
-            address = locality.addresses.exclude(longitude=0).first()
-        else:
-            raise Locality.DoesNotExist
-    except Locality.DoesNotExist:
-        return []
-
-    point = (address.latitude, address.longitude)
-
-    dist_btwn_lat_deg = 69.172
-    dist_btwn_lng_deg = math.cos(point[0]) * 69.172
-    lat_degr_rad = float(distance) / dist_btwn_lat_deg
-    lng_degr_rad = float(distance) / dist_btwn_lng_deg
-
-    latmin = point[0] - lat_degr_rad
-    latmax = point[0] + lat_degr_rad
-    lngmin = point[1] - lng_degr_rad
-    lngmax = point[1] + lng_degr_rad
-
-    if latmin > latmax:
-        latmin, latmax = latmax, latmin
-    if lngmin > lngmax:
-        lngmin, lngmax = lngmax, lngmin
-
-    zips = Address.objects.filter(
-        Q(longitude__gt=lngmin)
-        & Q(longitude__lt=lngmax)
-        & Q(latitude__gt=latmin)
-        & Q(latitude__lt=latmax)
-    ).prefetch_related("user_set")
-
-    for z in zips:
-        if haversine(point, (z.latitude, z.longitude)) <= float(distance):
-            zips_in_radius.append(z)
-    return zips_in_radius
+    address = (
+        Address.objects.filter(locality__postal_code=zip)
+        .exclude(longitude=0)
+        .exclude(latitude__isnull=True)
+        .exclude(longitude__isnull=True)
+        .order_by("locality", "pk")
+        .first()
+    )
+    if address is None:
+        return Address.objects.none()
+    return addresses_in_radius((address.latitude, address.longitude), distance)
+
+
+def users_in_radius(zip, distance, queryset=None):
+    """
+    Members with an address near the zip, can be combined with other filters
+    eg. the watson search of the members
+    """
+    if queryset is None:
+        queryset = User.objects.all()
+    return queryset.filter(address__in=isinradius(zip, distance).values("pk"))
 
 
 class ZipCodeAutocomplete(autocomplete.Select2QuerySetView):
@@ -0,0 +1,103 @@
+"""
+Streaming CSV/XLSX exports of the list view tables, rows are written as the
+queryset is read with a server side cursor so memory does not grow with the
+number of members exported
+"""
+import csv
+import datetime
+import tempfile
+from itertools import islice
+from django.db import models
+from django.db.models import QuerySet, prefetch_related_objects
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from openpyxl import Workbook
+
+CHUNK_SIZE = 2000
+FORMATS = {
+    "download csv": "csv",
+    "download xlsx": "xlsx",
+}
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+class Echo:
+    """
+    File like object for csv.writer, writerow returns the line instead
+    """
+
+    def write(self, value):
+        return value
+
+
+def export_format(request):
+    """
+    csv or xlsx if one of the download buttons was used, otherwise None
+    """
+    return FORMATS.get(request.GET.get("csv", "False").lower())
+
+
+def iterate_queryset(queryset, chunk_size=CHUNK_SIZE):
+    """
+    queryset.iterator() that still does the prefetch_related lookups,
+    one prefetch per chunk instead of being ignored
+    """
+    lookups = queryset._prefetch_related_lookups
+    records = queryset.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            return
+        if lookups:
+            prefetch_related_objects(chunk, *lookups)
+        yield from chunk
+
+
+def table_values(table, chunk_size=CHUNK_SIZE):
+    """
+    table.as_values() with the columns and render methods of the table,
+    but a queryset is not loaded at once
+    """
+    if isinstance(table.data.data, QuerySet):
+        table.data.data = iterate_queryset(table.data.data, chunk_size)
+    return table.as_values()
+
+
+def xlsx_value(value):
+    if isinstance(value, models.Model):
+        value = str(value)
+    elif isinstance(value, datetime.datetime) and timezone.is_aware(value):
+        # Excel does not support timezones
+        value = timezone.make_naive(value)
+    return value
+
+
+def export_response(rows, name, export="csv"):
+    """
+    :param rows: iterable of rows, the first row is the header, eg. table_values
+    :param name: start of the filename, the time and extension are added
+    :param export: csv or xlsx, see export_format
+    """
+    time_name = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"{name}_{time_name}.{export}"
+    if export == "xlsx":
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        for row in rows:
+            sheet.append([xlsx_value(value) for value in row])
+        # write only workbooks keep the rows in a temporary file, not memory
+        file = tempfile.TemporaryFile()
+        workbook.save(file)
+        file.seek(0)
+        return FileResponse(
+            file,
+            as_attachment=True,
+            filename=filename,
+            content_type=XLSX_CONTENT_TYPE,
+        )
+    writer = csv.writer(Echo())
+    response = StreamingHttpResponse(
+        (writer.writerow(row) for row in rows), content_type="text/csv"
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
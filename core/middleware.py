@@ -23,15 +23,21 @@ class RMPSignMiddleware(MiddlewareMixin):
     """Django Middleware (add to MIDDLEWARE) to enforce members to sign rmp"""
 
     def __call__(self, request):
-        response = self.get_response(request)
+        # Checked before the view so a redirect does not render the page first
+        response = self.check_signed(request)
+        if response is None:
+            response = self.get_response(request)
+        return response
+
+    def check_signed(self, request):
         # only relevant for logged in users
         if not request.user.is_authenticated:
-            return response
+            return None
         path = request.path
         # pages to not redirect on (no recursion please!)
         if path in settings.TERMS_EXCLUDE_URL_LIST:
-            return response
-        if not RiskManagement.user_signed_this_semester(request.user):
+            return None
+        if not RiskManagement.user_signed_this_semester_cached(request.user):
             messages.add_message(
                 request,
                 messages.ERROR,
@@ -43,7 +49,7 @@ def __call__(self, request):
             should_submit = (current_term() == "sp" and current_month() >= 2) or (
                 current_term() == "fa" and current_month() >= 9
             )
-            if should_submit and not PledgeProgram.signed_this_semester(
+            if should_submit and not PledgeProgram.signed_this_semester_cached(
                 request.user.current_chapter
             ):
                 host = settings.CURRENT_URL
@@ -57,7 +63,7 @@ def __call__(self, request):
                         f"Please go to Forms --> New Member Education Program or click this <a href={link}>link</a>."
                     ),
                 )
-        return response
+        return None
 
 
 class OfficerMiddleware(MiddlewareMixin):
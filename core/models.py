@@ -7,6 +7,7 @@
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
+from django.db.models.functions import Concat
 from django.utils import timezone
 
 TODAY = datetime.datetime.now().date()
@@ -438,3 +439,19 @@ def annotate_role_status(queryset, date=TODAY_END):
         )
     )
     return qs
+
+
+def annotate_advisor_role(queryset):
+    """
+    role is the alumni advisor role or Faculty Advisor for advisor status
+    """
+    return queryset.annotate(
+        role=models.Case(
+            models.When(
+                models.Q(current_roles__overlap=list(ADVISOR_ROLES)),
+                Concat(models.Value("Alumni "), "current_roles"),
+            ),
+            default=models.Value("Faculty Advisor"),
+            output_field=models.CharField(),
+        )
+    )
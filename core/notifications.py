@@ -1,7 +1,52 @@
+import json
 from herald import registry
-from herald.base import EmailNotification
+from herald import base
+from herald.models import SentNotification
 from django.conf import settings
 from django.core.files.base import ContentFile
+from django.utils import timezone
+from .outbox import queue_notifications
+
+
+class EmailNotification(base.EmailNotification):
+    """
+    Herald email notification sent through the outbox, see core.outbox
+    send() only queues the email, send_now() waits for the mail provider
+    """
+
+    def get_sent_notification(self, user=None):
+        """
+        The pending SentNotification, rendered the same as herald send
+        """
+        context = self.get_context_data()
+        text_content = None
+        if "text" in self.render_types:
+            text_content = self.render("text", context)
+        html_content = None
+        if "html" in self.render_types:
+            html_content = self.render("html", context)
+        extra_data = self.get_extra_data()
+        return SentNotification(
+            # Sorted so the same recipients are always the same for dedupe
+            recipients=",".join(sorted(self.get_recipients())),
+            text_content=text_content,
+            html_content=html_content,
+            sent_from=self.get_sent_from(),
+            subject=self.get_subject(),
+            extra_data=json.dumps(extra_data) if extra_data else None,
+            notification_class=self.get_class_path(),
+            attachments=self._get_encoded_attachments(),
+            user=user,
+            status=SentNotification.STATUS_PENDING,
+            date_sent=timezone.now(),
+        )
+
+    def send(self, raise_exception=False, user=None):
+        queue_notifications([self], user=user)
+        return True
+
+    def send_now(self, raise_exception=False, user=None):
+        return super().send(raise_exception=raise_exception, user=user)
 
 
 @registry.register_decorator()
@@ -0,0 +1,170 @@
+"""
+Outbox for the herald email notifications
+
+send() renders the notification and saves it as a pending SentNotification in
+the request transaction. After the transaction commits the outbox celery task
+sends the pending notifications in batches over one email connection, so the
+request never waits on the mail provider. Failed sends are retried with backoff.
+When the task can not be queued they are sent in the request, and
+python manage.py send_outbox sends anything left pending.
+"""
+import datetime
+import json
+import logging
+from email.mime.base import MIMEBase
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from herald.models import SentNotification
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 5
+# Minutes to wait after the first failed attempt, doubles every attempt
+RETRY_MINUTES = 5
+# The same notification queued again within this window is only sent once
+DEDUPE_MINUTES = 10
+logger = logging.getLogger(__name__)
+
+
+def dedupe_key(sent_notification):
+    return (
+        sent_notification.notification_class,
+        sent_notification.recipients,
+        sent_notification.subject,
+        sent_notification.text_content,
+        sent_notification.html_content,
+    )
+
+
+def queue_notifications(notifications, user=None):
+    """
+    Save the notifications as pending, they are sent after the transaction commits
+    Notifications matching one pending or sent in the last DEDUPE_MINUTES are skipped
+    :param notifications: iterable of core.notifications.EmailNotification
+    :return: list of the queued SentNotifications
+    """
+    queued = {}
+    for notification in notifications:
+        sent_notification = notification.get_sent_notification(user=user)
+        queued.setdefault(dedupe_key(sent_notification), sent_notification)
+    if not queued:
+        return []
+    existing = SentNotification.objects.filter(
+        Q(status=SentNotification.STATUS_PENDING)
+        | Q(date_sent__gte=timezone.now() - datetime.timedelta(minutes=DEDUPE_MINUTES)),
+        notification_class__in={key[0] for key in queued},
+        recipients__in={key[1] for key in queued},
+    ).exclude(status=SentNotification.STATUS_FAILED)
+    for sent_notification in existing:
+        queued.pop(dedupe_key(sent_notification), None)
+    queued = SentNotification.objects.bulk_create(queued.values())
+    if queued:
+        transaction.on_commit(start_outbox)
+    return queued
+
+
+def start_outbox():
+    from users.tasks import send_notification_outbox
+
+    try:
+        send_notification_outbox.delay()
+    except Exception:
+        # Without a broker (eg. pythonanywhere) the request sends them itself
+        logger.exception("Could not start notification outbox, sending now")
+        send_outbox()
+
+
+def send_outbox(batch_size=BATCH_SIZE):
+    """
+    Send the pending notifications that are due
+    Each batch is locked so workers running at the same time skip each others rows
+    :return: number of notifications sent
+    """
+    sent = 0
+    with get_connection() as connection:
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    SentNotification.objects.select_for_update(skip_locked=True)
+                    .filter(
+                        status=SentNotification.STATUS_PENDING,
+                        date_sent__lte=timezone.now(),
+                    )
+                    .order_by("date_sent", "pk")[:batch_size]
+                )
+                if not batch:
+                    break
+                for sent_notification in batch:
+                    sent += send_notification(sent_notification, connection)
+    return sent
+
+
+def user_disabled(sent_notification):
+    user = sent_notification.user
+    if user is None or not hasattr(user, "usernotification"):
+        return False
+    return user.usernotification.disabled_notifications.filter(
+        notification_class=sent_notification.notification_class
+    ).exists()
+
+
+def send_notification(sent_notification, connection):
+    """
+    Send one pending notification, on failure it is retried after a backoff
+    until MAX_ATTEMPTS and then marked failed
+    :return: True if sent
+    """
+    extra_data = sent_notification.get_extra_data()
+    if user_disabled(sent_notification):
+        sent_notification.status = SentNotification.STATUS_USER_DISABLED
+        sent_notification.date_sent = timezone.now()
+        sent_notification.save()
+        return False
+    try:
+        email_message(sent_notification, extra_data, connection).send()
+    except Exception as e:
+        attempts = extra_data.get("attempts", 0) + 1
+        extra_data["attempts"] = attempts
+        sent_notification.extra_data = json.dumps(extra_data)
+        sent_notification.error_message = f"Attempt {attempts}: {e}"
+        if attempts >= MAX_ATTEMPTS:
+            sent_notification.status = SentNotification.STATUS_FAILED
+            sent_notification.date_sent = timezone.now()
+        else:
+            sent_notification.date_sent = timezone.now() + datetime.timedelta(
+                minutes=RETRY_MINUTES * 2 ** (attempts - 1)
+            )
+        sent_notification.save()
+        return False
+    sent_notification.status = SentNotification.STATUS_SUCCESS
+    sent_notification.date_sent = timezone.now()
+    sent_notification.save()
+    return True
+
+
+def email_message(sent_notification, extra_data, connection):
+    """
+    Same message as herald EmailNotification._send, but on the shared connection
+    """
+    message = EmailMultiAlternatives(
+        subject=sent_notification.subject,
+        body=sent_notification.text_content,
+        from_email=sent_notification.sent_from,
+        to=sent_notification.get_recipients(),
+        bcc=extra_data.get("bcc", None),
+        headers=extra_data.get("headers", None),
+        cc=extra_data.get("cc", None),
+        reply_to=extra_data.get("reply_to", None),
+        connection=connection,
+    )
+    if sent_notification.html_content:
+        message.attach_alternative(sent_notification.html_content, "text/html")
+    for attachment in sent_notification.get_attachments() or []:
+        if isinstance(attachment, MIMEBase):
+            if attachment.get("Content-ID", False):
+                message.mixed_subtype = "related"
+            message.attach(attachment)
+        else:
+            message.attach(*attachment)
+    return message
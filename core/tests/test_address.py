@@ -0,0 +1,62 @@
+import math
+import pytest
+from address.models import Address, Country, Locality, State
+from core.address import (
+    MILES_PER_DEGREE,
+    addresses_in_radius,
+    isinradius,
+    users_in_radius,
+)
+from users.models import User
+
+
+def make_address(locality, latitude, longitude, raw):
+    return Address.objects.create(
+        raw=raw, locality=locality, latitude=latitude, longitude=longitude
+    )
+
+
+@pytest.mark.django_db
+def test_isinradius(user_factory):
+    state = State.objects.create(
+        name="Alaska", code="AK", country=Country.objects.create(name="USA", code="US")
+    )
+    locality = Locality.objects.create(
+        name="Anchorage", postal_code="99501", state=state
+    )
+    other = Locality.objects.create(name="Other", postal_code="99999", state=state)
+    latitude, longitude = 61.2, -149.9
+    center = make_address(locality, latitude, longitude, "center")
+    # 10 miles north and east, the east offset is only right with cos in radians
+    north = make_address(other, latitude + 10 / MILES_PER_DEGREE, longitude, "north")
+    east_degrees = 10 / (MILES_PER_DEGREE * math.cos(math.radians(latitude)))
+    east = make_address(other, latitude, longitude + east_degrees, "east")
+    far = make_address(other, latitude + 30 / MILES_PER_DEGREE, longitude, "far")
+    addresses = isinradius("99501", 15)
+    assert set(addresses) == {center, north, east}
+    assert all(address.distance <= 15 for address in addresses)
+    assert set(isinradius("99501", 9)) == {center}
+    assert set(isinradius("00000", 15)) == set()
+    near_user = user_factory()
+    far_user = user_factory()
+    User.objects.filter(pk=near_user.pk).update(address=east)
+    User.objects.filter(pk=far_user.pk).update(address=far)
+    assert list(users_in_radius("99501", 15)) == [near_user]
+    assert not users_in_radius("99501", 15, User.objects.exclude(pk=near_user.pk))
+
+
+@pytest.mark.django_db
+def test_addresses_in_radius_antipodal():
+    state = State.objects.create(
+        name="Nowhere",
+        code="NW",
+        country=Country.objects.create(name="Null", code="NL"),
+    )
+    locality = Locality.objects.create(
+        name="Anywhere", postal_code="00001", state=state
+    )
+    near = make_address(locality, 0.0, 0.0, "near")
+    antipode = make_address(locality, 0.0, 179.5, "antipode")
+    for distance in [20000, "1e9", "inf", "nan"]:
+        addresses = addresses_in_radius((0.0, 0.0), distance)
+        assert set(addresses) == {near, antipode}
@@ -0,0 +1,27 @@
+import csv
+from io import StringIO
+import pytest
+from openpyxl import load_workbook
+from core.export import export_response, table_values
+from users.models import User
+from users.tables import UserTable
+
+
+@pytest.mark.django_db
+def test_table_values_stream(chapter, user_factory):
+    user_factory.create_batch(5, chapter=chapter, status="active")
+    members = User.objects.filter(chapter=chapter).order_by("pk")
+    expected = list(UserTable(data=members, chapter=True).as_values())
+    rows = list(table_values(UserTable(data=members, chapter=True), chunk_size=2))
+    assert rows == expected
+    response = export_response(iter(rows), "ThetaTauMemberExport")
+    assert response.streaming
+    assert response["Content-Disposition"].endswith('.csv"')
+    content = b"".join(response.streaming_content).decode()
+    exported = list(csv.reader(StringIO(content)))
+    assert len(exported) == 6
+    assert exported[0] == rows[0]
+    response = export_response(iter(rows), "ThetaTauMemberExport", "xlsx")
+    sheet = load_workbook(response.file_to_stream).active
+    assert sheet.max_row == 6
+    assert [cell.value for cell in sheet[1]] == rows[0]
@@ -0,0 +1,34 @@
+import datetime
+import pytest
+from django.urls import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from forms.models import RiskManagement
+from forms.tests.factories import RiskManagementFactory
+
+
+@pytest.mark.django_db
+def test_rmp_redirect_before_view(auto_login_user):
+    client, user = auto_login_user()
+    url = reverse("chapters:detail", kwargs={"slug": user.chapter.slug})
+    response = client.get(url)
+    assert response.status_code == 302
+    assert response.url == reverse("rmp")
+    # The view is never rendered for the redirect
+    assert not response.templates
+
+
+@pytest.mark.django_db
+def test_rmp_signed_cached(auto_login_user):
+    client, user = auto_login_user()
+    assert not RiskManagement.user_signed_this_semester_cached(user)
+    RiskManagementFactory(user=user, date=datetime.date.today())
+    with CaptureQueriesContext(connection) as queries:
+        assert RiskManagement.user_signed_this_semester_cached(user)
+    assert len(queries) == 1
+    with CaptureQueriesContext(connection) as queries:
+        assert RiskManagement.user_signed_this_semester_cached(user)
+    assert not queries
+    url = reverse("chapters:detail", kwargs={"slug": user.chapter.slug})
+    response = client.get(url)
+    assert response.status_code == 200
@@ -0,0 +1,69 @@
+import pytest
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from herald.models import SentNotification
+from core.notifications import GenericEmail
+from core.outbox import send_outbox, start_outbox
+
+
+class FailingBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError("Mail provider down")
+
+
+def generic_email(message="Test message"):
+    return GenericEmail(
+        emails={"b@example.com", "a@example.com"},
+        subject="Outbox test",
+        message=message,
+    )
+
+
+@pytest.mark.django_db
+def test_outbox_queue_dedupe_send():
+    assert generic_email().send()
+    # Sent only by the outbox, not in the request
+    assert not mail.outbox
+    assert generic_email().send()
+    generic_email(message="Other message").send()
+    pending = SentNotification.objects.filter(status=SentNotification.STATUS_PENDING)
+    assert pending.count() == 2
+    assert send_outbox() == 2
+    assert len(mail.outbox) == 2
+    assert mail.outbox[0].to == ["a@example.com", "b@example.com"]
+    assert not pending.exists()
+    # Already sent recently
+    generic_email().send()
+    assert send_outbox() == 0
+
+
+@pytest.mark.django_db
+def test_outbox_retry(settings):
+    settings.EMAIL_BACKEND = "core.tests.test_outbox.FailingBackend"
+    generic_email().send()
+    assert send_outbox() == 0
+    sent_notification = SentNotification.objects.get()
+    assert sent_notification.status == SentNotification.STATUS_PENDING
+    assert sent_notification.get_extra_data()["attempts"] == 1
+    assert "Mail provider down" in sent_notification.error_message
+    # Not retried until the backoff passes
+    settings.EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+    assert send_outbox() == 0
+    assert not mail.outbox
+
+
+@pytest.mark.django_db
+def test_outbox_without_broker(monkeypatch):
+    from users.tasks import send_notification_outbox
+
+    def delay(*args):
+        raise ConnectionError("broker unavailable")
+
+    monkeypatch.setattr(send_notification_outbox, "delay", delay)
+    generic_email().send()
+    assert not mail.outbox
+    start_outbox()
+    assert len(mail.outbox) == 1
+    assert not SentNotification.objects.filter(
+        status=SentNotification.STATUS_PENDING
+    ).exists()
@@ -3,13 +3,13 @@
 
 
 def check_officer(request):
-    if request.user.groups.filter(name__in=["officer", "natoff"]).exists():
+    if request.user.is_officer_group:
         request.is_officer = True
     return request
 
 
 def check_nat_officer(request):
-    if request.user.groups.filter(name="natoff").exists():
+    if request.user.is_national_officer_group:
         request.is_nat_officer = True
     return request
 
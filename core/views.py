@@ -36,16 +36,32 @@
 def group_required(*group_names):
     """Requires user membership in at least one of the groups passed in."""
 
+    groups = set()
+    for group_name in group_names:
+        if isinstance(group_name, (list, tuple)):
+            groups.update(group_name)
+        else:
+            groups.add(group_name)
+
     def in_groups(u):
         if u.is_authenticated:
-            if bool(u.groups.filter(name__in=group_names)) | u.is_superuser:
+            if bool(u.access["groups"] & groups) | u.is_superuser:
                 return True
         return False
 
     return user_passes_test(in_groups)
 
 
-class NatOfficerRequiredMixin(GroupRequiredMixin):
+class UserGroupRequiredMixin(GroupRequiredMixin):
+    """Checks the groups cached on the user instead of querying every time"""
+
+    def check_membership(self, groups):
+        if self.request.user.is_superuser:
+            return True
+        return set(groups).intersection(self.request.user.access["groups"])
+
+
+class NatOfficerRequiredMixin(UserGroupRequiredMixin):
     group_required = "natoff"
 
     def get_login_url(self):
@@ -81,7 +97,7 @@ def get_success_url(self):
 )
 
 
-class OfficerRequiredMixin(GroupRequiredMixin):
+class OfficerRequiredMixin(UserGroupRequiredMixin):
     group_required = ["officer", "natoff"]
     officer_edit = "this"
     officer_edit_type = "edit"
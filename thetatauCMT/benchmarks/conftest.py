@@ -0,0 +1,187 @@
+"""
+Synthetic organization for the hot path benchmarks
+
+The full size is about 150 chapters and 60k users with several years of status
+and role history. Baselines are recorded at full size, a smaller BENCHMARK_SCALE
+is quicker while working on a query and only checks the query budgets.
+"""
+import datetime
+import json
+import os
+import time
+import warnings
+from pathlib import Path
+import pytest
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from chapters.tests.factories import ChapterFactory
+from events.tests.factories import EventFactory
+from forms.tests.factories import RiskManagementFactory
+from regions.tests.factories import RegionFactory
+from submissions.tests.factories import SubmissionFactory
+from tasks.tests.factories import TaskChapterFactory
+from users.tests.factories import (
+    UserFactory,
+    UserRoleChangeFactory,
+    UserStatusChangeFactory,
+)
+
+BASELINES = Path(__file__).parent / "baselines.json"
+SCALE = float(os.environ.get("BENCHMARK_SCALE", 1))
+# Record the measured queries and time as the new baselines
+UPDATE = os.environ.get("BENCHMARK_UPDATE", "") == "1"
+# Queries allowed over the recorded count, at least QUERY_MARGIN or 10%
+QUERY_MARGIN = 2
+# Slower than this many times the baseline only warns, timing depends on the machine
+TIME_WARNING = 2
+
+REGIONS = 6
+CHAPTERS = 150
+USERS_PER_CHAPTER = 400
+EVENTS_PER_CHAPTER = 40
+SUBMISSIONS_PER_CHAPTER = 20
+TASKS_PER_CHAPTER = 30
+HISTORY_YEARS = 4
+
+
+def scaled(count):
+    return max(2, round(count * SCALE))
+
+
+def years_ago(years):
+    return datetime.date.today() - datetime.timedelta(days=365 * years)
+
+
+def build_chapter(chapter):
+    """
+    Members with past pnm/active statuses, past officers each year,
+    current officers, events, submissions and completed tasks
+    """
+    user_count = scaled(USERS_PER_CHAPTER)
+    alumni = UserFactory.create_batch(
+        user_count * 3 // 10, chapter=chapter, major__chapter=chapter, status="alumni"
+    )
+    pnms = UserFactory.create_batch(
+        user_count // 10, chapter=chapter, major__chapter=chapter, status="pnm"
+    )
+    actives = UserFactory.create_batch(
+        user_count - len(alumni) - len(pnms),
+        chapter=chapter,
+        major__chapter=chapter,
+        status="active",
+    )
+    for user in alumni + actives:
+        UserStatusChangeFactory(
+            user=user, status="pnm", start=years_ago(HISTORY_YEARS), end=years_ago(3.5)
+        )
+    for user in alumni:
+        UserStatusChangeFactory(
+            user=user, status="active", start=years_ago(3.5), end=years_ago(0.1)
+        )
+    for year in range(HISTORY_YEARS):
+        for user in actives[year * 5 : year * 5 + 5]:
+            UserRoleChangeFactory(user=user, officer="chapter", current=False)
+    for user in actives[-5:]:
+        UserRoleChangeFactory(user=user, officer="chapter", current=True)
+    EventFactory.create_batch(scaled(EVENTS_PER_CHAPTER), chapter=chapter)
+    SubmissionFactory.create_batch(
+        scaled(SUBMISSIONS_PER_CHAPTER),
+        chapter=chapter,
+        user=actives[0],
+        file="submissions/benchmark.pdf",
+    )
+    TaskChapterFactory.create_batch(scaled(TASKS_PER_CHAPTER), chapter=chapter)
+
+
+def build_org():
+    regions = [
+        RegionFactory(name=f"Benchmark Region {number}") for number in range(REGIONS)
+    ]
+    chapters = [
+        ChapterFactory(
+            name=f"Benchmark {number}",
+            greek=f"bm{number}",
+            region=regions[number % REGIONS],
+        )
+        for number in range(scaled(CHAPTERS))
+    ]
+    for chapter in chapters:
+        build_chapter(chapter)
+    chapter = chapters[0]
+    user = UserFactory(
+        chapter=chapter,
+        major__chapter=chapter,
+        status="active",
+        make_officer="national",
+    )
+    RiskManagementFactory(
+        user=user,
+        date=datetime.date.today(),
+        submission__chapter=chapter,
+        submission__user=user,
+    )
+    return {"regions": regions, "chapters": chapters, "user": user}
+
+
+@pytest.fixture(scope="session")
+def org(django_db_setup, django_db_blocker):
+    """
+    Built once for all of the benchmarks and rolled back at the end
+    """
+    with django_db_blocker.unblock():
+        with transaction.atomic():
+            cache.clear()
+            yield build_org()
+            transaction.set_rollback(True)
+    cache.clear()
+
+
+def query_budget_for(queries):
+    return queries + max(QUERY_MARGIN, queries // 10)
+
+
+def check_budget(name, queries, seconds):
+    baselines = json.loads(BASELINES.read_text())
+    if UPDATE:
+        assert SCALE == 1, "Baselines are recorded for the full size, BENCHMARK_SCALE=1"
+        baselines[name] = {
+            "queries": queries,
+            "budget": query_budget_for(queries),
+            "seconds": round(seconds, 3),
+        }
+        BASELINES.write_text(json.dumps(baselines, indent=4, sort_keys=True) + "\n")
+        return
+    baseline = baselines.get(name)
+    assert baseline is not None, (
+        f"{name} has no baseline in baselines.json. "
+        "Run the benchmarks with BENCHMARK_UPDATE=1 to record one."
+    )
+    assert queries <= baseline["budget"], (
+        f"{name} ran {queries} queries, {baseline['queries']} were recorded and "
+        f"the budget is {baseline['budget']}. "
+        "Set BENCHMARK_UPDATE=1 to record a new baseline if this is expected."
+    )
+    if SCALE == 1 and seconds > baseline["seconds"] * TIME_WARNING:
+        warnings.warn(
+            f"{name} took {seconds:.3f}s, the baseline is {baseline['seconds']}s"
+        )
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Time and count the queries of a call after one warm up call,
+    so the cached per user lookups are measured as in production
+    """
+
+    def run(name, function, *args, **kwargs):
+        function(*args, **kwargs)
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            result = function(*args, **kwargs)
+            seconds = time.perf_counter() - start
+        check_budget(name, len(queries), seconds)
+        return result
+
+    return run
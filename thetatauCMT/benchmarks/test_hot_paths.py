@@ -0,0 +1,80 @@
+"""
+Query budgets for the hot paths, run with
+    pytest thetatauCMT/benchmarks -m benchmark
+"""
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from chapters import dashboard
+from scores.models import ScoreType
+
+pytestmark = [pytest.mark.benchmark, pytest.mark.django_db]
+
+
+def get_view(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    return response
+
+
+@pytest.fixture
+def natoff_client(client, org):
+    client.force_login(org["user"])
+    return client
+
+
+@pytest.mark.parametrize(
+    "name, url_name, kwargs",
+    [
+        ("home", "home", None),
+        ("user_list", "users:list", None),
+        ("rmp_list", "forms:rmp_list", None),
+        ("education_list", "forms:education_list", None),
+        ("pledge_program_list", "forms:pledge_program_list", None),
+        ("bylaws_list", "forms:bylaws_list", None),
+        ("convention_list", "forms:convention_list", None),
+        ("osm_list", "forms:osm_list", None),
+    ],
+)
+def test_view(query_budget, natoff_client, name, url_name, kwargs):
+    query_budget(name, get_view, natoff_client, reverse(url_name, kwargs=kwargs))
+
+
+@pytest.mark.parametrize(
+    "name, url_name",
+    [
+        ("region_officers", "regions:officers"),
+        ("region_tasks", "regions:tasks"),
+    ],
+)
+def test_region_view(query_budget, natoff_client, org, name, url_name):
+    url = reverse(url_name, kwargs={"slug": org["regions"][0].slug})
+    query_budget(name, get_view, natoff_client, url)
+
+
+def test_chapter_detail(query_budget, natoff_client, org):
+    url = reverse("chapters:detail", kwargs={"slug": org["chapters"][0].slug})
+    query_budget("chapter_detail", get_view, natoff_client, url)
+
+
+def test_dashboard(query_budget, org):
+    query_budget(
+        "load_chapter_data", dashboard.load_chapter_data, None, user=org["user"]
+    )
+
+
+def test_annotate_chapter_score(query_budget, org):
+    query_budget(
+        "annotate_chapter_score",
+        ScoreType.annotate_chapter_score,
+        org["chapters"][0],
+    )
+
+
+def test_set_current_status_roles(query_budget, org):
+    query_budget(
+        "set_current_status_roles",
+        call_command,
+        "set_current_status_roles",
+        "-override",
+    )
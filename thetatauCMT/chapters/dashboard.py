@@ -2,7 +2,6 @@
 import datetime
 import textwrap
 import pandas as pd
-from django.db.models import Count, Avg
 import plotly.graph_objects as go
 import plotly.express as px
 import dash_core_components as dcc
@@ -10,12 +9,8 @@
 from dash.dependencies import Input, Output, State
 from dash.exceptions import PreventUpdate
 from django.conf import settings
-from core.models import semester_encompass_start_end_date
-from users.models import (
-    User,
-    UserStatusChange,
-    UserSemesterGPA,
-)
+from chapters.models import ChapterSemesterStats
+from users.models import User
 
 if __name__ == "__main__":
     import os
@@ -334,44 +329,10 @@ def load_chapter_data(clicks, **kwargs):
     chapter = user.current_chapter
     dfs = []
     year_terms_marks = {}
+    stats = ChapterSemesterStats.for_chapter(chapter, YEARS)
     for year in YEARS:
-        for term, date_info in {"Spring": "-03-01", "Fall": "-10-01"}.items():
-            date_filter = datetime.datetime.strptime(f"{year}{date_info}", "%Y-%m-%d")
-            start, end = semester_encompass_start_end_date(date_filter)
-            # In filters should be start of status < end of semester
-            #                      end of status > start of semester
-            status = dict(
-                UserStatusChange.objects.values_list("status")
-                .filter(
-                    user__chapter=chapter,
-                    start__lte=end,
-                    end__gte=start,
-                )
-                .annotate(count=Count("status"))
-            )
-            majors = dict(
-                User.objects.values_list("major__major")
-                .filter(
-                    chapter=chapter,
-                    status__start__lte=end,
-                    status__end__gte=start,
-                    status__status__in=[
-                        "active",
-                        "activepend",
-                        "alumnipend",
-                        "activeCC",
-                    ],
-                )
-                .order_by()
-                .annotate(count=Count("major"))
-            )
-            gpas = UserSemesterGPA.objects.filter(
-                user__chapter=chapter,
-                term=UserSemesterGPA.get_term(date_filter),
-                year=date_filter.year,
-            ).aggregate(Avg("gpa"), Count("gpa"))
-            status.update(gpas)
-            status.update({"majors": [majors]})
+        for term, term_abbr in {"Spring": "sp", "Fall": "fa"}.items():
+            status = stats[(year, term_abbr)].dashboard_data()
             status.update({"year": year, "term": term})
             df_year_term = pd.DataFrame(status, index=[f"{term} {year}"])
             dfs.append(df_year_term)
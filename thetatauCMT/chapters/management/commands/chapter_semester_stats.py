@@ -0,0 +1,48 @@
+"""
+Notes:
+    To test run command
+        docker-compose -f local.yml run --rm django python manage.py chapter_semester_stats
+"""
+import datetime
+from django.core.management import BaseCommand
+from chapters.models import Chapter, ChapterSemesterStats
+
+
+# python manage.py chapter_semester_stats
+class Command(BaseCommand):
+    # Show this when the user types help
+    help = "Rebuild the chapter dashboard semester stats rollup"
+
+    def add_arguments(self, parser):
+        parser.add_argument("years", nargs="*", type=int)
+        parser.add_argument("-chapter", nargs="+", type=str)
+
+    # A command must define handle()
+    def handle(self, *args, **options):
+        """
+        Status changes and GPAs keep the rollup current when they are saved.
+        This runs nightly to pick up anything that skips save,
+        eg. bulk updates, major changes or members changing chapter.
+            python manage.py chapter_semester_stats
+            python manage.py chapter_semester_stats 2022 2024 -chapter chi
+        """
+        years = options.get("years")
+        chapters_only = options.get("chapter", None)
+        this_year = datetime.date.today().year
+        if not years:
+            year_start, year_end = ChapterSemesterStats.START_YEAR, this_year
+        elif len(years) == 1:
+            year_start, year_end = years[0], this_year
+        else:
+            year_start, year_end = years[0], years[-1]
+        if chapters_only is not None:
+            chapters = Chapter.objects.filter(slug__in=chapters_only)
+        else:
+            chapters = Chapter.objects.all()
+        print(f"Rebuilding stats {year_start}-{year_end} for {chapters.count()}")
+        for year in range(year_start, year_end + 1):
+            for term in ["sp", "fa"]:
+                created, updated = ChapterSemesterStats.rebuild(
+                    year, term, chapters=chapters
+                )
+                print(f"    {term} {year}: created {created}, updated {updated}")
@@ -0,0 +1,221 @@
+"""
+Per chapter numbers of the monthly officer and regional director emails,
+each metric is one grouped query for all of the chapters and is computed
+once per ChapterMetrics instance
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.db import models
+from django.shortcuts import reverse
+from django.utils.functional import cached_property
+from core.models import (
+    TODAY_END,
+    CHAPTER_OFFICER,
+    annotate_role_status,
+    semester_encompass_start_end_date,
+)
+
+ACTIVE_STATUS = ["active", "activepend", "alumnipend", "pendexpul", "activeCC"]
+# Same order as Chapter.get_current_officers_council_specific
+OFFICER_ROLES = {
+    "regent": "Regent",
+    "scribe": "Scribe",
+    "vice regent": "Vice",
+    "treasurer": "Treasurer",
+    "corresponding secretary": "Corresponding Secretary",
+}
+
+
+class ChapterMetrics:
+    """
+    chapter.actives().count(), chapter.pledges().count(), events, officers and
+    incomplete task dates for many chapters without queries per chapter
+    """
+
+    def __init__(self, chapters):
+        self.chapters = {chapter.pk: chapter for chapter in chapters}
+
+    def counts(self, queryset, **annotations):
+        """
+        :return: {chapter_pk: {name: count}} of the annotations grouped by chapter
+        """
+        counts = {
+            chapter_pk: {name: 0 for name in annotations}
+            for chapter_pk in self.chapters
+        }
+        rows = (
+            queryset.filter(chapter_id__in=self.chapters)
+            .order_by()
+            .values("chapter_id")
+            .annotate(**annotations)
+        )
+        for row in rows:
+            chapter_pk = row.pop("chapter_id")
+            counts[chapter_pk] = row
+        return counts
+
+    @cached_property
+    def member_counts(self):
+        from users.models import User
+
+        counts = self.counts(
+            User.objects.filter(current_status__in=ACTIVE_STATUS),
+            count=models.Count("pk", distinct=True),
+        )
+        return {chapter_pk: row["count"] for chapter_pk, row in counts.items()}
+
+    @cached_property
+    def pledge_counts(self):
+        from users.models import User
+
+        counts = self.counts(
+            User.objects.filter(
+                status__status="pnm",
+                status__start__lte=TODAY_END,
+                status__end__gte=TODAY_END,
+            ),
+            count=models.Count("pk", distinct=True),
+        )
+        return {chapter_pk: row["count"] for chapter_pk, row in counts.items()}
+
+    @cached_property
+    def event_counts(self):
+        """
+        :return: {chapter_pk: {"last_month": count, "semester": count}}
+        """
+        from events.models import Event
+
+        semester_start, semester_end = semester_encompass_start_end_date()
+        return self.counts(
+            Event.objects.all(),
+            last_month=models.Count(
+                "pk",
+                filter=models.Q(
+                    date__lte=TODAY_END, date__gte=TODAY_END - timedelta(30)
+                ),
+            ),
+            semester=models.Count(
+                "pk",
+                filter=models.Q(date__lte=semester_end, date__gte=semester_start),
+            ),
+        )
+
+    @cached_property
+    def officers(self):
+        """
+        Chapter.get_current_officers_council_specific for every chapter
+        :return: {chapter_pk: ([regent, scribe, vice, treasurer, corsec], previous)}
+        """
+        from users.models import User
+
+        current = User.objects.filter(
+            chapter_id__in=self.chapters,
+            current_roles__overlap=list(CHAPTER_OFFICER),
+        ).order_by("last_name", "pk")
+        officers = {chapter_pk: [] for chapter_pk in self.chapters}
+        for user in current:
+            officers[user.chapter_id].append(user)
+        # Not enough current officers, officers from the last 8 months instead
+        previous = [
+            chapter_pk for chapter_pk, users in officers.items() if len(users) < 2
+        ]
+        if previous:
+            date = TODAY_END - timedelta(30 * 8)
+            previous_officers = annotate_role_status(
+                User.objects.filter(
+                    models.Q(current_roles__overlap=list(CHAPTER_OFFICER))
+                    | models.Q(roles__role__in=CHAPTER_OFFICER, roles__end__gte=date),
+                    chapter_id__in=previous,
+                ),
+                date=date,
+            ).order_by("last_name", "pk")
+            for chapter_pk in previous:
+                officers[chapter_pk] = []
+            for user in previous_officers:
+                officers[user.chapter_id].append(user)
+        previous = set(previous)
+        specific = {}
+        for chapter_pk, users in officers.items():
+            is_previous = chapter_pk in previous
+            roles = []
+            for role in OFFICER_ROLES:
+                roles.append(
+                    next(
+                        (
+                            user
+                            for user in users
+                            if role in (user.current_roles or [])
+                            or (is_previous and role in (user.old_roles or ""))
+                        ),
+                        None,
+                    )
+                )
+            specific[chapter_pk] = (roles, is_previous)
+        return specific
+
+    @cached_property
+    def task_dates(self):
+        """
+        TaskDate.incomplete_dates_for_chapter_next_month and
+        TaskDate.incomplete_dates_for_chapter for every chapter
+        :return: {chapter_pk: {"upcoming": [TaskDate], "overdue": [TaskDate]}}
+        """
+        from tasks.models import TaskDate
+
+        task_dates = list(
+            TaskDate.objects.filter(date__gte=TODAY_END - timedelta(90)).select_related(
+                "task"
+            )
+        )
+        matrix = TaskDate.completion_matrix(self.chapters.values(), task_dates)
+        start = TODAY_END.date()
+        end = start + timedelta(60)
+        tasks = {
+            chapter_pk: {"upcoming": [], "overdue": []} for chapter_pk in self.chapters
+        }
+        for task_date in task_dates:
+            for chapter_pk, task_chapter in matrix[task_date.pk].items():
+                if task_chapter != 0:
+                    continue
+                tasks[chapter_pk]["overdue"].append(task_date)
+                if start <= task_date.date <= end:
+                    tasks[chapter_pk]["upcoming"].append(task_date)
+        return tasks
+
+    def council_emails(self, chapter):
+        """
+        Same as chapter.council_emails()
+        """
+        officers, _ = self.officers[chapter.pk]
+        emails = {officer.email for officer in officers if officer} | set(
+            chapter.get_generic_chapter_emails()
+        )
+        return {email for email in emails if email}
+
+    def missing_officers(self, chapter):
+        officers, _ = self.officers[chapter.pk]
+        return ", ".join(
+            name
+            for name, officer in zip(OFFICER_ROLES.values(), officers)
+            if officer is None
+        )
+
+    def status_row(self, chapter):
+        """
+        Row of the ChapterStatusTable
+        """
+        host = settings.CURRENT_URL
+        link = host + reverse("chapters:detail", kwargs={"slug": chapter.slug})
+        return {
+            "name": chapter.name,
+            "slug": chapter.slug,
+            "link": link,
+            "balance": chapter.balance,
+            "balance_date": chapter.balance_date,
+            "officer_missing": self.missing_officers(chapter),
+            "member_count": self.member_counts[chapter.pk],
+            "pledge_count": self.pledge_counts[chapter.pk],
+            "event_count": self.event_counts[chapter.pk]["last_month"],
+            "tasks_overdue": len(self.task_dates[chapter.pk]["overdue"]),
+            "host": host,
+        }
@@ -0,0 +1,69 @@
+# Generated by Django 3.2.15 on 2026-10-18 12:00
+
+import core.models
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("chapters", "0014_auto_20251219_1415"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChapterSemesterStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "year",
+                    models.IntegerField(
+                        default=core.models.current_year,
+                        validators=[
+                            django.core.validators.MinValueValidator(2016),
+                            django.core.validators.MaxValueValidator(
+                                core.models.current_year_plus_10
+                            ),
+                        ],
+                    ),
+                ),
+                (
+                    "term",
+                    models.CharField(
+                        choices=[
+                            ("fa", "Fall"),
+                            ("sp", "Spring"),
+                            ("wi", "Winter"),
+                            ("su", "Summer"),
+                        ],
+                        max_length=2,
+                    ),
+                ),
+                ("status", models.JSONField(blank=True, default=dict)),
+                ("majors", models.JSONField(blank=True, default=dict)),
+                ("gpa_avg", models.FloatField(blank=True, null=True)),
+                ("gpa_count", models.PositiveIntegerField(default=0)),
+                ("modified", models.DateTimeField(auto_now=True)),
+                (
+                    "chapter",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="semester_stats",
+                        to="chapters.chapter",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("term", "year", "chapter")},
+            },
+        ),
+    ]
@@ -1,14 +1,15 @@
 import io
 import csv
+import bisect
 import warnings
 import datetime
 from pathlib import Path
 from enum import Enum
 from datetime import timedelta
 from django.contrib import messages
-from django.utils.timezone import make_aware
+from django.core.cache import cache
+from django.utils.timezone import make_aware, now
 from django.db import models
-from django.db.models.functions import Concat
 from django.core.validators import RegexValidator
 from django.db.utils import ProgrammingError
 from address.models import AddressField
@@ -22,6 +23,7 @@
 from email_signals.models import EmailSignalMixin
 from core.models import (
     TODAY_END,
+    annotate_advisor_role,
     annotate_role_status,
     CHAPTER_OFFICER,
     CHAPTER_ROLES,
@@ -31,6 +33,7 @@
     BIENNIUM_DATES,
     ADVISOR_ROLES,
     EnumClass,
+    YearTermModel,
 )
 from regions.models import Region
 from configs.models import Config
@@ -177,6 +180,15 @@ class SURCHARGE(EnumClass):
             ">75% of prior-year new members completed the online health and safety programming",
         )
 
+    ACTIVE_STATUS = [
+        "active",
+        "activepend",
+        "alumnipend",
+        "pendexpul",
+        "activeCC",
+    ]
+    ACTIVES_INDEX_TIMEOUT = 60 * 60 * 24
+
     name = models.CharField(max_length=50)
     modified = models.DateTimeField(auto_now=True)
     region = models.ForeignKey(
@@ -340,17 +352,75 @@ def chapter_choices(cls):
     def get_actives_for_date(self, date):
         # Do not annotate, need the queryset not a list
         return self.members.filter(
-            status__status__in=[
-                "active",
-                "activepend",
-                "alumnipend",
-                "pendexpul",
-                "activeCC",
-            ],
+            status__status__in=self.ACTIVE_STATUS,
             status__start__lte=date,
             status__end__gte=date,
         ).distinct()
 
+    def get_actives_index(self):
+        """
+        Sorted start and end ordinals of every member's active time.
+        Overlapping statuses of a member are merged, so counting the
+        intervals around a date counts distinct members.
+        Cleared whenever a UserStatusChange is saved or deleted
+        and when a member moves to another chapter.
+        :return: starts, ends
+        """
+        key = self.actives_index_key(self.pk)
+        index = cache.get(key)
+        if index is not None:
+            return index
+        from users.models import UserStatusChange
+
+        intervals = (
+            UserStatusChange.objects.filter(
+                user__chapter=self, status__in=self.ACTIVE_STATUS
+            )
+            .order_by("user_id", "start")
+            .values_list("user_id", "start", "end")
+        )
+        starts, ends = [], []
+        current_user, current_start, current_end = None, None, None
+        for user_id, start, end in intervals:
+            if user_id == current_user and start <= current_end:
+                current_end = max(current_end, end)
+                continue
+            if current_user is not None:
+                starts.append(current_start.toordinal())
+                ends.append(current_end.toordinal())
+            current_user, current_start, current_end = user_id, start, end
+        if current_user is not None:
+            starts.append(current_start.toordinal())
+            ends.append(current_end.toordinal())
+        index = (sorted(starts), sorted(ends))
+        cache.set(key, index, self.ACTIVES_INDEX_TIMEOUT)
+        return index
+
+    @staticmethod
+    def actives_index_key(chapter_id):
+        return f"chapter_actives_index_{chapter_id}"
+
+    @classmethod
+    def clear_actives_index(cls, chapter_id):
+        cache.delete(cls.actives_index_key(chapter_id))
+
+    def get_actives_count_for_date(self, date):
+        """
+        Same as get_actives_for_date(date).count() without the query
+        """
+        if hasattr(date, "date"):
+            date = date.date()
+        starts, ends = self.get_actives_index()
+        ordinal = date.toordinal()
+        # started on/before date minus those that already ended before date
+        return bisect.bisect_right(starts, ordinal) - bisect.bisect_left(ends, ordinal)
+
+    def get_actives_counts_for_dates(self, dates):
+        """
+        :return: {date: count}
+        """
+        return {date: self.get_actives_count_for_date(date) for date in set(dates)}
+
     def notes_filtered(self, current_user):
         notes = self.notes.exclude(parent__isnull=False)
         if not current_user.is_council_officer():
@@ -416,17 +486,7 @@ def advisors(self):
         ) | self.members.filter(
             current_roles__overlap=list(ADVISOR_ROLES),
         )
-        all_advisors = all_advisors.annotate(
-            role=models.Case(
-                models.When(
-                    models.Q(current_roles__overlap=list(ADVISOR_ROLES)),
-                    Concat(models.Value("Alumni "), "current_roles"),
-                ),
-                default=models.Value("Faculty Advisor"),
-                output_field=models.CharField(),
-            )
-        )
-        return all_advisors
+        return annotate_advisor_role(all_advisors)
 
     def active_actives(self):
         # Do not annotate, need the queryset not a list
@@ -807,19 +867,27 @@ def sync_dues(self, request):
             return
         invoice, linenumber_count = invoice_search("1", customer, client)
         count = self.active_actives().count()
+        minimums = Config.get_values(
+            [
+                "ChapterMinimum",
+                "HealthSafetyMinimum_chapter",
+                "HealthSafetyMinimum_house",
+                "HealthSafetyMinimum_candidatechapter",
+            ]
+        )
         if not self.candidate_chapter:
             # D1; Service; Semiannual Chapter Dues payable @ $80 each # Minimum per chapter is $1600.
-            minimum = Config.get_value("ChapterMinimum")
+            minimum = minimums["ChapterMinimum"]
             line = create_line(
                 count, linenumber_count, name="D1", minimum=minimum, client=client
             )
-            l1_min = Config.get_value("HealthSafetyMinimum_chapter")
+            l1_min = minimums["HealthSafetyMinimum_chapter"]
             if self.house:
-                l1_min = Config.get_value("HealthSafetyMinimum_house")
+                l1_min = minimums["HealthSafetyMinimum_house"]
         else:
             # D2; Service; Semiannual Candidate Chapter Dues
             line = create_line(count, linenumber_count, name="D2", client=client)
-            l1_min = Config.get_value("HealthSafetyMinimum_candidatechapter")
+            l1_min = minimums["HealthSafetyMinimum_candidatechapter"]
         linenumber_count += 1
         invoice.Line.append(line)
         # L1; Service; Health and Safety Assessment - Semesterly
@@ -895,3 +963,224 @@ class ChapterCurricula(models.Model):
 
     def __str__(self):
         return self.major
+
+
+class ChapterSemesterStats(YearTermModel):
+    """
+    Rollup of the membership numbers shown on the chapter dashboard.
+    One row per chapter per term, kept up to date by UserStatusChange and
+    UserSemesterGPA saves and rebuilt nightly by chapter_semester_stats
+    """
+
+    class Meta:
+        unique_together = ("term", "year", "chapter")
+
+    START_YEAR = 2018
+    TERM_MONTH = {"sp": 3, "fa": 10}
+    MAJOR_STATUS = ["active", "activepend", "alumnipend", "activeCC"]
+
+    chapter = models.ForeignKey(
+        Chapter, on_delete=models.CASCADE, related_name="semester_stats"
+    )
+    status = models.JSONField(default=dict, blank=True)
+    majors = models.JSONField(default=dict, blank=True)
+    gpa_avg = models.FloatField(blank=True, null=True)
+    gpa_count = models.PositiveIntegerField(default=0)
+    modified = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.chapter} {self.get_term_display()} {self.year}"
+
+    @classmethod
+    def term_date(cls, year, term):
+        return datetime.datetime(year, cls.TERM_MONTH[term], 1)
+
+    @classmethod
+    def terms_between(cls, start, end):
+        """
+        All of the (year, term) the dashboard shows that overlap start to end
+        In filters should be start of status < end of semester
+                             end of status > start of semester
+        """
+        if hasattr(start, "date"):
+            start = start.date()
+        if hasattr(end, "date"):
+            end = end.date()
+        terms = []
+        first_year = max(start.year, cls.START_YEAR)
+        last_year = min(end.year, datetime.date.today().year)
+        for year in range(first_year, last_year + 1):
+            for term in ["sp", "fa"]:
+                semester_start, semester_end = semester_encompass_start_end_date(
+                    cls.term_date(year, term)
+                )
+                if start <= semester_end.date() and end >= semester_start.date():
+                    terms.append((year, term))
+        return terms
+
+    @classmethod
+    def calculate(cls, chapter, year, term):
+        from users.models import User, UserStatusChange, UserSemesterGPA
+
+        start, end = semester_encompass_start_end_date(cls.term_date(year, term))
+        status = dict(
+            UserStatusChange.objects.values_list("status")
+            .filter(
+                user__chapter=chapter,
+                start__lte=end,
+                end__gte=start,
+            )
+            .order_by()
+            .annotate(count=models.Count("status"))
+        )
+        majors = dict(
+            User.objects.values_list("major__major")
+            .filter(
+                chapter=chapter,
+                status__start__lte=end,
+                status__end__gte=start,
+                status__status__in=cls.MAJOR_STATUS,
+            )
+            .order_by()
+            .annotate(count=models.Count("major"))
+        )
+        gpas = UserSemesterGPA.objects.filter(
+            user__chapter=chapter,
+            term=term,
+            year=year,
+        ).aggregate(models.Avg("gpa"), models.Count("gpa"))
+        return dict(
+            status=status,
+            majors={str(major): count for major, count in majors.items()},
+            gpa_avg=gpas["gpa__avg"],
+            gpa_count=gpas["gpa__count"],
+        )
+
+    @classmethod
+    def refresh(cls, chapter, year, term):
+        if term not in cls.TERM_MONTH:
+            return None
+        stats, _ = cls.objects.update_or_create(
+            chapter=chapter,
+            year=year,
+            term=term,
+            defaults=cls.calculate(chapter, year, term),
+        )
+        return stats
+
+    @classmethod
+    def rebuild(cls, year, term, chapters=None):
+        """
+        Backfill one term for many chapters with grouped queries
+        instead of three queries per chapter
+        """
+        from users.models import User, UserStatusChange, UserSemesterGPA
+
+        if chapters is None:
+            chapters = Chapter.objects.all()
+        chapter_ids = list(chapters.values_list("pk", flat=True))
+        start, end = semester_encompass_start_end_date(cls.term_date(year, term))
+        stats = {
+            chapter_id: dict(status={}, majors={}, gpa_avg=None, gpa_count=0)
+            for chapter_id in chapter_ids
+        }
+        status_counts = (
+            UserStatusChange.objects.filter(
+                user__chapter__in=chapter_ids,
+                start__lte=end,
+                end__gte=start,
+            )
+            .values_list("user__chapter", "status")
+            .order_by()
+            .annotate(count=models.Count("status"))
+        )
+        for chapter_id, status, count in status_counts:
+            stats[chapter_id]["status"][status] = count
+        major_counts = (
+            User.objects.filter(
+                chapter__in=chapter_ids,
+                status__start__lte=end,
+                status__end__gte=start,
+                status__status__in=cls.MAJOR_STATUS,
+            )
+            .values_list("chapter", "major__major")
+            .order_by()
+            .annotate(count=models.Count("major"))
+        )
+        for chapter_id, major, count in major_counts:
+            stats[chapter_id]["majors"][str(major)] = count
+        gpas = (
+            UserSemesterGPA.objects.filter(
+                user__chapter__in=chapter_ids, term=term, year=year
+            )
+            .values_list("user__chapter")
+            .order_by()
+            .annotate(models.Avg("gpa"), models.Count("gpa"))
+        )
+        for chapter_id, gpa_avg, gpa_count in gpas:
+            stats[chapter_id]["gpa_avg"] = gpa_avg
+            stats[chapter_id]["gpa_count"] = gpa_count
+        existing = {
+            stat.chapter_id: stat
+            for stat in cls.objects.filter(
+                chapter__in=chapter_ids, year=year, term=term
+            )
+        }
+        update, create = [], []
+        # bulk_update does not apply auto_now
+        modified = now()
+        for chapter_id, values in stats.items():
+            stat = existing.get(chapter_id)
+            if stat is None:
+                create.append(
+                    cls(chapter_id=chapter_id, year=year, term=term, **values)
+                )
+                continue
+            for field, value in values.items():
+                setattr(stat, field, value)
+            stat.modified = modified
+            update.append(stat)
+        cls.objects.bulk_create(create)
+        cls.objects.bulk_update(
+            update, ["status", "majors", "gpa_avg", "gpa_count", "modified"]
+        )
+        return len(create), len(update)
+
+    @classmethod
+    def refresh_dates(cls, chapter, start, end):
+        cls.refresh_terms(chapter, cls.terms_between(start, end))
+
+    @classmethod
+    def refresh_terms(cls, chapter, terms):
+        for year, term in sorted(terms):
+            cls.refresh(chapter, year, term)
+
+    @classmethod
+    def for_chapter(cls, chapter, years):
+        """
+        All of the stats for a chapter in one query, any missing terms
+        (eg. backfill not run yet) are calculated and stored
+        :return: {(year, term): ChapterSemesterStats}
+        """
+        stats = {
+            (stat.year, stat.term): stat
+            for stat in cls.objects.filter(
+                chapter=chapter, year__gte=min(years), year__lte=max(years)
+            )
+        }
+        for year in years:
+            for term in ["sp", "fa"]:
+                if (year, term) not in stats:
+                    stats[(year, term)] = cls.refresh(chapter, year, term)
+        return stats
+
+    def dashboard_data(self):
+        data = dict(self.status)
+        data.update(
+            {
+                "gpa__avg": self.gpa_avg,
+                "gpa__count": self.gpa_count,
+                "majors": [self.majors],
+            }
+        )
+        return data
@@ -0,0 +1,88 @@
+import datetime
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from chapters import dashboard
+from chapters.models import ChapterSemesterStats
+from users.models import UserStatusChange
+
+
+def load_dashboard(user):
+    with CaptureQueriesContext(connection) as queries:
+        out = dashboard.load_chapter_data(None, user=user)
+    return out, len(queries)
+
+
+@pytest.mark.django_db
+def test_semester_stats_match_calculate(chapter, user_factory):
+    user_factory.create_batch(5, chapter=chapter, status="active")
+    user_factory.create_batch(3, chapter=chapter, status="pnm")
+    today = datetime.date.today()
+    term = ChapterSemesterStats.get_term(today)
+    stats = ChapterSemesterStats.objects.get(
+        chapter=chapter, year=today.year, term=term
+    )
+    expected = ChapterSemesterStats.calculate(chapter, today.year, term)
+    assert stats.status == expected["status"]
+    assert stats.majors == expected["majors"]
+    modified = stats.modified
+    call_command("chapter_semester_stats", today.year, today.year)
+    stats.refresh_from_db()
+    assert stats.status == expected["status"]
+    assert stats.modified > modified
+
+
+@pytest.mark.django_db
+def test_dashboard_queries_do_not_grow_with_years(monkeypatch, user_factory):
+    """
+    Benchmark: the dashboard used to run 3 queries per term since 2018
+    now it reads one row-set per chapter however many years are shown
+    """
+    user = user_factory.create(status="active")
+    user_factory.create_batch(10, chapter=user.chapter, status="active")
+    this_year = datetime.date.today().year
+    call_command("chapter_semester_stats", this_year - 9, this_year)
+    results = {}
+    for year_count in [2, 10]:
+        years = list(range(this_year - year_count + 1, this_year + 1))
+        monkeypatch.setattr(dashboard, "YEARS", years)
+        out, query_count = load_dashboard(user)
+        assert len(out[0]) == year_count * 2
+        results[year_count] = query_count
+    assert results[2] == results[10]
+
+
+@pytest.mark.django_db
+def test_status_change_refreshes_changed_terms(monkeypatch, user_factory):
+    user = user_factory.create(status="active")
+    refreshed = []
+    monkeypatch.setattr(
+        ChapterSemesterStats,
+        "refresh",
+        classmethod(lambda cls, chapter, year, term: refreshed.append((year, term))),
+    )
+    change = UserStatusChange.objects.create(
+        user=user,
+        status="active",
+        start=datetime.date(2019, 2, 1),
+        end=datetime.date(2021, 3, 1),
+    )
+    assert refreshed == [
+        (2019, "fa"),
+        (2019, "sp"),
+        (2020, "fa"),
+        (2020, "sp"),
+        (2021, "sp"),
+    ]
+    refreshed.clear()
+    change.end = datetime.date(2021, 3, 15)
+    change.save()
+    assert refreshed == []
+    change.end = datetime.date(2021, 8, 1)
+    change.save()
+    assert refreshed == [(2021, "fa")]
+    refreshed.clear()
+    change.status = "away"
+    change.save()
+    assert len(refreshed) == 6
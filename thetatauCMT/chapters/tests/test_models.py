@@ -1,8 +1,12 @@
+import datetime
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from pytest_django.asserts import assertQuerysetEqual
 from chapters.tests.factories import ChapterFactory, ChapterCurriculaFactory
 from chapters.models import Chapter, ChapterCurricula
-from users.models import UserStatusChange
+from chapters.metrics import ChapterMetrics
+from users.models import User, UserStatusChange
 
 
 @pytest.mark.django_db
@@ -190,3 +194,108 @@ def test_advisors_external(chapter, user_factory):
     user_factory.create_batch(5, chapter=chapter, make_officer="advisor")
     result = chapter.advisors_external
     assert set(expected_users) == set(result)
+
+
+@pytest.mark.django_db
+def test_get_actives_count_for_date(chapter, user_factory, user_status_change_factory):
+    make_many_users_status(user_factory, chapter, [])
+    user = user_factory.create(chapter=chapter)
+    # Overlapping active statuses are still one member
+    user_status_change_factory.create(
+        user=user,
+        status="active",
+        start=datetime.date(2020, 1, 1),
+        end=datetime.date(2021, 1, 1),
+    )
+    user_status_change_factory.create(
+        user=user,
+        status="activepend",
+        start=datetime.date(2020, 6, 1),
+        end=datetime.date(2021, 6, 1),
+    )
+    dates = [
+        datetime.date(2019, 12, 31),
+        datetime.date(2020, 1, 1),
+        datetime.date(2020, 7, 1),
+        datetime.date(2021, 6, 1),
+        datetime.date(2021, 6, 2),
+        datetime.date.today(),
+    ]
+    for date in dates:
+        expected = chapter.get_actives_for_date(date).count()
+        assert chapter.get_actives_count_for_date(date) == expected
+    new_status = user_status_change_factory.create(
+        user=user_factory.create(chapter=chapter),
+        status="active",
+        start=datetime.date(2019, 1, 1),
+        end=datetime.date(2019, 12, 31),
+    )
+    assert chapter.get_actives_count_for_date(datetime.date(2019, 12, 31)) == 1
+    new_status.delete()
+    assert chapter.get_actives_count_for_date(datetime.date(2019, 12, 31)) == 0
+
+
+@pytest.mark.django_db
+def test_actives_index_member_moved(
+    chapter, chapter_factory, user_factory, user_status_change_factory
+):
+    other = chapter_factory(name="Moved To")
+    date = datetime.date(2020, 6, 1)
+    user = user_factory.create(chapter=chapter)
+    user_status_change_factory.create(
+        user=user,
+        status="active",
+        start=datetime.date(2020, 1, 1),
+        end=datetime.date(2021, 1, 1),
+    )
+    before = chapter.get_actives_count_for_date(date)
+    assert other.get_actives_count_for_date(date) == 0
+    user = User.objects.get(pk=user.pk)
+    user.chapter = other
+    user.save()
+    assert chapter.get_actives_count_for_date(date) == before - 1
+    assert other.get_actives_count_for_date(date) == 1
+
+
+@pytest.mark.django_db
+def test_chapter_metrics(user_factory):
+    from tasks.models import TaskDate
+
+    chapters = [ChapterFactory(name=name) for name in ["alpha", "beta"]]
+    user_factory.create_batch(3, chapter=chapters[0], status="active")
+    user_factory.create_batch(2, chapter=chapters[0], status="pnm")
+    user_factory(chapter=chapters[0], status="active", make_officer="regent")
+    user_factory(chapter=chapters[0], status="active", make_officer="treasurer")
+    user_factory(chapter=chapters[1], status="active", make_officer="scribe")
+    metrics = ChapterMetrics(chapters)
+    with CaptureQueriesContext(connection) as queries:
+        for chapter in chapters:
+            metrics.status_row(chapter)
+            metrics.council_emails(chapter)
+    queries_first = len(queries)
+    with CaptureQueriesContext(connection) as queries:
+        for chapter in chapters:
+            metrics.status_row(chapter)
+    assert not queries
+    assert queries_first <= 8
+    for chapter in chapters:
+        assert metrics.member_counts[chapter.pk] == chapter.actives().count()
+        assert metrics.pledge_counts[chapter.pk] == chapter.pledges().count()
+        assert metrics.event_counts[chapter.pk] == {
+            "last_month": chapter.events_last_month().count(),
+            "semester": chapter.events_semester().count(),
+        }
+        officers, previous = metrics.officers[chapter.pk]
+        assert officers == chapter.get_current_officers_council_specific()
+        assert previous == chapter.get_current_officers_council()[1]
+        assert metrics.council_emails(chapter) == chapter.council_emails()
+        tasks = metrics.task_dates[chapter.pk]
+        assert set(tasks["overdue"]) == set(
+            TaskDate.incomplete_dates_for_chapter(chapter)
+        )
+        assert set(tasks["upcoming"]) == set(
+            TaskDate.incomplete_dates_for_chapter_next_month(chapter)
+        )
+    assert metrics.status_row(chapters[0])["officer_missing"] == (
+        "Scribe, Vice, Corresponding Secretary"
+    )
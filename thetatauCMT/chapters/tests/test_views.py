@@ -6,6 +6,7 @@
 
 import pytest
 from django.urls import reverse
+from forms.tests.factories import AuditFactory
 from .factories import ChapterFactory
 
 
@@ -21,6 +22,16 @@ def test_chapter_detail_view(auto_login_user):
     )
 
 
+@pytest.mark.django_db
+def test_chapter_detail_view_audits(auto_login_user):
+    client, user = auto_login_user(make_officer="regent")
+    AuditFactory(user=user)
+    url = reverse("chapters:detail", kwargs={"slug": user.chapter.slug})
+    response = client.get(url)
+    assert response.status_code == 200
+    assert len(response.context["audit_table"].rows) == 16
+
+
 def test_chapter_list_view_denied(auto_login_user):
     client, user = auto_login_user()
     url = reverse("chapters:list")
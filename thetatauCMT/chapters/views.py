@@ -128,23 +128,8 @@ def get_context_data(self, **kwargs):
             "debit_card",
             "debit_card_access",
         ]
-        audits = (
-            Audit.objects.filter(user__chapter=chapter)
-            .order_by("-modified")
-            .values(*row_names)
-        )
+        audit_data = Audit.latest_officer_audits(chapter)
         audit_items = []
-        audit_data = {}
-        for audit in audits:
-            user = User.objects.get(id=audit["user"])
-            role = user.get_officer_role_on_date(audit["modified"])
-            if role is not None:
-                role = role.role
-            if (role not in audit_data) and (role in CHAPTER_OFFICER):
-                audit["user"] = user
-                audit_data[role] = audit
-            if len(audit_data) == len(CHAPTER_OFFICER):
-                break
         for name in row_names:
             audit_item = {
                 "item": Audit._meta.get_field(name).verbose_name.title(),
@@ -153,7 +138,7 @@ def get_context_data(self, **kwargs):
                 audit = audit_data.get(officer, None)
                 value = "Incomplete"
                 if audit is not None:
-                    value = audit.get(name, "Incomplete")
+                    value = getattr(audit, name)
                 audit_item.update({officer.replace(" ", "_"): value})
             audit_items.append(audit_item)
             # {
@@ -3,3 +3,6 @@
 
 class ConfigsConfig(AppConfig):
     name = "configs"
+
+    def ready(self):
+        import configs.signals  # noqa F401
@@ -1,3 +1,5 @@
+import uuid
+from django.core.cache import cache
 from django.db import models
 from django.utils.html import strip_tags
 from django.utils.safestring import mark_safe
@@ -5,6 +7,11 @@
 
 from core.models import TimeStampedModel
 
+VERSION_KEY = "config_version"
+VALUES_TIMEOUT = 60 * 60 * 24
+# values of the loaded version in this process
+_loaded = {"version": None, "values": {}}
+
 
 class Config(TimeStampedModel):
     key = models.CharField(max_length=255)
@@ -16,16 +23,56 @@ class Meta:
             "-modified",
         ]
 
+    @staticmethod
+    def version():
+        """
+        Shared version of the configs, changed whenever a config is saved or deleted
+        """
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            version = uuid.uuid4().hex
+            if not cache.add(VERSION_KEY, version, None):
+                version = cache.get(VERSION_KEY, version)
+        return version
+
+    @staticmethod
+    def bump_version():
+        cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
     @classmethod
-    def get_value(cls, key, clean=True):
-        value = cls.objects.filter(key=key).order_by("created").last()
-        if value is not None:
-            value = value.value
-        else:
-            value = ""
+    def all_values(cls):
+        """
+        {key: value} of the newest config of every key from one query,
+        kept in this process and the shared cache until the version changes
+        """
+        version = cls.version()
+        if _loaded["version"] == version:
+            return _loaded["values"]
+        values_key = f"config_values_{version}"
+        values = cache.get(values_key)
+        if values is None:
+            values = dict(
+                cls.objects.order_by("created", "pk").values_list("key", "value")
+            )
+            cache.set(values_key, values, VALUES_TIMEOUT)
+        _loaded.update(version=version, values=values)
+        return values
+
+    @staticmethod
+    def clean_value(value, clean=True):
         if clean:
             # RichTextField value has HTML tags, when not needed strip
-            value = strip_tags(value)
-        else:
-            value = mark_safe(value)
-        return value
+            return strip_tags(value)
+        return mark_safe(value)
+
+    @classmethod
+    def get_value(cls, key, clean=True):
+        return cls.clean_value(cls.all_values().get(key, ""), clean)
+
+    @classmethod
+    def get_values(cls, keys, clean=True):
+        """
+        :return: {key: value} of the keys, "" for keys without a config
+        """
+        values = cls.all_values()
+        return {key: cls.clean_value(values.get(key, ""), clean) for key in keys}
@@ -0,0 +1,12 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Config
+
+
+@receiver(post_save, sender=Config)
+@receiver(post_delete, sender=Config)
+def bump_config_version(sender, **kwargs):
+    Config.bump_version()
+    # again after commit, other processes may have cached the old values meanwhile
+    transaction.on_commit(Config.bump_version)
@@ -0,0 +1,34 @@
+import datetime
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from configs.models import Config
+
+
+@pytest.mark.django_db
+def test_config_values_cached():
+    cache.clear()
+    old = timezone.now() - datetime.timedelta(days=1)
+    Config.objects.create(key="init_fee_chapter", value="<p>50</p>", created=old)
+    fee = Config.objects.create(key="init_fee_chapter", value="<p>75</p>")
+    Config.objects.create(key="init_late_fee", value="25")
+    with CaptureQueriesContext(connection) as queries:
+        assert Config.get_value("init_fee_chapter") == "75"
+        assert Config.get_value("init_fee_chapter", clean=False) == "<p>75</p>"
+        assert Config.get_values(["init_fee_chapter", "init_late_fee", "missing"]) == {
+            "init_fee_chapter": "75",
+            "init_late_fee": "25",
+            "missing": "",
+        }
+    assert len(queries) == 1
+    fee.value = "100"
+    fee.save()
+    assert Config.get_value("init_fee_chapter") == "100"
+    fee.delete()
+    assert Config.get_value("init_fee_chapter") == "50"
+    with CaptureQueriesContext(connection) as queries:
+        for _ in range(80):
+            Config.get_value("init_late_fee")
+    assert not queries
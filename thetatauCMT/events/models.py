@@ -101,30 +101,42 @@ def chapter_events(cls, chapter):
         return result
 
     @classmethod
-    def calculate_meeting_attendance(cls, chapter, date):
+    def meeting_attendance(cls, chapter, date):
+        """
+        Every meeting in the semester shares the average attendance score
+        :return: meeting events in semester, score for each event
+        """
         meeting_type = ScoreType.objects.get(name="Attendance at meetings")
         semester_start, semester_end = semester_encompass_start_end_date(date)
-        events = cls.objects.filter(
-            chapter=chapter,
-            type=meeting_type,
-            date__lte=semester_end,
-            date__gte=semester_start,
+        events = list(
+            cls.objects.filter(
+                chapter=chapter,
+                type=meeting_type,
+                date__lte=semester_end,
+                date__gte=semester_start,
+            )
+        )
+        actives_counts = chapter.get_actives_counts_for_dates(
+            [event.date for event in events]
         )
         total_percent = 0
         for event in events:
-            actives = event.chapter.get_actives_for_date(event.date).count()
+            actives = actives_counts[event.date]
             percent_attendance = 0
             if actives:
                 percent_attendance = min(event.members / actives, 1)
             total_percent += percent_attendance
-        event_count = events.count()
+        event_count = len(events)
         if not event_count:
             event_count = 1
         avg_attendance = total_percent / event_count
-        formula_out = meeting_type.special
-        formula_out = formula_out.replace("MEETINGS", str(avg_attendance))
-        score = eval(formula_out)
+        score = meeting_type.special_formula.evaluate(MEETINGS=avg_attendance)
         event_score = round(score / event_count, 2)
+        return events, event_score
+
+    @classmethod
+    def calculate_meeting_attendance(cls, chapter, date):
+        events, event_score = cls.meeting_attendance(chapter, date)
         for event in events:
             event.score = event_score
             event.save(calculate_score=False)
@@ -92,3 +92,32 @@ def test_calculate_meeting_attendance_no_events(chapter, user_status_change_fact
     actual_score = Event.calculate_meeting_attendance(chapter, date)
     # No events, should be 0 score
     assert actual_score == 0
+
+
+@pytest.mark.django_db
+def test_recalculate_scores_bulk_matches_save(
+    chapter, event_factory, user_status_change_factory
+):
+    user_status_change_factory.create_batch(
+        20,
+        status="active",
+        user__chapter=chapter,
+        start=factory.Faker("date_between", start_date="-1y", end_date="-30d"),
+        end=factory.Faker("date_between", start_date="today", end_date="+1y"),
+    )
+    for slug in ["alumni-active", "interchapter", "meetings"]:
+        event_factory.create_batch(
+            3,
+            calculate_score=True,
+            type=ScoreType.objects.get(slug=slug),
+            chapter=chapter,
+            date=factory.Faker("date_between", start_date="-15d", end_date="-5d"),
+        )
+    expected = dict(Event.objects.filter(chapter=chapter).values_list("pk", "score"))
+    Event.objects.filter(chapter=chapter).update(score=0)
+    totals = ScoreType.recalculate_scores(
+        [chapter], datetime.date.today() - datetime.timedelta(30), log=lambda x: x
+    )
+    actual = dict(Event.objects.filter(chapter=chapter).values_list("pk", "score"))
+    assert totals["events"] == 9
+    assert actual == expected
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.15 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("finances", "0003_alter_invoice_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="invoice",
+            name="qb_id",
+            field=models.CharField(blank=True, max_length=50, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name="invoice",
+            name="qb_updated",
+            field=models.CharField(blank=True, default="", max_length=50),
+        ),
+    ]
@@ -18,6 +18,10 @@ class Invoice(TimeStampedModel):
         blank=True,
         help_text="You must include the full URL including https:// or http://",
     )
+    # Quickbooks Id and MetaData.LastUpdatedTime, the invoice is only fetched again
+    # when it is updated in Quickbooks
+    qb_id = models.CharField(max_length=50, null=True, blank=True, unique=True)
+    qb_updated = models.CharField(max_length=50, blank=True, default="")
 
     @classmethod
     def open_balance_chapter(cls, chapter):
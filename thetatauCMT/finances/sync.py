@@ -0,0 +1,311 @@
+"""
+Sync chapter balances, emails and invoices from Quickbooks
+
+Invoices are upserted by their Quickbooks Id. After the first full sync only
+invoices changed since the last run are requested (change data capture), and an
+invoice is only fetched again when its LastUpdatedTime changed.
+"""
+import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.utils import timezone
+from quickbooks.cdc import change_data_capture
+from quickbooks.objects.customer import Customer
+from quickbooks.objects.invoice import Invoice as QBInvoice
+from chapters.models import Chapter
+from forms.notifications import CentralOfficeGenericEmail
+from .models import Invoice
+
+# Quickbooks only keeps change data for the last 30 days
+CDC_DAYS = 29
+# Change data capture returns at most 1000 objects, more needs a full sync
+CDC_MAX = 1000
+
+CUSTOMER_CHAPTER = "7300000000000214210"
+CUSTOMER_CANDIDATE_CHAPTER = "7300000000000214211"
+
+
+def last_updated(qb_object):
+    meta_data = getattr(qb_object, "MetaData", None) or {}
+    return meta_data.get("LastUpdatedTime", "")
+
+
+class RateLimiter:
+    """
+    Spaces out the calls from all of the workers
+    Quickbooks allows 500 requests per minute per company
+    """
+
+    def __init__(self, per_minute=400):
+        self.interval = 60 / per_minute
+        self.lock = threading.Lock()
+        self.next_call = 0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_call - now
+            self.next_call = max(now, self.next_call) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class QuickbooksSync:
+    def __init__(self, client, live=False, workers=4, per_minute=400, log=print):
+        """
+        :param live: update the chapter balances and Quickbooks customer emails
+        :param workers: requests to Quickbooks at the same time
+            Quickbooks allows at most 10
+        """
+        self.client = client
+        self.live = live
+        self.workers = workers
+        self.limiter = RateLimiter(per_minute=per_minute)
+        self.log = log
+
+    def call(self, function, *args, **kwargs):
+        self.limiter.wait()
+        return function(*args, qb=self.client, **kwargs)
+
+    def map(self, function, items):
+        """
+        Run function for every item with the bounded worker pool
+        :return: list of results in the same order
+        """
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(function, items))
+
+    def error(self, message):
+        self.log(message)
+        CentralOfficeGenericEmail(message, subject="[CMT] Quickbooks Sync Error").send()
+
+    def run(self, since=None):
+        """
+        :param since: datetime of the last sync, full sync if None
+        :return: datetime the sync started, the next since
+        """
+        started = timezone.now()
+        customers = self.call(Customer.all, max_results=1000)
+        chapters = {chapter.name: chapter for chapter in Chapter.objects.all()}
+        customer_chapters = {}
+        for customer in customers:
+            try:
+                chapter = self.customer_chapter(customer, chapters)
+                if chapter is None:
+                    continue
+                self.sync_customer(customer, chapter)
+                customer_chapters[customer.Id] = chapter
+            except Exception as e:
+                self.error(f"Error processing customer {customer=} {customer.Id} {e}")
+        changed = None
+        if since is not None and started - since < datetime.timedelta(days=CDC_DAYS):
+            changed = self.changed_invoices(since)
+        if changed is None:
+            self.sync_all_invoices(customer_chapters)
+        else:
+            self.sync_changed_invoices(changed, customer_chapters)
+        return started
+
+    def customer_chapter(self, customer, chapters):
+        chapter_name = customer.CompanyName
+        if not chapter_name or not hasattr(customer, "CustomerTypeRef"):
+            return None
+        customer_type = customer.CustomerTypeRef["value"]
+        if customer_type == CUSTOMER_CHAPTER:
+            if "Chapter" in chapter_name:
+                chapter_name = customer.CompanyName.split(" Chapter")[0]
+        elif customer_type == CUSTOMER_CANDIDATE_CHAPTER:
+            # Candidate Chapter is normally in the name
+            pass
+        else:
+            # natoff, other or not chapter/candidate chapter
+            return None
+        self.log(f"Syncing: {chapter_name}")
+        chapter = chapters.get(chapter_name)
+        if chapter is None:
+            self.log(f"    Chapter matching {chapter_name} does not exist")
+            return None
+        if not chapter.active:
+            self.log("    Chapter not active")
+            return None
+        return chapter
+
+    def sync_customer(self, customer, chapter):
+        balance = customer.Balance
+        self.log(f"    New balance: {balance}")
+        if self.live:
+            chapter.balance = balance
+            chapter.balance_date = timezone.now()
+            chapter.save()
+        email_str = self.chapter_emails(chapter)
+        if customer.PrimaryEmailAddr is None:
+            self.log("    No current email")
+            self.log(f"    New Email: {email_str}")
+            if self.live:
+                customer.PrimaryEmailAddr.Address = email_str
+                self.call(customer.save)
+        elif customer.PrimaryEmailAddr.Address != email_str:
+            self.log(f"    Current Email: {customer.PrimaryEmailAddr.Address}")
+            self.log(f"    New Email: {email_str}")
+            if self.live:
+                customer.PrimaryEmailAddr.Address = email_str
+                self.call(customer.save)
+        else:
+            self.log(f"    Current Email: {customer.PrimaryEmailAddr.Address}")
+            self.log("    No new emails")
+
+    def chapter_emails(self, chapter):
+        # Total emails are limited to 100 characters, need to be strategic
+        # [regent, scribe, vice, treasurer]
+        council_emails = chapter.get_current_officers_council_specific()
+        # [email_regent, email_scribe, email_vice_regent, email_treasurer, email_corresponding_secretary, email,
+        generic_emails = chapter.get_generic_chapter_emails()
+        emails = [
+            # Tresurer
+            council_emails[3],
+            generic_emails[3],
+            # Generic
+            generic_emails[5],
+            # Regent
+            council_emails[0],
+            generic_emails[0],
+            # Vice
+            council_emails[2],
+            generic_emails[2],
+            # Scribe
+            council_emails[1],
+            generic_emails[1],
+            # Corsec
+            generic_emails[4],
+        ]
+        emails = [email for email in emails if email]
+        if not emails:
+            self.log("    NO EMAILS")
+        email_str = ""
+        for email in emails:
+            if not isinstance(email, str):
+                email = email.email
+            if not email:
+                continue
+            if (len(email_str + email) + 1) < 100 and email not in email_str:
+                email_str = email_str + email + ","
+            else:
+                break
+        return email_str[:-1]
+
+    def changed_invoices(self, since):
+        """
+        :return: invoices changed since, None if a full sync is needed
+        """
+        response = self.call(
+            change_data_capture, [QBInvoice], since.isoformat(timespec="seconds")
+        )
+        invoices = list(getattr(response, QBInvoice.qbo_object_name, []))
+        if len(invoices) >= CDC_MAX:
+            return None
+        return invoices
+
+    def customer_invoices(self, customer_id):
+        """
+        Runs in the worker threads, errors are returned to be sent
+        in one email from the main thread
+        :return: (invoices or None, error)
+        """
+        try:
+            invoices = self.call(
+                QBInvoice.query,
+                f"select * from Invoice where "
+                f"CustomerRef = '{customer_id}' ORDER BY DueDate DESC",
+            )
+        except Exception as e:
+            return None, f"Error getting invoices for customer {customer_id} {e}"
+        return invoices, None
+
+    def invoice_detail(self, invoice_id):
+        try:
+            return self.call(QBInvoice.get, invoice_id)
+        except Exception as e:
+            self.log(f"    Error getting invoice {invoice_id} {e}")
+            return None
+
+    def sync_all_invoices(self, customer_chapters):
+        customer_ids = list(customer_chapters)
+        invoices = []
+        failed_chapters = []
+        errors = []
+        for customer_id, (customer_invoices, error) in zip(
+            customer_ids, self.map(self.customer_invoices, customer_ids)
+        ):
+            chapter = customer_chapters[customer_id]
+            if customer_invoices is None:
+                failed_chapters.append(chapter)
+                errors.append(error)
+                continue
+            invoices.extend((invoice, chapter) for invoice in customer_invoices)
+        if errors:
+            self.error("\n".join(errors))
+        self.save_invoices(invoices)
+        deleted, _ = (
+            Invoice.objects.exclude(qb_id__in=[invoice.Id for invoice, _ in invoices])
+            .exclude(chapter__in=failed_chapters)
+            .delete()
+        )
+        self.log(f"Full sync: {len(invoices)} invoices, {deleted} removed")
+
+    def sync_changed_invoices(self, changed, customer_chapters):
+        invoices, removed = [], []
+        for invoice in changed:
+            customer_ref = getattr(invoice, "CustomerRef", None)
+            chapter = None
+            if customer_ref is not None:
+                chapter = customer_chapters.get(customer_ref.value)
+            if getattr(invoice, "status", "") == "Deleted" or chapter is None:
+                removed.append(invoice.Id)
+            else:
+                invoices.append((invoice, chapter))
+        self.save_invoices(invoices)
+        deleted, _ = Invoice.objects.filter(qb_id__in=removed).delete()
+        self.log(f"Changed sync: {len(invoices)} invoices, {deleted} removed")
+
+    def save_invoices(self, invoices):
+        """
+        Upsert the invoices, only fetching the ones updated since they were saved
+        :param invoices: list of (Quickbooks invoice, chapter)
+        """
+        saved = dict(
+            Invoice.objects.filter(
+                qb_id__in=[invoice.Id for invoice, _ in invoices]
+            ).values_list("qb_id", "qb_updated")
+        )
+        fetch_ids = [
+            invoice.Id
+            for invoice, _ in invoices
+            if invoice.Id not in saved or saved[invoice.Id] != last_updated(invoice)
+        ]
+        details = dict(zip(fetch_ids, self.map(self.invoice_detail, fetch_ids)))
+        for invoice, chapter in invoices:
+            invoice = details.get(invoice.Id)
+            if invoice is None:
+                continue
+            invoice_number = invoice.DocNumber
+            invoice_balance = invoice.Balance
+            Invoice.objects.update_or_create(
+                qb_id=invoice.Id,
+                defaults=dict(
+                    qb_updated=last_updated(invoice),
+                    link=invoice.InvoiceLink,
+                    due_date=invoice.DueDate,
+                    central_id=invoice_number,
+                    description="<br>".join(
+                        [
+                            f"{line.Description}; Line Amount: {line.Amount} <br>"
+                            for line in invoice.Line
+                            if line.DetailType == "SalesItemLineDetail"
+                        ]
+                    ),
+                    total=invoice_balance,
+                    chapter=chapter,
+                ),
+            )
+            self.log(f"        {chapter} {invoice_number=} {invoice_balance=}")
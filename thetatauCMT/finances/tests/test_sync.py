@@ -0,0 +1,172 @@
+import json
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import pytest
+import requests
+from quickbooks import QuickBooks
+from finances.models import Invoice
+from finances.sync import QuickbooksSync, CUSTOMER_CHAPTER
+
+
+class FakeQuickbooks(BaseHTTPRequestHandler):
+    """
+    Answers the requests the sync makes like the Quickbooks API
+    and counts them, set data with server.customers/invoices/changed
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def respond(self, data):
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server = self.server
+        select = self.rfile.read(int(self.headers["Content-Length"])).decode()
+        if "FROM Customer" in select:
+            server.calls["customers"] += 1
+            return self.respond({"QueryResponse": {"Customer": server.customers}})
+        server.calls["invoice_query"] += 1
+        customer_id = select.split("CustomerRef = '")[1].split("'")[0]
+        if customer_id in server.failing:
+            self.send_response(500)
+            self.end_headers()
+            return
+        invoices = [
+            invoice
+            for invoice in server.invoices.values()
+            if invoice["CustomerRef"]["value"] == customer_id
+        ]
+        self.respond({"QueryResponse": {"Invoice": invoices}})
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        if url.path.endswith("/cdc"):
+            server.calls["cdc"] += 1
+            assert parse_qs(url.query)["entities"] == ["Invoice"]
+            return self.respond(
+                {
+                    "CDCResponse": [{"QueryResponse": [{"Invoice": server.changed}]}],
+                    "time": "2024-01-01T00:00:00-08:00",
+                }
+            )
+        server.calls["invoice_get"] += 1
+        invoice_id = url.path.rstrip("/").split("/")[-1]
+        self.respond({"Invoice": server.invoices[invoice_id]})
+
+
+def make_invoice(invoice_id, customer_id, balance, updated="2024-01-01T00:00:00"):
+    return {
+        "Id": invoice_id,
+        "DocNumber": f"D{invoice_id}",
+        "Balance": balance,
+        "DueDate": "2024-02-01",
+        "InvoiceLink": f"https://example.com/{invoice_id}",
+        "CustomerRef": {"value": customer_id},
+        "MetaData": {"LastUpdatedTime": updated},
+        "Line": [
+            {
+                "DetailType": "SalesItemLineDetail",
+                "Description": "Dues",
+                "Amount": balance,
+                "SalesItemLineDetail": {},
+            }
+        ],
+    }
+
+
+@pytest.fixture
+def fake_quickbooks():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeQuickbooks)
+    server.calls = Counter()
+    server.customers, server.invoices, server.changed = [], {}, []
+    server.failing = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = QuickBooks()
+    client.company_id = "1"
+    client.api_url_v3 = f"http://127.0.0.1:{server.server_address[1]}/v3"
+    client.session = requests.Session()
+    client.session.access_token = "fake"
+    yield server, client
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.django_db
+def test_sync_quickbooks_incremental(chapter, fake_quickbooks):
+    server, client = fake_quickbooks
+    server.customers = [
+        {
+            "Id": "10",
+            "CompanyName": f"{chapter.name} Chapter",
+            "CustomerTypeRef": {"value": CUSTOMER_CHAPTER},
+            "Balance": 300,
+            "PrimaryEmailAddr": {"Address": ""},
+        }
+    ]
+    server.invoices = {
+        invoice_id: make_invoice(invoice_id, "10", 100) for invoice_id in "123"
+    }
+    # An invoice from the old sync that no longer exists
+    Invoice.objects.create(chapter=chapter, total=5, description="old")
+    sync = QuickbooksSync(client, workers=3, per_minute=6000, log=lambda x: None)
+    since = sync.run()
+    assert server.calls == {"customers": 1, "invoice_query": 1, "invoice_get": 3}
+    assert Invoice.objects.count() == 3
+    assert set(Invoice.objects.values_list("qb_id", flat=True)) == {"1", "2", "3"}
+
+    # Nothing changed, no invoices are requested
+    server.calls.clear()
+    since = sync.run(since=since)
+    assert server.calls == {"customers": 1, "cdc": 1}
+
+    # One paid and one deleted, only the paid one is fetched
+    server.calls.clear()
+    server.invoices["1"] = make_invoice("1", "10", 0, updated="2024-01-02T00:00:00")
+    server.changed = [
+        server.invoices["1"],
+        {"Id": "2", "status": "Deleted", "MetaData": {}},
+    ]
+    sync.run(since=since)
+    assert server.calls == {"customers": 1, "cdc": 1, "invoice_get": 1}
+    assert Invoice.objects.count() == 2
+    assert Invoice.objects.get(qb_id="1").total.amount == 0
+
+
+@pytest.mark.django_db
+def test_sync_quickbooks_invoice_errors(chapter_factory, fake_quickbooks):
+    server, client = fake_quickbooks
+    chapters = [chapter_factory(name=name) for name in ["alpha", "beta", "gamma"]]
+    server.customers = [
+        {
+            "Id": str(number),
+            "CompanyName": f"{chapter.name} Chapter",
+            "CustomerTypeRef": {"value": CUSTOMER_CHAPTER},
+            "Balance": 100,
+            "PrimaryEmailAddr": {"Address": ""},
+        }
+        for number, chapter in enumerate(chapters)
+    ]
+    server.invoices = {"1": make_invoice("1", "0", 100)}
+    server.failing = {"1", "2"}
+    kept = Invoice.objects.create(chapter=chapters[1], total=5, description="kept")
+    errors = []
+    sync = QuickbooksSync(client, workers=3, per_minute=6000, log=lambda x: None)
+    sync.error = errors.append
+    sync.run()
+    # One summary of the failed customers, sent from the main thread
+    assert len(errors) == 1
+    assert "customer 1 " in errors[0] and "customer 2 " in errors[0]
+    assert set(Invoice.objects.values_list("pk", flat=True)) == {
+        kept.pk,
+        Invoice.objects.get(qb_id="1").pk,
+    }
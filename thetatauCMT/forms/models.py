@@ -9,12 +9,14 @@
 from address.models import AddressField
 from email.mime.base import MIMEBase
 from django.db import models, transaction
+from django.db.models.functions import TruncDate
 from django.db.utils import IntegrityError
 from django.contrib.auth.models import Group
 from django_userforeignkey.models.fields import UserForeignKey
 from django.contrib import messages
 from django.core.validators import MaxValueValidator, RegexValidator
 from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 from djmoney.models.fields import MoneyField
 from django.utils.translation import gettext_lazy as _
@@ -28,6 +30,7 @@
 from core.finances import get_quickbooks_client, invoice_search, create_line
 from core.models import (
     forever,
+    CHAPTER_OFFICER,
     CHAPTER_ROLES_CHOICES,
     CHAPTER_OFFICER_CHOICES,
     academic_encompass_start_end_date,
@@ -187,6 +190,37 @@ def signed_this_semester(cls, chapter):
         ).first()
         return program
 
+    SIGNED_TIMEOUT = 60 * 60 * 24
+
+    @staticmethod
+    def signed_key(chapter_id, year, term):
+        return f"pledge_program_signed_{chapter_id}_{year}_{term}"
+
+    @classmethod
+    def signed_this_semester_cached(cls, chapter):
+        """
+        Checked on every officer request by RMPSignMiddleware,
+        kept in the cache until a program is saved for the chapter
+        :return: Bool if the chapter has a program this semester
+        """
+        key = cls.signed_key(
+            chapter.pk, YearTermModel.current_year(), YearTermModel.current_term()
+        )
+        signed = cache.get(key)
+        if signed is None:
+            signed = cls.signed_this_semester(chapter) is not None
+            cache.set(key, signed, cls.SIGNED_TIMEOUT)
+        return signed
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        cache.delete(self.signed_key(self.chapter_id, self.year, self.term))
+
+    def delete(self, *args, **kwargs):
+        out = super().delete(*args, **kwargs)
+        cache.delete(self.signed_key(self.chapter_id, self.year, self.term))
+        return out
+
 
 class PledgeProgramProcess(Process, EmailSignalMixin):
     class APPROVAL(EnumClass):
@@ -660,6 +694,35 @@ def user_signed_this_semester(user):
         signed_before = user.risk_form.filter(date__gte=start, date__lte=end)
         return signed_before
 
+    SIGNED_TIMEOUT = 60 * 60 * 24
+
+    @staticmethod
+    def signed_key(user_id, date):
+        return f"rmp_signed_{user_id}_{date.year}_{YearTermModel.get_term(date)}"
+
+    @classmethod
+    def user_signed_this_semester_cached(cls, user):
+        """
+        Checked on every request by RMPSignMiddleware,
+        kept in the cache until the user signs
+        :return: Bool if the user signed this semester
+        """
+        key = cls.signed_key(user.pk, datetime.date.today())
+        signed = cache.get(key)
+        if signed is None:
+            signed = cls.user_signed_this_semester(user).exists()
+            cache.set(key, signed, cls.SIGNED_TIMEOUT)
+        return signed
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        cache.delete(self.signed_key(self.user_id, self.date))
+
+    def delete(self, *args, **kwargs):
+        out = super().delete(*args, **kwargs)
+        cache.delete(self.signed_key(self.user_id, self.date))
+        return out
+
 
 class Audit(YearTermModel, TimeStampedModel, EmailSignalMixin):
     user = models.ForeignKey(
@@ -697,6 +760,50 @@ class Audit(YearTermModel, TimeStampedModel, EmailSignalMixin):
     def __str__(self):
         return f"Audit for {self.user.chapter} by {self.user}"
 
+    OFFICER_AUDITS_TIMEOUT = 60 * 60 * 24
+
+    @staticmethod
+    def officer_audits_key(chapter_id):
+        return f"audit_officer_audits_{chapter_id}"
+
+    @classmethod
+    def latest_officer_audits(cls, chapter):
+        """
+        The latest audit submitted by each chapter officer role, the role is
+        the one the user held on the day of the audit.
+        One query joining the audits to the roles, kept in the cache until
+        an audit or officer role of the chapter is saved
+        :return: {officer role: Audit}
+        """
+        key = cls.officer_audits_key(chapter.pk)
+        audits = cache.get(key)
+        if audits is None:
+            audits = (
+                cls.objects.annotate(audit_date=TruncDate("modified"))
+                .filter(
+                    user__chapter=chapter,
+                    user__roles__role__in=CHAPTER_OFFICER,
+                    user__roles__start__lte=models.F("audit_date"),
+                    user__roles__end__gte=models.F("audit_date"),
+                )
+                .annotate(officer_role=models.F("user__roles__role"))
+                .order_by("officer_role", "-modified")
+                .distinct("officer_role")
+                .select_related("user")
+            )
+            audits = {audit.officer_role: audit for audit in audits}
+            cache.set(key, audits, cls.OFFICER_AUDITS_TIMEOUT)
+        return audits
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        cache.delete(self.officer_audits_key(self.user.chapter_id))
+
+    def delete(self, *args, **kwargs):
+        out = super().delete(*args, **kwargs)
+        cache.delete(self.officer_audits_key(self.user.chapter_id))
+        return out
+
 
 class Pledge(TimeStampedModel, EmailSignalMixin):
     BOOL_CHOICES = ((True, "Yes"), (False, "No"))
@@ -988,16 +1095,19 @@ def __str__(self):
         return f"Initiation Process for {self.chapter}"
 
     def get_fees(self, chapter, initiation):
-        init_fee = Config.get_value("init_fee_chapter")
+        fees = Config.get_values(
+            ["init_fee_chapter", "init_fee_candidate_chapter", "init_late_fee"]
+        )
+        init_fee = fees["init_fee_chapter"]
         if chapter.candidate_chapter:
-            init_fee = Config.get_value("init_fee_candidate_chapter")
+            init_fee = fees["init_fee_candidate_chapter"]
         late_fee = 0
         init_date = initiation.date
         init_submit = initiation.created.date()
         delta = init_submit - init_date
         if delta.days > 28:
             if not chapter.candidate_chapter:
-                late_fee = Config.get_value("init_late_fee")
+                late_fee = fees["init_late_fee"]
         return float(init_fee), float(late_fee)
 
     def generate_blackbaud_update(self, invoice=False, response=None, file_obj=False):
@@ -0,0 +1,196 @@
+"""
+Roll book pages of an initiation, the page PDFs are rendered in a process pool,
+cached by member and page content and zipped as they finish
+"""
+import hashlib
+import datetime
+import logging
+import multiprocessing
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import weasyprint
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.db.models import Prefetch
+from django.template.loader import render_to_string
+from django_weasyprint.utils import django_url_fetcher
+from users.models import User
+from utils.storages import private_storage
+from .models import Pledge
+
+TEMPLATE = "forms/rollbook_pdf.html"
+PAGE_TIMEOUT = 60 * 60 * 24 * 30
+WORKERS = 4
+# Larger classes are zipped by the rollbook_zip task and emailed
+BACKGROUND_SIZE = 25
+logger = logging.getLogger(__name__)
+
+
+def rollbook_members(members):
+    return members.select_related(
+        "chapter", "major", "address__locality__state"
+    ).prefetch_related(Prefetch("pledge_form", queryset=Pledge.objects.order_by("pk")))
+
+
+def short_oath():
+    with open(r"secrets/short_oath.txt", "r") as file:
+        return file.read()
+
+
+def page_html(user, oath):
+    pledge_forms = list(user.pledge_form.all())
+    return render_to_string(
+        TEMPLATE,
+        {
+            "object": user,
+            "pledge_form": pledge_forms[-1] if pledge_forms else None,
+            "short_oath": oath,
+        },
+    )
+
+
+def rollbook_pages(members):
+    """
+    The page html of each member, rendered here so the pool does not use the db
+    :param members: User queryset
+    :return: [(filename, cache key, html)], the key changes with the page content
+    """
+    oath = short_oath()
+    pages = []
+    for user in rollbook_members(members):
+        html = page_html(user, oath)
+        content_hash = hashlib.sha256(html.encode()).hexdigest()
+        pages.append(
+            (
+                f"RollBookPage_{user.chapter.slug}_{user.id}.pdf",
+                f"rollbook_page_{user.id}_{content_hash}",
+                html,
+            )
+        )
+    return pages
+
+
+def render_pdf(html, base_url):
+    return weasyprint.HTML(
+        string=html, base_url=base_url, url_fetcher=django_url_fetcher
+    ).write_pdf()
+
+
+def pool_workers(workers):
+    if multiprocessing.current_process().daemon:
+        # celery prefork workers are daemons and can not start processes
+        return 1
+    return workers
+
+
+def render_pages(pages, workers=WORKERS):
+    """
+    Cached pages first, the rest as the pool finishes rendering them
+    :param pages: from rollbook_pages
+    :return: generator of (filename, pdf)
+    """
+    base_url = getattr(settings, "WEASYPRINT_BASEURL", settings.CURRENT_URL)
+    cached = cache.get_many([key for _, key, _ in pages])
+    missing = []
+    for filename, key, html in pages:
+        if key in cached:
+            yield filename, cached[key]
+        else:
+            missing.append((filename, key, html))
+    workers = min(pool_workers(workers), len(missing))
+    if workers > 1:
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("fork")
+        ) as executor:
+            futures = {
+                executor.submit(render_pdf, html, base_url): (filename, key)
+                for filename, key, html in missing
+            }
+            for future in as_completed(futures):
+                filename, key = futures[future]
+                pdf = future.result()
+                cache.set(key, pdf, PAGE_TIMEOUT)
+                yield filename, pdf
+    else:
+        for filename, key, html in missing:
+            pdf = render_pdf(html, base_url)
+            cache.set(key, pdf, PAGE_TIMEOUT)
+            yield filename, pdf
+
+
+class ZipStream:
+    """
+    Write only file for zipfile, the written bytes are taken with pop
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def zip_stream(files):
+    """
+    Zip of the (filename, data) files, yielded as each file is added
+    """
+    stream = ZipStream()
+    with zipfile.ZipFile(stream, "w") as zf:
+        for filename, data in files:
+            zf.writestr(filename, data)
+            yield stream.pop()
+    yield stream.pop()
+
+
+def start_rollbook_zip(member_pks, email):
+    from .tasks import rollbook_zip
+
+    try:
+        rollbook_zip.delay(member_pks, email)
+    except Exception:
+        # The requester was told to expect the email, render it here instead
+        logger.exception("Could not start roll book zip, rendering it in the request")
+        save_rollbook_zip(member_pks, email)
+
+
+def save_rollbook_zip(member_pks, email):
+    """
+    Zip the roll book pages to the private storage and email a link that
+    expires after a week
+    """
+    from core.notifications import GenericEmail
+
+    pages = rollbook_pages(User.objects.filter(pk__in=member_pks))
+    time_name = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    with tempfile.TemporaryFile() as file:
+        with zipfile.ZipFile(file, "w") as zf:
+            for filename, pdf in render_pages(pages):
+                zf.writestr(filename, pdf)
+        file.seek(0)
+        name = private_storage.save(
+            f"rollbook/RollBookPages_{time_name}.zip", File(file)
+        )
+    link = private_storage.url(name)
+    GenericEmail(
+        emails={email},
+        subject="Roll book pages",
+        message=(
+            f"The roll book pages of {len(pages)} members are ready, "
+            f'<a href="{link}">download them here</a>. '
+            "The link expires after a week."
+        ),
+        cc=False,
+        reply=False,
+    ).send()
+    return name
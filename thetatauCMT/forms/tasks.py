@@ -0,0 +1,12 @@
+from celery import shared_task
+
+
+@shared_task(name="rollbook_zip")
+def rollbook_zip(member_pks, email):
+    """
+    Roll book pages of a large initiation, zipped to the file storage
+    Started by download_all_rollbook
+    """
+    from .rollbook import save_rollbook_zip
+
+    return save_rollbook_zip(member_pks, email)
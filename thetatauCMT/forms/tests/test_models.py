@@ -0,0 +1,59 @@
+import datetime
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from chapters.tests.factories import ChapterFactory
+from forms.models import Audit, PledgeProgram
+from forms.views import compliance_matrix, missing_chapters
+from .factories import AuditFactory, PledgeProgramFactory
+
+
+@pytest.mark.django_db
+def test_latest_officer_audits(chapter, user_factory):
+    regent = user_factory(chapter=chapter, status="active", make_officer="regent")
+    treasurer = user_factory(chapter=chapter, status="active", make_officer="treasurer")
+    member = user_factory(chapter=chapter, status="active")
+    AuditFactory(user=regent)
+    AuditFactory(user=member)
+    treasurer_audit = AuditFactory(user=treasurer)
+    latest_regent = AuditFactory(user=regent)
+    with CaptureQueriesContext(connection) as queries:
+        audits = Audit.latest_officer_audits(chapter)
+    assert len(queries) == 1
+    assert audits == {"regent": latest_regent, "treasurer": treasurer_audit}
+    assert audits["regent"].user == regent
+    with CaptureQueriesContext(connection) as queries:
+        Audit.latest_officer_audits(chapter)
+    assert not queries
+    newest_regent = AuditFactory(user=regent)
+    assert Audit.latest_officer_audits(chapter)["regent"] == newest_regent
+    # The treasurer role did not cover the audit after all
+    role = treasurer.roles.get(role="treasurer")
+    role.start = datetime.date(2100, 1, 1)
+    role.end = datetime.date(2101, 1, 1)
+    role.save()
+    assert "treasurer" not in Audit.latest_officer_audits(chapter)
+    regent.roles.get(role="regent").delete()
+    assert Audit.latest_officer_audits(chapter) == {}
+
+
+@pytest.mark.django_db
+def test_compliance_matrix():
+    chapters = [ChapterFactory(name=name) for name in ["alpha", "beta", "gamma"]]
+    other = ChapterFactory(name="delta")
+    first = PledgeProgramFactory(chapter=chapters[0], manual="basic")
+    second = PledgeProgramFactory(chapter=chapters[0], manual="other")
+    third = PledgeProgramFactory(chapter=chapters[1], manual="basic")
+    PledgeProgramFactory(chapter=other)
+    forms = PledgeProgram.objects.order_by("pk")
+    with CaptureQueriesContext(connection) as queries:
+        matrix = compliance_matrix(forms, chapters, "manual")
+    assert len(queries) == 1
+    assert matrix == {
+        chapters[0]: {"basic": [first], "other": [second]},
+        chapters[1]: {"basic": [third]},
+        chapters[2]: {},
+    }
+    assert missing_chapters(matrix) == [chapters[2]]
+    values = compliance_matrix(forms.values("chapter_id", "manual"), chapters)
+    assert [len(groups.get(None, [])) for groups in values.values()] == [2, 1, 0]
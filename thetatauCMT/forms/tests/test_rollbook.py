@@ -0,0 +1,41 @@
+import zipfile
+from io import BytesIO
+from forms import rollbook
+
+
+def test_render_pages_cached_and_zipped(monkeypatch):
+    rendered = []
+
+    def render_pdf(html, base_url):
+        rendered.append(html)
+        return html.encode()
+
+    monkeypatch.setattr(rollbook, "render_pdf", render_pdf)
+    pages = [
+        ("RollBookPage_a_1.pdf", "rollbook_page_test_1", "<p>1</p>"),
+        ("RollBookPage_a_2.pdf", "rollbook_page_test_2", "<p>2</p>"),
+    ]
+    expected = {
+        "RollBookPage_a_1.pdf": b"<p>1</p>",
+        "RollBookPage_a_2.pdf": b"<p>2</p>",
+    }
+    assert dict(rollbook.render_pages(pages, workers=1)) == expected
+    assert dict(rollbook.render_pages(pages, workers=1)) == expected
+    assert len(rendered) == 2
+    data = b"".join(rollbook.zip_stream(rollbook.render_pages(pages, workers=1)))
+    with zipfile.ZipFile(BytesIO(data)) as zf:
+        assert {name: zf.read(name) for name in zf.namelist()} == expected
+
+
+def test_start_rollbook_zip_without_broker(monkeypatch):
+    from forms.tasks import rollbook_zip
+
+    saved = []
+
+    def delay(*args):
+        raise ConnectionError("broker unavailable")
+
+    monkeypatch.setattr(rollbook_zip, "delay", delay)
+    monkeypatch.setattr(rollbook, "save_rollbook_zip", lambda *args: saved.append(args))
+    rollbook.start_rollbook_zip([1, 2], "regent@example.com")
+    assert saved == [([1, 2], "regent@example.com")]
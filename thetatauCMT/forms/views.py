@@ -1,4 +1,3 @@
-import csv
 import base64
 import datetime
 import zipfile
@@ -35,7 +34,12 @@
 from django.views.generic.edit import FormView, CreateView, ModelFormMixin
 from django.views.decorators.csrf import csrf_exempt
 from django.shortcuts import redirect
-from django.http import HttpResponseRedirect, HttpResponse, JsonResponse
+from django.http import (
+    HttpResponseRedirect,
+    HttpResponse,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from allauth.account.models import EmailAddress
 from crispy_forms.layout import Submit
 from extra_views import FormSetView, ModelFormSetView
@@ -45,6 +49,7 @@
 from viewflow.frontend.viewset import FlowViewSet
 from viewflow.models import Task as FlowTask
 
+from core.export import export_format, export_response, iterate_queryset, table_values
 from core.flows import FilterProcessListView, AutoAssignUpdateProcessView
 from core.forms import MultiFormsView
 from core.models import (
@@ -181,6 +186,7 @@
     EmailPledgeOfficer,
     EmailProcessUpdate,
 )
+from . import rollbook
 
 
 class FormLanding(LoginRequiredMixin, TemplateView):
@@ -295,25 +301,23 @@ def set_init_date(request):
 @group_required("officer")
 @csrf_exempt
 def download_all_rollbook(request):
-    time_name = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    zip_filename = f"RollBookPages_{time_name}.zip"
     initiate = request.session.get("init-selection", None)
     pledges = request.user.current_chapter.pledges()
     to_roll = pledges.filter(pk__in=initiate["Roll"])
-    zip_io = BytesIO()
-    with zipfile.ZipFile(zip_io, "w") as zf:
-        for user in to_roll:
-            new_request = HttpRequest()
-            new_request.method = "GET"
-            new_request.user = request.user
-            new_request.session = request.session
-            new_request.META = request.META
-            view = RollBookPDFDownload.as_view()
-            roll_view = view(new_request, pk=user.pk)
-            roll_file = roll_view.rendered_content
-            zf.writestr(f"RollBookPage_{user.chapter.slug}_{user.id}.pdf", roll_file)
-    response = HttpResponse(
-        zip_io.getvalue(), content_type="application/x-zip-compressed"
+    if len(initiate["Roll"]) > rollbook.BACKGROUND_SIZE:
+        member_pks = list(to_roll.values_list("pk", flat=True))
+        email = request.user.email
+        transaction.on_commit(lambda: rollbook.start_rollbook_zip(member_pks, email))
+        return HttpResponse(
+            f"The roll book pages of {len(member_pks)} members are being created,"
+            f" a link to download them will be emailed to {email}"
+        )
+    time_name = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    zip_filename = f"RollBookPages_{time_name}.zip"
+    pages = rollbook.rollbook_pages(to_roll)
+    response = StreamingHttpResponse(
+        rollbook.zip_stream(rollbook.render_pages(pages)),
+        content_type="application/x-zip-compressed",
     )
     response["Cache-Control"] = "no-cache"
     response["Content-Disposition"] = f"attachment; filename={zip_filename}"
@@ -889,8 +893,9 @@ def formset_valid(self, formset, delete_only=False):
                 continue
             if instance:
                 instance.end = timezone.now() - timezone.timedelta(days=2)
-                instance.save()
-                delete_list.append(instance.user)
+                delete_list.append(instance)
+        UserRoleChange.save_roles(delete_list)
+        delete_list = [instance.user for instance in delete_list]
         if delete_list:
             messages.add_message(
                 self.request,
@@ -901,24 +906,30 @@ def formset_valid(self, formset, delete_only=False):
             # instances = formset.save(commit=False)
             update_list = []
             officer_list = []
-            for form in formset.forms:
-                if form.changed_data and "DELETE" not in form.changed_data:
-                    form.save()
-                    update_list.append(form.instance.user)
-                    role_name = form.instance.role
-                    if role_name in [
-                        "pledge/new member educator",
-                        "risk management chair",
-                    ]:
-                        Training.add_user(
-                            form.instance.user,
-                            extra_group=role_name,
-                            request=self.request,
-                        )
-                    if role_name in COL_OFFICER_ALIGN:
-                        role_name = COL_OFFICER_ALIGN[role_name]
-                    if role_name in CHAPTER_OFFICER:
-                        officer_list.append(form.instance.user)
+            changed_forms = [
+                form
+                for form in formset.forms
+                if form.changed_data and "DELETE" not in form.changed_data
+            ]
+            UserRoleChange.save_roles(
+                [form.save(commit=False) for form in changed_forms]
+            )
+            for form in changed_forms:
+                update_list.append(form.instance.user)
+                role_name = form.instance.role
+                if role_name in [
+                    "pledge/new member educator",
+                    "risk management chair",
+                ]:
+                    Training.add_user(
+                        form.instance.user,
+                        extra_group=role_name,
+                        request=self.request,
+                    )
+                if role_name in COL_OFFICER_ALIGN:
+                    role_name = COL_OFFICER_ALIGN[role_name]
+                if role_name in CHAPTER_OFFICER:
+                    officer_list.append(form.instance.user)
             Task.mark_complete(
                 name="Officer Election Report",
                 chapter=self.request.user.current_chapter,
@@ -1001,8 +1012,9 @@ def formset_valid(self, formset, delete_only=False):
                 continue
             if instance:
                 instance.end = timezone.now() - timezone.timedelta(days=2)
-                instance.save()
-                delete_list.append(instance.user)
+                delete_list.append(instance)
+        UserRoleChange.save_roles(delete_list)
+        delete_list = [instance.user for instance in delete_list]
         if delete_list:
             messages.add_message(
                 self.request,
@@ -1010,11 +1022,15 @@ def formset_valid(self, formset, delete_only=False):
                 f"You successfully removed the officers:\n" f"{delete_list}",
             )
         if not delete_only:
-            update_list = []
-            for form in formset.forms:
-                if form.changed_data and "DELETE" not in form.changed_data:
-                    form.save()
-                    update_list.append(form.instance.user)
+            changed_forms = [
+                form
+                for form in formset.forms
+                if form.changed_data and "DELETE" not in form.changed_data
+            ]
+            UserRoleChange.save_roles(
+                [form.save(commit=False) for form in changed_forms]
+            )
+            update_list = [form.instance.user for form in changed_forms]
             if update_list:
                 for user in update_list:
                     Training.add_user_ed(user, self.request)
@@ -1060,27 +1076,20 @@ def get_table(self, **kwargs):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         active_chapters, dates = active_chapters_filter(self.filter)
-        alcohol_drugs = self.object_list.filter(category="alcohol_drugs")
-        harassment = self.object_list.filter(category="harassment")
-        mental = self.object_list.filter(category="mental")
+        matrix = compliance_matrix(self.object_list, active_chapters, "category")
         data = [
             {
                 "chapter__name": chapter.name,
                 "region": chapter.region.name,
-                "alcohol_drugs": [
-                    (program.get_approval_display(), program.report)
-                    for program in alcohol_drugs.filter(chapter=chapter)
-                ],
-                "harassment": [
-                    (program.get_approval_display(), program.report)
-                    for program in harassment.filter(chapter=chapter)
-                ],
-                "mental": [
-                    (program.get_approval_display(), program.report)
-                    for program in mental.filter(chapter=chapter)
-                ],
+                **{
+                    category: [
+                        (program.get_approval_display(), program.report)
+                        for program in programs.get(category, [])
+                    ]
+                    for category in ["alcohol_drugs", "harassment", "mental"]
+                },
             }
-            for chapter in active_chapters
+            for chapter, programs in matrix.items()
         ]
         table = HSEducationListTable(data=data)
         RequestConfig(self.request, paginate={"per_page": 300}).configure(table)
@@ -1268,11 +1277,6 @@ def get_context_data(self, **kwargs):
         return context
 
 
-class RollBookPDFDownload(RollBookPDFView):
-    def get_pdf_filename(self):
-        return f"RollBookPage_{self.object.chapter.slug}_{self.object.id}.pdf"
-
-
 def active_chapters_filter(filter_obj):
     chapters_list = Chapter.objects.exclude(active=False)
     region = None
@@ -1291,7 +1295,35 @@ def active_chapters_filter(filter_obj):
         chapters_list = active_chapters.filter(region__in=[region])
     elif region_slug == "candidate_chapter":
         chapters_list = active_chapters.filter(candidate_chapter=True)
-    return chapters_list, dates
+    return chapters_list.select_related("region"), dates
+
+
+def compliance_matrix(forms, chapters, category=None):
+    """
+    Submitted forms for every chapter from one query of the forms,
+    instead of filtering the forms per chapter
+    :param forms: form queryset, model instances or values() with chapter_id
+    :param chapters: chapters to report on, eg. from active_chapters_filter
+    :param category: field to group the forms of a chapter by, default one group
+    :return: {chapter: {category: [forms]}}, the dict is empty for a chapter
+        missing the form. Forms of other chapters are ignored
+    """
+    matrix = {chapter: {} for chapter in chapters}
+    chapter_forms = {chapter.pk: groups for chapter, groups in matrix.items()}
+    for form in forms:
+        if isinstance(form, dict):
+            chapter_pk = form["chapter_id"]
+            group = form[category] if category else None
+        else:
+            chapter_pk = form.chapter_id
+            group = getattr(form, category) if category else None
+        if chapter_pk in chapter_forms:
+            chapter_forms[chapter_pk].setdefault(group, []).append(form)
+    return matrix
+
+
+def missing_chapters(matrix):
+    return [chapter for chapter, groups in matrix.items() if not groups]
 
 
 class RiskManagementListView(
@@ -1305,17 +1337,11 @@ class RiskManagementListView(
     formhelper_class = RiskListFormHelper
 
     def get(self, request, *args, **kwargs):
-        response = super().get(request, *args, **kwargs)
-        if request.GET.get("csv", "False").lower() == "download csv":
-            response = HttpResponse(content_type="text/csv")
-            context = self.get_context_data()
-            time_name = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"ThetaTauRMPstatus_{time_name}.csv"
-            response["Content-Disposition"] = f'attachment; filename="{filename}"'
-            writer = csv.writer(response)
-            for row in context["table"].as_values():
-                writer.writerow(row)
-        return response
+        export = export_format(request)
+        if export:
+            table = self.get_table(**self.get_table_kwargs())
+            return export_response(table_values(table), "ThetaTauRMPstatus", export)
+        return super().get(request, *args, **kwargs)
 
     def get_queryset(self, **kwargs):
         cancel = self.request.GET.get("cancel", False)
@@ -1388,18 +1414,17 @@ class PledgeProgramListView(
     def get(self, request, *args, **kwargs):
         self.object_list = self.get_queryset()
         context = self.get_context_data()
-        if request.GET.get("csv", "False").lower() == "download csv":
-            response = HttpResponse(content_type="text/csv")
-            time_name = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"PledgeProgram_ThetaTauOfficerExport_{time_name}.csv"
-            response["Content-Disposition"] = f'attachment; filename="{filename}"'
-            writer = csv.writer(response)
+        export = export_format(request)
+        if export:
             email_list = context["email_list_table"]
             if email_list:
-                writer.writerow(["Chapter", "Officer Emails"])
-                for chapter, emails in email_list.items():
-                    writer.writerow([chapter, ", ".join(emails)])
-                return response
+                rows = [["Chapter", "Officer Emails"]] + [
+                    [chapter, ", ".join(emails)]
+                    for chapter, emails in email_list.items()
+                ]
+                return export_response(
+                    rows, "PledgeProgram_ThetaTauOfficerExport", export
+                )
             else:
                 messages.add_message(
                     self.request,
@@ -1448,6 +1473,7 @@ def get_context_data(self, **kwargs):
             "weeks_left",
             "term",
             "manual",
+            "chapter_id",
             pk=F("process__pk"),
             live_link=F("chapter__nme_file_id"),
             chapter_name=F("chapter__name"),
@@ -1457,20 +1483,8 @@ def get_context_data(self, **kwargs):
         )
         complete = self.filter.form.cleaned_data["complete"]
         if complete in ["0", ""]:
-            form_chapters = all_forms.values_list("chapter__id", flat=True)
-            region_slug = self.filter.form.cleaned_data["region"]
-            region = Region.objects.filter(slug=region_slug).first()
-            active_chapters = Chapter.objects.exclude(active=False)
-            if region:
-                missing_chapters = active_chapters.exclude(id__in=form_chapters).filter(
-                    region__in=[region]
-                )
-            elif region_slug == "candidate_chapter":
-                missing_chapters = active_chapters.exclude(id__in=form_chapters).filter(
-                    candidate_chapter=True
-                )
-            else:
-                missing_chapters = active_chapters.exclude(id__in=form_chapters)
+            active_chapters, _ = active_chapters_filter(self.filter)
+            matrix = compliance_matrix(all_forms, active_chapters)
             missing_data = [
                 {
                     "chapter_name": chapter.name,
@@ -1489,7 +1503,7 @@ def get_context_data(self, **kwargs):
                     "approval": "not_submitted",
                     "pk": None,
                 }
-                for chapter in missing_chapters
+                for chapter in missing_chapters(matrix)
             ]
             if complete == "0":  # Incomplete
                 # These are old forms that did not have approval as an option
@@ -2114,42 +2128,11 @@ class ConventionListView(
     def get(self, request, *args, **kwargs):
         self.object_list = self.get_queryset()
         context = self.get_context_data()
-        if request.GET.get("csv", "False").lower() == "download csv":
-            response = HttpResponse(content_type="text/csv")
-            time_name = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"ThetaTauConvention_{time_name}.csv"
-            response["Content-Disposition"] = f'attachment; filename="{filename}"'
-            writer = csv.writer(response)
+        export = export_format(request)
+        if export:
             emails = context["email_list"]
             if emails != "":
-                writer.writerow(
-                    [
-                        "Chapter",
-                        "Region",
-                        "School",
-                        "Role",
-                        "Name",
-                        "Email",
-                        "Phone Number",
-                        "Address",
-                    ]
-                )
-                for form in self.object_list:
-                    for user_type in ["delegate", "alternate"]:
-                        user = getattr(form, user_type)
-                        writer.writerow(
-                            [
-                                form.chapter,
-                                form.chapter.region,
-                                form.chapter.school,
-                                user_type,
-                                user.name,
-                                user.email,
-                                user.phone_number,
-                                user.address,
-                            ]
-                        )
-                return response
+                return export_response(self.export_rows(), "ThetaTauConvention", export)
             else:
                 messages.add_message(
                     self.request,
@@ -2158,6 +2141,36 @@ def get(self, request, *args, **kwargs):
                 )
         return self.render_to_response(context)
 
+    def export_rows(self):
+        yield [
+            "Chapter",
+            "Region",
+            "School",
+            "Role",
+            "Name",
+            "Email",
+            "Phone Number",
+            "Address",
+        ]
+        forms = self.object_list.select_related(
+            "chapter__region",
+            "delegate__address__locality__state",
+            "alternate__address__locality__state",
+        )
+        for form in iterate_queryset(forms):
+            for user_type in ["delegate", "alternate"]:
+                user = getattr(form, user_type)
+                yield [
+                    form.chapter,
+                    form.chapter.region,
+                    form.chapter.school,
+                    user_type,
+                    user.name,
+                    user.email,
+                    user.phone_number,
+                    user.address,
+                ]
+
     def get_queryset(self, **kwargs):
         qs = Convention.objects.all()
         cancel = self.request.GET.get("cancel", False)
@@ -2185,7 +2198,9 @@ def get_table(self, **kwargs):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        all_forms = self.object_list
+        all_forms = self.object_list.select_related(
+            "chapter__region", "delegate", "alternate"
+        )
         data = [
             {
                 "chapter": form.chapter.name,
@@ -2199,20 +2214,8 @@ def get_context_data(self, **kwargs):
         ]
         complete = self.filter.form.cleaned_data["complete"]
         if complete in ["0", ""]:
-            form_chapters = all_forms.values_list("chapter__id", flat=True)
-            region_slug = self.filter.form.cleaned_data["region"]
-            region = Region.objects.filter(slug=region_slug).first()
-            active_chapters = Chapter.objects.exclude(active=False)
-            if region:
-                missing_chapters = active_chapters.exclude(id__in=form_chapters).filter(
-                    region__in=[region]
-                )
-            elif region_slug == "candidate_chapter":
-                missing_chapters = active_chapters.exclude(id__in=form_chapters).filter(
-                    candidate_chapter=True
-                )
-            else:
-                missing_chapters = active_chapters.exclude(id__in=form_chapters)
+            active_chapters, _ = active_chapters_filter(self.filter)
+            matrix = compliance_matrix(all_forms, active_chapters)
             missing_data = [
                 {
                     "chapter": chapter.name,
@@ -2222,7 +2225,7 @@ def get_context_data(self, **kwargs):
                     "term": None,
                     "year": None,
                 }
-                for chapter in missing_chapters
+                for chapter in missing_chapters(matrix)
             ]
             if complete == "0":  # Incomplete
                 data = missing_data
@@ -2588,42 +2591,11 @@ class OSMListView(LoginRequiredMixin, NatOfficerRequiredMixin, PagedFilteredTabl
     def get(self, request, *args, **kwargs):
         self.object_list = self.get_queryset()
         context = self.get_context_data()
-        if request.GET.get("csv", "False").lower() == "download csv":
-            response = HttpResponse(content_type="text/csv")
-            time_name = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"ThetaTau_OSM_{time_name}.csv"
-            response["Content-Disposition"] = f'attachment; filename="{filename}"'
-            writer = csv.writer(response)
+        export = export_format(request)
+        if export:
             emails = context["email_list"]
             if emails != "":
-                writer.writerow(
-                    [
-                        "Chapter",
-                        "Region",
-                        "School",
-                        "Role",
-                        "Name",
-                        "Email",
-                        "Phone Number",
-                        "Address",
-                    ]
-                )
-                for form in self.object_list:
-                    for user_type in ["nominate"]:
-                        user = getattr(form, user_type)
-                        writer.writerow(
-                            [
-                                form.chapter,
-                                form.chapter.region,
-                                form.chapter.school,
-                                user_type,
-                                user.name,
-                                user.email,
-                                user.phone_number,
-                                user.address,
-                            ]
-                        )
-                return response
+                return export_response(self.export_rows(), "ThetaTau_OSM", export)
             else:
                 messages.add_message(
                     self.request,
@@ -2632,6 +2604,34 @@ def get(self, request, *args, **kwargs):
                 )
         return self.render_to_response(context)
 
+    def export_rows(self):
+        yield [
+            "Chapter",
+            "Region",
+            "School",
+            "Role",
+            "Name",
+            "Email",
+            "Phone Number",
+            "Address",
+        ]
+        forms = self.object_list.select_related(
+            "chapter__region", "nominate__address__locality__state"
+        )
+        for form in iterate_queryset(forms):
+            for user_type in ["nominate"]:
+                user = getattr(form, user_type)
+                yield [
+                    form.chapter,
+                    form.chapter.region,
+                    form.chapter.school,
+                    user_type,
+                    user.name,
+                    user.email,
+                    user.phone_number,
+                    user.address,
+                ]
+
     def get_queryset(self, **kwargs):
         qs = OSM.objects.all()
         cancel = self.request.GET.get("cancel", False)
@@ -2659,7 +2659,7 @@ def get_table(self, **kwargs):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        all_forms = self.object_list
+        all_forms = self.object_list.select_related("chapter__region", "nominate")
         data = [
             {
                 "chapter": form.chapter.name,
@@ -2672,20 +2672,8 @@ def get_context_data(self, **kwargs):
         ]
         complete = self.filter.form.cleaned_data["complete"]
         if complete in ["0", ""]:
-            form_chapters = all_forms.values_list("chapter__id", flat=True)
-            region_slug = self.filter.form.cleaned_data["region"]
-            region = Region.objects.filter(slug=region_slug).first()
-            active_chapters = Chapter.objects.exclude(active=False)
-            if region:
-                missing_chapters = active_chapters.exclude(id__in=form_chapters).filter(
-                    region__in=[region]
-                )
-            elif region_slug == "candidate_chapter":
-                missing_chapters = active_chapters.exclude(id__in=form_chapters).filter(
-                    candidate_chapter=True
-                )
-            else:
-                missing_chapters = active_chapters.exclude(id__in=form_chapters)
+            active_chapters, _ = active_chapters_filter(self.filter)
+            matrix = compliance_matrix(all_forms, active_chapters)
             missing_data = [
                 {
                     "chapter": chapter.name,
@@ -2694,7 +2682,7 @@ def get_context_data(self, **kwargs):
                     "term": None,
                     "year": None,
                 }
-                for chapter in missing_chapters
+                for chapter in missing_chapters(matrix)
             ]
             if complete == "0":  # Incomplete
                 data = missing_data
@@ -3210,9 +3198,10 @@ def get_context_data(self, **kwargs):
         bylaws = (
             Bylaws.objects.order_by("chapter__id", "-created")
             .distinct("chapter__id")
-            .filter(chapter__id__in=active_chapters.values_list("id", flat=True))
+            .filter(chapter__in=active_chapters)
+            .select_related("chapter__region")
         )
-        bylaws_chapters = bylaws.values_list("chapter__id", flat=True)
+        matrix = compliance_matrix(bylaws, active_chapters)
 
         class Missing:
             name = ""
@@ -3225,9 +3214,13 @@ class Missing:
                 "chapter": chapter.name,
                 "chapter.region": chapter.region.name,
             }
-            for chapter in active_chapters.exclude(id__in=bylaws_chapters)
+            for chapter in missing_chapters(matrix)
         ]
-        data = list(bylaws) + missing_data
+        data = [
+            chapter_bylaws
+            for groups in matrix.values()
+            for chapter_bylaws in groups.get(None, [])
+        ] + missing_data
         table = BylawsListTable(data=data, chapter=True, order_by="chapter")
         context["table"] = table
         return context
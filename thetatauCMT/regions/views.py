@@ -1,17 +1,13 @@
 import jwt
-import csv
 import time
-import datetime
-from collections import defaultdict
 from django.conf import settings
-from django.http import HttpResponse
 from django.contrib import messages
 from django.urls import reverse
 from django.http.request import QueryDict
-from django.db import models
 from django.views.generic import DetailView, ListView, RedirectView
 import django_tables2 as tables
 from django_tables2.utils import A
+from core.export import export_format, export_response, table_values
 from core.views import NatOfficerRequiredMixin, RequestConfig, LoginRequiredMixin
 from .models import Region
 from tasks.models import TaskDate
@@ -25,6 +21,40 @@
 from users.forms import UserRoleListFormHelper, AdvisorListFormHelper
 
 
+def roster_emails(members):
+    """
+    Comma separated emails without duplicates, in roster order
+    """
+    return ", ".join(dict.fromkeys(member.email for member in members if member.email))
+
+
+def roster_table(members, admin=False):
+    return UserTable(
+        data=members,
+        natoff=True,
+        admin=admin,
+        extra_columns=[
+            (
+                "chapter",
+                tables.LinkColumn("chapters:detail", args=[A("chapter.slug")]),
+            ),
+            ("chapter.region", tables.Column("Region")),
+            ("chapter.school", tables.Column("School")),
+        ],
+    )
+
+
+def roster_export(request, members, export):
+    """
+    Export of the members with an email, ordered like the table on the page
+    """
+    table = roster_table(
+        [member for member in members if member.email], request.user.is_superuser
+    )
+    RequestConfig(request, paginate=False).configure(table)
+    return export_response(table_values(table), "ThetaTauOfficerExport", export)
+
+
 class RegionOfficerView(LoginRequiredMixin, NatOfficerRequiredMixin, DetailView):
     model = Region
     slug_field = "slug"
@@ -36,19 +66,10 @@ class RegionOfficerView(LoginRequiredMixin, NatOfficerRequiredMixin, DetailView)
     def get(self, request, *args, **kwargs):
         self.object = kwargs["slug"]
         context = self.get_context_data(object=kwargs["slug"])
-        if request.GET.get("csv", "False").lower() == "download csv":
-            response = HttpResponse(content_type="text/csv")
-            time_name = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"ThetaTauOfficerExport_{time_name}.csv"
-            response["Content-Disposition"] = f'attachment; filename="{filename}"'
-            writer = csv.writer(response)
-            emails = context["email_list"]
-            if emails != "":
-                writer.writerow(context["table"].columns.names())
-                for row in context["table"].as_values():
-                    if row[4] and row[4] in emails:
-                        writer.writerow(row)
-                return response
+        export = export_format(request)
+        if export:
+            if context["email_list"] != "":
+                return roster_export(request, self.members, export)
             else:
                 messages.add_message(
                     self.request,
@@ -87,32 +108,16 @@ def get_context_data(self, **kwargs):
                 chapters = active_chapters.filter(region__in=[region])
             elif region_slug == "candidate_chapter":
                 chapters = active_chapters.filter(candidate_chapter=True)
-        all_chapter_officers = User.objects.none()
-        for chapter in chapters:
-            chapter_officers = chapter.get_current_officers()
-            all_chapter_officers = chapter_officers | all_chapter_officers
         self.filter = self.filter_class(
-            request_get, queryset=all_chapter_officers, request=self.request
+            request_get,
+            queryset=User.objects.roster(chapters),
+            request=self.request,
         )
         self.filter.form.helper = self.formhelper_class()
-        email_list = ", ".join(
-            [x[0] for x in self.filter.qs.values_list("email").distinct()]
-        )
+        self.members = list(self.filter.qs)
+        email_list = roster_emails(self.members)
         self.filter.form.fields["chapter"].queryset = chapters
-        admin = self.request.user.is_superuser
-        table = UserTable(
-            data=self.filter.qs,
-            natoff=True,
-            admin=admin,
-            extra_columns=[
-                (
-                    "chapter",
-                    tables.LinkColumn("chapters:detail", args=[A("chapter.slug")]),
-                ),
-                ("chapter.region", tables.Column("Region")),
-                ("chapter.school", tables.Column("School")),
-            ],
-        )
+        table = roster_table(self.members, self.request.user.is_superuser)
         RequestConfig(self.request, paginate={"per_page": 50}).configure(table)
         context["table"] = table
         context["filter"] = self.filter
@@ -132,21 +137,10 @@ class RegionAdvisorView(LoginRequiredMixin, NatOfficerRequiredMixin, DetailView)
     def get(self, request, *args, **kwargs):
         self.object = kwargs["slug"]
         context = self.get_context_data(object=kwargs["slug"])
-        if request.GET.get("csv", "False").lower() == "download csv":
-            response = HttpResponse(content_type="text/csv")
-            time_name = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"ThetaTauOfficerExport_{time_name}.csv"
-            response["Content-Disposition"] = f'attachment; filename="{filename}"'
-            writer = csv.writer(response)
-            emails = context["email_list"]
-            if emails != "":
-                writer.writerow(context["table"].columns.names())
-                email_index = context["table"].columns.names().index("email")
-                for row in context["table"].as_values():
-                    if row[email_index]:
-                        if row[email_index] in emails:
-                            writer.writerow(row)
-                return response
+        export = export_format(request)
+        if export:
+            if context["email_list"] != "":
+                return roster_export(request, self.members, export)
             else:
                 messages.add_message(
                     self.request,
@@ -175,29 +169,14 @@ def get_context_data(self, **kwargs):
                 chapters = active_chapters.filter(region__in=[region])
             elif region_slug == "candidate_chapter":
                 chapters = active_chapters.filter(candidate_chapter=True)
-        all_chapter_advisors = User.objects.none()
-        for chapter in chapters:
-            all_chapter_advisors = chapter.advisors | all_chapter_advisors
-        self.filter = self.filter_class(request_get, queryset=all_chapter_advisors)
-        self.filter.form.helper = self.formhelper_class()
-        email_list = ", ".join(
-            [x[0] for x in self.filter.qs.values_list("email").distinct()]
+        self.filter = self.filter_class(
+            request_get, queryset=User.objects.roster(chapters, advisors=True)
         )
+        self.filter.form.helper = self.formhelper_class()
+        self.members = list(self.filter.qs)
+        email_list = roster_emails(self.members)
         self.filter.form.fields["chapter"].queryset = chapters
-        admin = self.request.user.is_superuser
-        table = UserTable(
-            data=self.filter.qs,
-            natoff=True,
-            admin=admin,
-            extra_columns=[
-                (
-                    "chapter",
-                    tables.LinkColumn("chapters:detail", args=[A("chapter.slug")]),
-                ),
-                ("chapter.region", tables.Column("Region")),
-                ("chapter.school", tables.Column("School")),
-            ],
-        )
+        table = roster_table(self.members, self.request.user.is_superuser)
         table.exclude = (
             "badge_number",
             "major",
@@ -258,56 +237,31 @@ def get_context_data(self, **kwargs):
             request_get = QueryDict()
         self.filter = self.filter_class(request_get, queryset=qs)
         self.filter.form.helper = self.formhelper_class()
-        all_chapters_tasks = {
-            task.pk: defaultdict(lambda: None) for task in self.filter.qs
-        }
-        [
-            all_chapters_tasks[task.id].update(
-                {
-                    "task_name": task.task.name,
-                    "task_owner": task.task.owner,
-                    "school_type": task.school_type,
-                    "date": task.date,
-                }
-            )
-            for task in self.filter.qs
-        ]
+        task_dates = list(self.filter.qs.select_related("task"))
+        chapters = list(self.object.chapters.all())
+        matrix = TaskDate.completion_matrix(chapters, task_dates)
         extra_columns = []
-        for chapter in self.object.chapters.all():
-            qs = TaskDate.dates_for_chapter(chapter)
-            chapter_name = chapter.name.replace(" ", "_")
-            column_link = f"{chapter_name}_complete_link"
-            qs = qs.annotate(
-                **{
-                    column_link: models.Case(
-                        models.When(
-                            models.Q(chapters__chapter=chapter),
-                            models.F("chapters__pk"),
-                        ),
-                        default=models.Value(0),
-                    )
-                }
-            )
-            qs = qs.distinct()
-            # Distinct sees incomplete/complete as different, so need to combine
-            complete = qs.exclude(**{column_link: 0})
-            incomplete = qs.filter(**{column_link: 0})
-            all_tasks = complete | incomplete
-            chapter_task_dict = all_tasks.values("pk", column_link)
-            [
-                all_chapters_tasks[chapter_task["id"]].update(chapter_task)
-                for chapter_task in chapter_task_dict.values()
-                if chapter_task["id"] in all_chapters_tasks
-            ]
+        column_links = {}
+        for chapter in chapters:
+            column_link = f"{chapter.name.replace(' ', '_')}_complete_link"
+            column_links[chapter.pk] = column_link
             extra_columns.append(
                 (
                     column_link,
-                    TaskLinkColumn(
-                        verbose_name=chapter_name.replace("_", " "), empty_values=()
-                    ),
+                    TaskLinkColumn(verbose_name=chapter.name, empty_values=()),
                 )
             )
-        all_chapters_tasks = all_chapters_tasks.values()
+        all_chapters_tasks = []
+        for task in task_dates:
+            chapter_tasks = {
+                "task_name": task.task.name,
+                "task_owner": task.task.owner,
+                "school_type": task.school_type,
+                "date": task.date,
+            }
+            for chapter_pk, task_chapter in matrix[task.pk].items():
+                chapter_tasks[column_links[chapter_pk]] = task_chapter
+            all_chapters_tasks.append(chapter_tasks)
         table = RegionChapterTaskTable(
             data=all_chapters_tasks, extra_columns=extra_columns
         )
@@ -0,0 +1,87 @@
+"""
+Safe evaluation of the ScoreType.special formulas
+eg. 25*((GUESTS/100)*HOST+memberATT*(HOST-1)*(HOST-1)+(MILES/1000))
+
+The formula is parsed once into closures of the allowed arithmetic,
+nothing is ever passed to eval.
+"""
+
+import ast
+import operator
+from functools import lru_cache
+
+BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Pow: operator.pow,
+}
+
+UNARY_OPERATORS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+
+class FormulaError(ValueError):
+    pass
+
+
+class Formula:
+    def __init__(self, text):
+        self.text = text
+        self.names = set()
+        try:
+            tree = ast.parse(text.strip(), mode="eval")
+        except SyntaxError as e:
+            raise FormulaError(f"Could not parse formula '{text}': {e}")
+        self._evaluate = self._compile(tree.body)
+
+    def __repr__(self):
+        return f"Formula({self.text!r})"
+
+    def _compile(self, node):
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            value = node.value
+            return lambda variables: value
+        if isinstance(node, ast.Name):
+            name = node.id
+            self.names.add(name)
+            return lambda variables: variables[name]
+        if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+            op = BINARY_OPERATORS[type(node.op)]
+            left = self._compile(node.left)
+            right = self._compile(node.right)
+            return lambda variables: op(left(variables), right(variables))
+        if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+            op = UNARY_OPERATORS[type(node.op)]
+            operand = self._compile(node.operand)
+            return lambda variables: op(operand(variables))
+        raise FormulaError(
+            f"'{ast.dump(node)}' is not allowed in formula '{self.text}'"
+        )
+
+    def evaluate(self, **variables):
+        missing = self.names - set(variables)
+        if missing:
+            raise FormulaError(
+                f"Formula '{self.text}' is missing values for {sorted(missing)}"
+            )
+        return self._evaluate(variables)
+
+    def evaluate_many(self, variables_list):
+        """
+        Evaluate for many sets of variables, eg. every event being rescored
+        :return: list of values in the same order
+        """
+        return [self.evaluate(**variables) for variables in variables_list]
+
+
+@lru_cache(maxsize=256)
+def compile_formula(text):
+    """
+    Compiled formulas are kept per formula text, so a ScoreType keeps
+    its compiled form until the special is changed
+    """
+    return Formula(text)
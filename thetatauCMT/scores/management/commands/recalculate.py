@@ -14,16 +14,20 @@ def add_arguments(self, parser):
         parser.add_argument("score_type", nargs=1, type=str)
         parser.add_argument("year", nargs=1, type=str)
         parser.add_argument("-chapter", nargs=1, type=str)
+        parser.add_argument("-bulk", action="store_true")
 
     # A command must define handle()
     def handle(self, *args, **options):
         """
         python manage.py recalculate meetings -chapter zeta
+        Set based recalculation, score_type all is every event/submission type
+        python manage.py recalculate all 2023 -bulk
         """
         print(options)
         chapter_only = options.get("chapter", None)
         score_type = options.get("score_type", [None])[0]
         year = int(options.get("year", [BIENNIUM_START])[0])
+        bulk = options.get("bulk", False)
         print(f"Recalculating for score_type {score_type}")
         if score_type is None:
             print("You must supply score_type")
@@ -34,7 +38,17 @@ def handle(self, *args, **options):
             print(f"Recalculating for chapter {chapters}")
         else:
             chapters = Chapter.objects.filter(active=True)
-        score_type = ScoreType.objects.get(slug=score_type)
+        if score_type == "all":
+            bulk = True
+            score_types = None
+        else:
+            score_types = ScoreType.objects.filter(slug=score_type)
+        if bulk:
+            ScoreType.recalculate_scores(
+                chapters, datetime.date(year, 8, 1), score_types=score_types
+            )
+            return
+        score_type = score_types.get()
         for chapter in chapters:
             print(chapter)
             if score_type.type == "Evt":
@@ -80,7 +80,7 @@ def handle(self, *args, **options):
 
                     # Membership
                     # 50 * (Current_Size *  # Initiated) / (# Graduating_Members * 2)
-                    current_size = chapter.get_actives_for_date(date).count()
+                    current_size = chapter.get_actives_count_for_date(date)
                     current_size = current_size if current_size else 1
                     graduated = max([chapter.graduates(date).count(), 1])
                     membership_score = min(
@@ -1,10 +1,16 @@
+import time
 import datetime
 from enum import Enum
 from django.db import models
 from django.db.models import Sum
 from django.db.models.functions import Round
-from core.models import YearTermModel, BIENNIUM_YEARS
+from core.models import (
+    YearTermModel,
+    BIENNIUM_YEARS,
+    semester_encompass_start_end_date,
+)
 from chapters.models import Chapter
+from .formula import compile_formula
 
 
 class ScoreType(models.Model):
@@ -101,100 +107,86 @@ def chapter_score(self, chapter, date=None):
     def annotate_chapter_score(cls, chapter, start_year=None, qs=None):
         if qs is None:
             qs = cls.objects.all()
-        if start_year is None:
-            start_year = BIENNIUM_YEARS[0]
-        start_year = int(start_year)
-        scores_values = qs.filter(
-            chapters__chapter=chapter,
-            chapters__year__gte=start_year,
-            chapters__year__lte=start_year + 2,
-        ).values("chapters__year", "chapters__score", "chapters__term", "id")
-        score_values_ids = set(scores_values.values_list("id", flat=True))
+        matrix = ScoreChapter.score_matrix(
+            chapters=[chapter], start_year=start_year, score_types=qs
+        ).get(chapter.pk, {})
         score_types = qs.all().values(
             "type", "points", "section", "description", "name", "slug", "id"
         )
         score_types_out = []
         for score_info in score_types:
-            if score_info["id"] in score_values_ids:
-                for score_value in scores_values.filter(id=score_info["id"]):
-                    year = score_value["chapters__year"] - start_year
-                    term = score_value["chapters__term"]
-                    # if year = 0 or 2 continue
-                    offset = {0: 1, 2: 4}
-                    if year in offset:
-                        if year == 0 and term == "sp":
-                            continue
-                        elif year == 2 and term == "fa":
-                            continue
-                        offset = offset[year]
-                    else:
-                        offset = {"fa": 3, "sp": 2}[term]
-                    score_info[f"score{offset}"] = score_value["chapters__score"]
-            total = 0.0
-            for key in ["score1", "score2", "score3", "score4"]:
-                if key not in score_info:
-                    score_info[key] = 0.0
-                else:
-                    total += score_info[key]
-            score_info["total"] = total
+            scores = matrix.get(score_info["id"], ScoreChapter.empty_scores())
+            score_info.update(
+                {key: value for key, value in scores.items() if key != "section"}
+            )
             score_types_out.append(score_info)
         return score_types_out
 
-    def calculate_special(self, obj, extra_info=None):
-        formula_out = self.special
-        calcualted_elsewhere = [
-            "HOURS",
-            "GPA",
-            "MEMBERS",
-            "PLEDGE",
-            "OFFICER",
-        ]
-        if any(x in formula_out for x in calcualted_elsewhere):
-            # All these should be calculated somewhere else
-            formula_out = 0
-            return formula_out
-        # We do not create dict/list to loop and do this
-        # b/c obj may not contain info
-        if "GUESTS" in formula_out:
-            formula_out = formula_out.replace("GUESTS", str(obj.guests))
-        if "HOST" in formula_out:
-            formula_out = formula_out.replace("HOST", str(obj.host))
-        if "MILES" in formula_out:
-            formula_out = formula_out.replace("MILES", str(obj.miles))
-        if "memberATT" in formula_out:
-            actives = obj.chapter.get_actives_for_date(obj.date).count()
+    CALCULATED_ELSEWHERE = [
+        "HOURS",
+        "GPA",
+        "MEMBERS",
+        "PLEDGE",
+        "OFFICER",
+    ]
+
+    @property
+    def special_formula(self):
+        return compile_formula(self.special)
+
+    def special_variables(self, obj, extra_info=None, actives=None):
+        """
+        Values for the names used in the special formula
+        We do not read every name b/c obj may not contain info
+        """
+        names = self.special_formula.names
+        variables = {}
+        if "GUESTS" in names:
+            variables["GUESTS"] = obj.guests
+        if "HOST" in names:
+            variables["HOST"] = obj.host
+        if "MILES" in names:
+            variables["MILES"] = obj.miles
+        if "memberATT" in names:
+            if actives is None:
+                actives = obj.chapter.get_actives_count_for_date(obj.date)
             # obj.date  # get_semester
             percent_attendance = 0
             if actives:
                 percent_attendance = min(obj.members / actives, 1)
-            formula_out = formula_out.replace("memberATT", str(percent_attendance))
-        if "MEETINGS" in formula_out:
-            return obj.calculate_meeting_attendance(obj.chapter, obj.date)
-        if "MODIFIED" in formula_out:
+            variables["memberATT"] = percent_attendance
+        if "MODIFIED" in names or "UNMODIFIED" in names:
             # 20*UNMODIFIED+10*MODIFIED
             if extra_info is not None:
                 unmodified = extra_info.get("unmodified", False)
             else:
                 unmodified = True
-            if unmodified:
-                unmod = 1
-                mod = 0
-            else:
-                unmod = 0
-                mod = 1
-            formula_out = formula_out.replace("UNMODIFIED", str(unmod))
-            formula_out = formula_out.replace("MODIFIED", str(mod))
-        return round(eval(formula_out), 2)
+            variables["UNMODIFIED"] = 1 if unmodified else 0
+            variables["MODIFIED"] = 0 if unmodified else 1
+        return variables
 
-    def calculate_score(self, obj, extra_info=None):
+    def calculate_special(self, obj, extra_info=None, actives=None):
+        if any(x in self.special for x in self.CALCULATED_ELSEWHERE):
+            # All these should be calculated somewhere else
+            return 0
+        if "MEETINGS" in self.special_formula.names:
+            return obj.calculate_meeting_attendance(obj.chapter, obj.date)
+        variables = self.special_variables(obj, extra_info=extra_info, actives=actives)
+        return round(self.special_formula.evaluate(**variables), 2)
+
+    def calculate_score(self, obj, extra_info=None, actives=None):
+        """
+        :param actives: number of actives on obj.date, queried if not given
+        """
         total_score = 0
         if self.special and self.special != "0":
-            return self.calculate_special(obj, extra_info=extra_info)
+            return self.calculate_special(obj, extra_info=extra_info, actives=actives)
         # Some events have base points just for having event
         total_score += self.base_points
         if self.type == "Evt":
             total_score += obj.members * self.member_add
-            actives = obj.chapter.get_actives_for_date(obj.date).count()
+            if actives is None:
+                actives = obj.chapter.get_actives_count_for_date(obj.date)
             # obj.date  # get_semester
             percent_attendance = 0
             if actives:
@@ -207,6 +199,92 @@ def calculate_score(self, obj, extra_info=None):
             total_score += obj.stem * self.stem_add
         return round(total_score, 2)
 
+    @classmethod
+    def recalculate_scores(cls, chapters, start_date, score_types=None, log=print):
+        """
+        Set based version of saving every event/submission with calculate_score
+        Active counts are queried once per chapter, scores are written with
+        bulk_update and ScoreChapter is updated once per (chapter, type, term)
+        :param chapters: chapters to recalculate
+        :param start_date: only events/submissions on or after this date
+        :param score_types: defaults to all event and submission types
+        :return: dict of totals
+        """
+        from events.models import Event
+        from submissions.models import Submission
+
+        if score_types is None:
+            score_types = cls.objects.filter(type__in=["Evt", "Sub"])
+        score_types = {score_type.pk: score_type for score_type in score_types}
+        totals = {"events": 0, "submissions": 0, "chapter_scores": 0}
+        chapters = list(chapters)
+        run_start = time.perf_counter()
+        for count, chapter in enumerate(chapters, 1):
+            chapter_start = time.perf_counter()
+            events = list(
+                Event.objects.filter(
+                    chapter=chapter, type__in=score_types, date__gte=start_date
+                )
+            )
+            submissions = list(
+                Submission.objects.filter(
+                    chapter=chapter, type__in=score_types, date__gte=start_date
+                )
+            )
+            actives_counts = chapter.get_actives_counts_for_dates(
+                [obj.date for obj in events + submissions]
+            )
+            update_events, update_submissions = [], []
+            meeting_dates = {}
+            term_dates = {}
+            for obj in events + submissions:
+                score_type = score_types[obj.type_id]
+                obj.type = score_type
+                obj.chapter = chapter
+                term_dates[
+                    (score_type.pk, obj.date.year, ScoreChapter.get_term(obj.date))
+                ] = obj.date
+                if "MEETINGS" in score_type.special and isinstance(obj, Event):
+                    # The whole semester of meetings is scored together
+                    semester_start, _ = semester_encompass_start_end_date(obj.date)
+                    meeting_dates[semester_start] = obj.date
+                    continue
+                obj.score = score_type.calculate_score(
+                    obj, actives=actives_counts[obj.date]
+                )
+                if isinstance(obj, Event):
+                    update_events.append(obj)
+                else:
+                    update_submissions.append(obj)
+            for date in meeting_dates.values():
+                meetings, event_score = Event.meeting_attendance(chapter, date)
+                for meeting in meetings:
+                    meeting.score = event_score
+                update_events.extend(meetings)
+            Event.objects.bulk_update(update_events, ["score"], batch_size=1000)
+            Submission.objects.bulk_update(
+                update_submissions, ["score"], batch_size=1000
+            )
+            for (score_type_pk, _, _), date in term_dates.items():
+                score_types[score_type_pk].update_chapter_score(chapter, date)
+            totals["events"] += len(update_events)
+            totals["submissions"] += len(update_submissions)
+            totals["chapter_scores"] += len(term_dates)
+            log(
+                f"[{count}/{len(chapters)}] {chapter}: "
+                f"{len(update_events)} events, {len(update_submissions)} submissions, "
+                f"{len(term_dates)} chapter scores "
+                f"in {time.perf_counter() - chapter_start:.2f}s"
+            )
+        totals["seconds"] = round(time.perf_counter() - run_start, 2)
+        log(
+            f"Recalculated {totals['events']} events, "
+            f"{totals['submissions']} submissions, "
+            f"{totals['chapter_scores']} chapter scores "
+            f"in {totals['seconds']}s"
+        )
+        return totals
+
     def update_chapter_score(self, chapter, date):
         """
         This should be separate from calculate_score b/c it needs to include
@@ -279,17 +357,98 @@ class Meta:
     )
     score = models.FloatField(default=0)
 
+    # score slot: (years after biennium start, term)
+    # it is always fall year+0, spring year+1, fall year+1, spring year+2
+    BIENNIUM_SLOTS = {
+        "score1": (0, "fa"),
+        "score2": (1, "sp"),
+        "score3": (1, "fa"),
+        "score4": (2, "sp"),
+    }
+
+    @classmethod
+    def empty_scores(cls):
+        scores = {key: 0.0 for key in cls.BIENNIUM_SLOTS}
+        scores["total"] = 0.0
+        return scores
+
+    @classmethod
+    def score_matrix(cls, chapters=None, start_year=None, score_types=None):
+        """
+        Chapter scores pivoted to score type x biennium semester, one query
+        for any number of chapters
+        :param chapters: chapters queryset or list, all chapters if None
+        :param score_types: score types queryset or list, all types if None
+        :return: {chapter_id: {score_type_id: {
+            "score1": float, ..., "score4": float, "total": float, "section": str
+        }}}
+        """
+        if start_year is None:
+            start_year = BIENNIUM_YEARS[0]
+        start_year = int(start_year)
+        query = cls.objects.filter(year__gte=start_year, year__lte=start_year + 2)
+        if chapters is not None:
+            query = query.filter(chapter__in=chapters)
+        if score_types is not None:
+            query = query.filter(type__in=score_types)
+        slots = {
+            key: models.Sum("score", filter=models.Q(year=start_year + add, term=term))
+            for key, (add, term) in cls.BIENNIUM_SLOTS.items()
+        }
+        rows = (
+            query.values("chapter", "type", "type__section")
+            .annotate(**slots)
+            .order_by()
+        )
+        matrix = {}
+        for row in rows:
+            scores = {key: row[key] or 0.0 for key in slots}
+            scores["total"] = sum(scores.values())
+            scores["section"] = row["type__section"]
+            matrix.setdefault(row["chapter"], {})[row["type"]] = scores
+        return matrix
+
     @classmethod
     def type_score_biennium(cls, date=None, chapters=None):
-        if date is None:
-            query = cls.objects.filter(year__gte=BIENNIUM_YEARS[0]).exclude(
-                year=BIENNIUM_YEARS[0], term="sp"
-            )
-        else:
-            term = ScoreChapter.get_term(date)
-            query = cls.objects.filter(year=date.year, term=term)
         if chapters is None:
             chapters = Chapter.objects.exclude(active=False)
+        if date is not None:
+            return cls.type_score_term(date, chapters)
+        matrix = cls.score_matrix(chapters=chapters)
+        chapters_info = (
+            Chapter.objects.filter(pk__in=matrix)
+            .values("pk", "name", "region__name")
+            .order_by("name")
+        )
+        scores = []
+        for chapter in chapters_info:
+            chapter_dict = {
+                "chapter": chapter["pk"],
+                "chapter_name": chapter["name"],
+                "region": chapter["region__name"],
+                "Bro": 0,
+                "Ops": 0,
+                "Ser": 0,
+                "Pro": 0,
+            }
+            for type_scores in matrix[chapter["pk"]].values():
+                chapter_dict[type_scores["section"]] += type_scores["total"]
+            for section in ["Bro", "Ops", "Ser", "Pro"]:
+                chapter_dict[section] = round(chapter_dict[section], 0)
+            chapter_dict["total"] = round(
+                chapter_dict["Bro"]
+                + chapter_dict["Ops"]
+                + chapter_dict["Ser"]
+                + chapter_dict["Pro"],
+                2,
+            )
+            scores.append(chapter_dict)
+        return scores
+
+    @classmethod
+    def type_score_term(cls, date, chapters):
+        term = ScoreChapter.get_term(date)
+        query = cls.objects.filter(year=date.year, term=term)
         scores = (
             query.filter(chapter__in=chapters)
             .values("chapter", "type__section")
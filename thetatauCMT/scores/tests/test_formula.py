@@ -0,0 +1,26 @@
+import pytest
+from scores.formula import compile_formula, FormulaError
+
+
+def test_formula_evaluate():
+    formula = compile_formula(
+        "25*((GUESTS/100)*HOST+memberATT*(HOST-1)*(HOST-1)+(MILES/1000))"
+    )
+    assert formula.names == {"GUESTS", "HOST", "memberATT", "MILES"}
+    assert formula.evaluate(GUESTS=50, HOST=1, memberATT=0.5, MILES=200) == 17.5
+    assert compile_formula("20*UNMODIFIED+10*MODIFIED").evaluate_many(
+        [{"UNMODIFIED": 1, "MODIFIED": 0}, {"UNMODIFIED": 0, "MODIFIED": 1}]
+    ) == [20, 10]
+
+
+@pytest.mark.parametrize(
+    "text", ["__import__('os')", "HOST.real", "[1, 2]", "HOST if 1 else 2", "1 +"]
+)
+def test_formula_not_allowed(text):
+    with pytest.raises(FormulaError):
+        compile_formula(text)
+
+
+def test_formula_missing_name():
+    with pytest.raises(FormulaError):
+        compile_formula("MEETINGS*10").evaluate()
@@ -0,0 +1,62 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from scores.models import ScoreType, ScoreChapter
+from core.models import BIENNIUM_START
+
+
+@pytest.mark.django_db
+def test_annotate_chapter_score(chapter):
+    score_types = list(ScoreType.objects.all()[:3])
+    slots = [
+        ("score1", BIENNIUM_START, "fa"),
+        ("score2", BIENNIUM_START + 1, "sp"),
+        ("score3", BIENNIUM_START + 1, "fa"),
+        ("score4", BIENNIUM_START + 2, "sp"),
+    ]
+    expected = {}
+    for count, score_type in enumerate(score_types):
+        expected[score_type.pk] = {"total": 0.0}
+        for slot, (key, year, term) in enumerate(slots):
+            score = float(count + slot)
+            ScoreChapter.objects.create(
+                chapter=chapter, type=score_type, year=year, term=term, score=score
+            )
+            expected[score_type.pk][key] = score
+            expected[score_type.pk]["total"] += score
+    # Outside of the biennium
+    ScoreChapter.objects.create(
+        chapter=chapter,
+        type=score_types[0],
+        year=BIENNIUM_START,
+        term="sp",
+        score=100,
+    )
+    with CaptureQueriesContext(connection) as queries:
+        score_list = ScoreType.annotate_chapter_score(chapter)
+    assert len(queries) == 2
+    assert len(score_list) == ScoreType.objects.count()
+    for score_info in score_list:
+        scores = expected.get(score_info["id"], ScoreChapter.empty_scores())
+        for key, value in scores.items():
+            assert score_info[key] == value
+
+
+@pytest.mark.django_db
+def test_type_score_biennium_queries(chapter_factory):
+    score_type = ScoreType.objects.first()
+    for chapter in chapter_factory.create_batch(5):
+        ScoreChapter.objects.create(
+            chapter=chapter,
+            type=score_type,
+            year=BIENNIUM_START,
+            term="fa",
+            score=10,
+        )
+    with CaptureQueriesContext(connection) as queries:
+        scores = list(ScoreChapter.type_score_biennium())
+    assert len(queries) == 2
+    assert len(scores) == 5
+    for score in scores:
+        assert score[score_type.section] == 10
+        assert score["total"] == 10
@@ -1,5 +1,5 @@
 from herald import registry
-from herald.base import EmailNotification
+from core.notifications import EmailNotification
 from django.conf import settings
 
 from configs.models import Config
@@ -229,6 +229,48 @@ def dates_for_chapter(cls, chapter):
         ).all()
         return tasks
 
+    @classmethod
+    def completion_matrix(cls, chapters, task_dates=None):
+        """
+        Task completion for any number of chapters from one query
+        :param chapters: chapters, their school_type decides which dates apply
+        :param task_dates: TaskDate queryset or list, default all
+        :return: {task_date_pk: {chapter_pk: value}} value is the TaskChapter pk,
+            0 if not complete or None if the date does not apply to the chapter
+        """
+        chapters = list(chapters)
+        if task_dates is None:
+            task_dates = cls.objects.all()
+        task_dates = list(task_dates)
+        completed = (
+            TaskChapter.objects.filter(
+                Q(task__school_type=models.F("chapter__school_type"))
+                | Q(task__school_type="all"),
+                chapter__in=chapters,
+                task__in=task_dates,
+            )
+            .order_by()
+            .values("task_id", "chapter_id")
+            .annotate(task_chapter=models.Max("pk"))
+        )
+        completed = {
+            (task_chapter["task_id"], task_chapter["chapter_id"]): task_chapter[
+                "task_chapter"
+            ]
+            for task_chapter in completed
+        }
+        return {
+            task_date.pk: {
+                chapter.pk: (
+                    completed.get((task_date.pk, chapter.pk), 0)
+                    if task_date.school_type in (chapter.school_type, "all")
+                    else None
+                )
+                for chapter in chapters
+            }
+            for task_date in task_dates
+        }
+
 
 class TaskChapter(models.Model, EmailSignalMixin):
     class Meta:
@@ -0,0 +1,31 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from chapters.tests.factories import ChapterFactory
+from tasks.models import TaskDate
+from .factories import TaskChapterFactory
+
+
+@pytest.mark.django_db
+def test_completion_matrix_matches_per_chapter():
+    semester = ChapterFactory(name="alpha", school_type="semester")
+    quarter = ChapterFactory(name="beta", school_type="quarter")
+    chapters = [semester, quarter]
+    for chapter in chapters:
+        for task_date in TaskDate.dates_for_chapter(chapter)[:3]:
+            TaskChapterFactory(task=task_date, chapter=chapter)
+    with CaptureQueriesContext(connection) as queries:
+        matrix = TaskDate.completion_matrix(chapters)
+    assert len(queries) == 2
+    for chapter in chapters:
+        applies = set(TaskDate.dates_for_chapter(chapter).values_list("pk", flat=True))
+        for task_date_pk, chapter_tasks in matrix.items():
+            task_chapter = chapter_tasks[chapter.pk]
+            if task_date_pk not in applies:
+                assert task_chapter is None
+                continue
+            complete = TaskDate.objects.get(pk=task_date_pk).complete(chapter)
+            if complete.exists():
+                assert task_chapter == complete.get().pk
+            else:
+                assert task_chapter == 0
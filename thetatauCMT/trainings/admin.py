@@ -1,6 +1,7 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.http import HttpResponseRedirect
 from django.shortcuts import render
+from .lms import assign_users
 from .models import Training
 from .forms import UserAdminTrainingForm
 
@@ -28,12 +29,20 @@ def assign_training(self, request, queryset):
             if form.is_valid() and not form.errors:
                 extra_group = form.cleaned_data["extra_group"]
                 training_system = form.cleaned_data["training_system"]
-                for user in queryset:
-                    if training_system == "Vector":
-                        Training.add_user(
-                            user, extra_group=extra_group, request=request
-                        )
-                    elif training_system == "ED.thetatau":
+                if training_system == "Vector":
+                    results = assign_users(
+                        queryset.select_related("chapter"), extra_group=extra_group
+                    )
+                    for _, level, message in results:
+                        messages.add_message(request, level, message)
+                    added = sum(level == messages.INFO for _, level, _ in results)
+                    messages.add_message(
+                        request,
+                        messages.INFO,
+                        f"{added} of {len(results)} members added to training system",
+                    )
+                elif training_system == "ED.thetatau":
+                    for user in queryset:
                         Training.add_user_ed(user, request=request)
                 return HttpResponseRedirect(request.get_full_path())
         return render(
@@ -0,0 +1,658 @@
+"""
+Vector LMS GraphQL client, the training progress sync and the bulk training
+assignment, requests are spaced by a rolling window rate limiter shared
+between threads
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import core.requests as requests
+from django.contrib import messages
+from django.core.cache import cache
+from django.core.mail import send_mail
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+from users.models import User
+from .models import Training
+
+LMS_URL = "https://thetatau-tx.vectorlmsedu.com/graphql/"
+# 150 requests per rolling 300 seconds
+RATE_LIMIT = 150
+RATE_PERIOD = 300
+RETRY_AFTER = 120
+MAX_RETRIES = 5
+PAGE_SIZE = 100
+PREFETCH_PAGES = 2
+CURSOR_KEY = "lms_progress_sync_cursor"
+CURSOR_TIMEOUT = 60 * 60 * 24 * 7
+# We want to maintain backwards connection with old training system,
+# so we use the same title/id
+COURSE_TITLE = "CommunityEdu: Fraternity & Sorority Life"
+COURSE_ID = "5d7b72cf-7e22-43a3-a4aa-628d8ee6c1a9"
+PROGRESS_FIELDS = [
+    "progress_id",
+    "course_id",
+    "course_title",
+    "completed",
+    "completed_time",
+    "max_quiz_score",
+    "modified",
+]
+PEOPLE_QUERY = """
+    query
+    {{ People (first: {first} {cursor} active: "1")
+        {{ nodes
+           {{ username
+               first
+               last
+             externalUniqueId
+             personId
+             progress {{
+                completed
+                completeTime
+                courseInfo {{
+                    title
+                    courseInfoId
+                }}
+                progressId
+                maxQuizScore
+                }}
+           }}
+          pageInfo {{
+               count
+               totalCount
+               startCursor
+               endCursor
+               hasNextPage
+               hasPreviousPage
+           }}
+        }}
+    }}
+    """
+
+
+class LMSError(Exception):
+    pass
+
+
+class RateLimiter:
+    """
+    At most limit requests in any period seconds, wait blocks until the
+    next request may be sent and pause holds every request after a 429
+    """
+
+    def __init__(self, limit=RATE_LIMIT, period=RATE_PERIOD):
+        self.limit = limit
+        self.period = period
+        self.sent = deque()
+        self.paused_until = 0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                while self.sent and self.sent[0] <= now - self.period:
+                    self.sent.popleft()
+                delay = self.paused_until - now
+                if delay <= 0:
+                    if len(self.sent) < self.limit:
+                        self.sent.append(now)
+                        return
+                    delay = self.sent[0] + self.period - now
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class LMSClient:
+    """
+    :param header: authentication header, default Training.authenticate_header()
+    :param limiter: RateLimiter, share one between clients of the same account
+    """
+
+    def __init__(self, url=LMS_URL, header=None, limiter=None):
+        self.url = url
+        self.header = header
+        self.limiter = limiter if limiter is not None else RateLimiter()
+
+    def headers(self):
+        if self.header is None:
+            return Training.authenticate_header()
+        return self.header
+
+    def post(self, query):
+        """
+        :return: response json, 429 responses are retried after Retry-After
+        """
+        for _ in range(MAX_RETRIES):
+            self.limiter.wait()
+            response = requests.post(
+                self.url, json={"query": query}, headers=self.headers()
+            )
+            if response.status_code != 429:
+                break
+            retry_after = response.headers.get("Retry-After", "")
+            print("Delaying for rate limit LMS")
+            self.limiter.pause(
+                int(retry_after) if retry_after.isdigit() else RETRY_AFTER
+            )
+        if response.status_code != 200:
+            raise LMSError(
+                f"Training System error: {response.status_code} {response.reason}"
+            )
+        return response.json()
+
+    def people_pages(self, cursor=""):
+        """
+        Pages of active people with their progress, starting after cursor
+        :return: generator of (nodes, pageInfo)
+        """
+        has_next = True
+        while has_next:
+            after = f'after: "{cursor}"' if cursor else ""
+            response_json = self.post(
+                PEOPLE_QUERY.format(first=PAGE_SIZE, cursor=after)
+            )
+            people = response_json["data"]["People"]
+            page_info = people["pageInfo"]
+            yield people["nodes"], page_info
+            has_next = page_info["hasNextPage"]
+            cursor = page_info["endCursor"]
+
+
+def prefetch(iterable, size=PREFETCH_PAGES):
+    """
+    Iterate in a thread up to size items ahead, so the next requests are sent
+    while the current items are processed
+    """
+    items = queue.Queue(maxsize=size)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except Exception as e:
+            put((None, e))
+        put((done, None))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+class UserIndex:
+    """
+    Members of LMS people from one query, a person matches on username, email
+    or school email (case insensitive) of their username or on their
+    externalUniqueId
+    """
+
+    def __init__(self, users=None):
+        if users is None:
+            users = User.objects.all()
+        self.ids = {}
+        self.names = {}
+        for user_pk, username, email, email_school in users.order_by(
+            "last_name", "pk"
+        ).values_list("pk", "username", "email", "email_school"):
+            self.ids[str(user_pk)] = user_pk
+            for name in (username, email, email_school):
+                if name:
+                    self.names.setdefault(name.lower(), user_pk)
+
+    def resolve(self, user_info):
+        user_pk = self.names.get((user_info["username"] or "").lower())
+        if user_pk is None:
+            user_pk = self.ids.get(str(user_info["externalUniqueId"] or "").strip())
+        return user_pk
+
+
+def progress_values(user_info):
+    """
+    Training fields of the full course progress of a person
+    """
+    # The Vector system does not keep track of assignments only
+    # completions so assume assigned to our only training
+    completed = False
+    completed_at = None
+    progress_id = ""
+    max_quiz_score = 0
+    for progress in user_info["progress"] or []:
+        if "(Full Course)" in progress["courseInfo"]["title"]:
+            completed = progress["completed"]
+            completed_at = progress["completeTime"]
+            progress_id = progress["progressId"]
+            max_quiz_score = progress["maxQuizScore"]
+            if not max_quiz_score:
+                max_quiz_score = 100 if completed else 0
+    return dict(
+        progress_id=progress_id,
+        course_id=COURSE_ID,
+        course_title=COURSE_TITLE,
+        completed=completed,
+        completed_time=Training._meta.get_field("completed_time").to_python(
+            completed_at
+        ),
+        max_quiz_score=max_quiz_score,
+    )
+
+
+def save_progress(nodes, index):
+    """
+    Create or update the Training of every person of a page in bulk,
+    duplicate trainings of a member are removed keeping the newest
+    :return: number of members updated
+    """
+    values = {}
+    for user_info in nodes:
+        user_pk = index.resolve(user_info)
+        if user_pk is None:
+            print(f"USER DOES NOT EXIST {user_info}")
+            continue
+        values[user_pk] = progress_values(user_info)
+    if not values:
+        return 0
+    with transaction.atomic():
+        existing = {}
+        duplicates = []
+        for training in Training.objects.filter(
+            user_id__in=values, course_id=COURSE_ID
+        ).order_by("user_id", "-created"):
+            if training.user_id in existing:
+                duplicates.append(training.pk)
+            else:
+                existing[training.user_id] = training
+        if duplicates:
+            Training.objects.filter(pk__in=duplicates).delete()
+        now = timezone.now()
+        updates = []
+        creates = []
+        for user_pk, fields in values.items():
+            training = existing.get(user_pk)
+            if training is None:
+                creates.append(Training(user_id=user_pk, **fields))
+                continue
+            for field, value in fields.items():
+                setattr(training, field, value)
+            # bulk_update does not set auto_now
+            training.modified = now
+            updates.append(training)
+        Training.objects.bulk_update(updates, PROGRESS_FIELDS)
+        Training.objects.bulk_create(creates)
+    return len(values)
+
+
+def sync_progress(client=None, restart=False):
+    """
+    Update the Training of every LMS person, the next pages are fetched while a
+    page is saved and the cursor of the last saved page is kept so a failed
+    sync continues from there
+    :param restart: ignore the saved cursor and start from the first page
+    :return: number of members updated
+    """
+    if client is None:
+        client = LMSClient()
+    cursor = "" if restart else cache.get(CURSOR_KEY, "")
+    if cursor:
+        print(f"Continuing training sync after {cursor}")
+    index = UserIndex()
+    synced = 0
+    for nodes, page_info in prefetch(client.people_pages(cursor)):
+        synced += save_progress(nodes, index)
+        cache.set(CURSOR_KEY, page_info["endCursor"], CURSOR_TIMEOUT)
+        print(
+            f"Synced {synced} members, {page_info['totalCount']} people "
+            f"batch has more {page_info['hasNextPage']}"
+        )
+    cache.delete(CURSOR_KEY)
+    return synced
+
+
+LOCATIONS_QUERY = """
+    query
+       {{ Locations  (name: "{name}" )
+        {{ nodes
+          {{ locationId
+            name
+            code
+          }}
+        }}
+    }}
+    """
+POSITIONS_QUERY = """
+    query
+       {{ Positions  (code: "{code}")
+        {{ nodes
+          {{ positionId
+            name
+            code
+          }}
+        }}
+    }}
+    """
+ADD_LOCATION = """
+    mutation  change {{
+        addLocation(
+            name: "{name}"
+            code: "{code}"
+            parentId: "{parent}"
+            )  {{
+            locationId
+            name
+        }}
+    }}
+    """
+ADD_POSITION = """
+    mutation  change {{
+        addPosition(
+            name: "{status}"
+            code: "{status}"
+            )  {{
+            positionId
+            name
+            code
+        }}
+    }}
+    """
+ADD_PERSON = """
+    mutation  add {{
+        addPerson(
+            externalUniqueId: "{id}"
+            first: "{first}"
+            last: "{last}"
+            username: "{email}"
+            email: "{email}"
+            positionId: "{position_id}"
+            locationId: "{location_id}"
+            ) {{
+            username
+            personId
+        }}
+    }}
+    """
+FIND_PERSON = """
+    query a
+    {{ username: People (username: "{username}" )
+        {{ nodes
+           {{ username
+             personId
+           }}
+        }}
+        email: People (username: "{email}" )
+        {{ nodes
+           {{ username
+             personId
+           }}
+        }}
+        email_school: People (username: "{email_school}" )
+        {{ nodes
+           {{ username
+             personId
+           }}
+        }}
+        externalUniqueId: People (externalUniqueId: "{id}" )
+        {{ nodes
+           {{ username
+             personId
+           }}
+        }}
+    }}
+    """
+ADD_JOB = """
+    mutation  JobMutation {{
+        Person (personId: "{person_id}") {{
+            addJob(locationId:"{location_id}", positionId:"{position_id}"){{
+                jobId
+            }}
+      }}
+    }}
+    """
+DIRECTORY_TIMEOUT = 60 * 60 * 24
+ASSIGN_WORKERS = 4
+LOCATION_PARENT = "C90461D8-617A-11ED-ABCA-8399029E49FF"
+NATIONAL_LOCATION = "Theta Tau"
+STATUS_ALIGN = {
+    "friend": "nonmember",
+    "resignedCC": "resigned",
+    "away": "active",
+    "activepend": "active",
+    "alumnipend": "alumni",
+}
+
+
+class LMSDirectory:
+    """
+    Location and position ids of the LMS, kept in the cache so each chapter
+    and status is looked up once instead of for every member
+    """
+
+    def __init__(self, client=None):
+        self.client = client if client is not None else LMSClient()
+        self.ids = {}
+
+    def cached(self, key, lookup):
+        if key not in self.ids:
+            value = cache.get(key)
+            if value is None:
+                value = lookup()
+                if value:
+                    cache.set(key, value, DIRECTORY_TIMEOUT)
+            self.ids[key] = value
+        return self.ids[key]
+
+    def location_id(self, name, code=None):
+        """
+        :param code: the location is added with this code if it does not exist
+        """
+
+        def lookup():
+            response_json = self.client.post(LOCATIONS_QUERY.format(name=name))
+            nodes = response_json["data"]["Locations"]["nodes"]
+            if nodes:
+                return nodes[0]["locationId"]
+            if code:
+                response_json = self.client.post(
+                    ADD_LOCATION.format(name=name, code=code, parent=LOCATION_PARENT)
+                )
+                added = (response_json.get("data") or {}).get("addLocation") or {}
+                return added.get("locationId")
+
+        return self.cached(f"lms_location_{slugify(name)}", lookup)
+
+    def position_id(self, status):
+        """
+        The position is added if it does not exist
+        """
+        # Frontend will let you add position as long as you want,
+        # but the graphql will only return and match on the first 8 characters
+        code = status[0:8]
+
+        def lookup():
+            response_json = self.client.post(POSITIONS_QUERY.format(code=code))
+            nodes = response_json["data"]["Positions"]["nodes"]
+            if nodes:
+                return nodes[0]["positionId"]
+            response_json = self.client.post(ADD_POSITION.format(status=status))
+            added = (response_json.get("data") or {}).get("addPosition") or {}
+            return added.get("positionId")
+
+        return self.cached(f"lms_position_{slugify(code)}", lookup)
+
+
+def add_person(client, person, location_id, position_id, jobs):
+    """
+    Add a person to the LMS, or find them if they already exist, then add the
+    extra jobs. Only uses the client so it can run in a thread.
+    :param person: dict of the member fields, see person_fields
+    :param jobs: [(location_id, position_id, description)]
+    :return: (level, message)
+    """
+    name = person["name"]
+    try:
+        response_json = client.post(
+            ADD_PERSON.format(
+                location_id=location_id, position_id=position_id, **person
+            )
+        )
+        """
+        {'data': {'addPerson': {'personId': 'C3F57814-96CF-11ED-98EA-B8B2786A17CA',
+            'username': 'Jim.Gaffney@thetatau.org'}}}
+
+        {'errors': [{'locations': [{'line': 15, 'column': 9}],
+           'message': 'Unable to create person: This username already exists.\n',
+           'path': ['addPerson']}],
+         'data': {'addPerson': None}}
+        """
+        person_id = None
+        level = messages.INFO
+        if "errors" not in response_json:
+            message = f"{name} successfully added to training system"
+            person_id = response_json["data"]["addPerson"]["personId"]
+        elif "This username already exists" in response_json["errors"][0]["message"]:
+            response_json = client.post(FIND_PERSON.format(**person))
+            people_nodes = []
+            for node_name in ["username", "email", "email_school", "externalUniqueId"]:
+                people_nodes.extend(response_json["data"][node_name]["nodes"])
+            if people_nodes:
+                person_id = people_nodes[0]["personId"]
+                message = f"{name} already in training system"
+                ids = {people_node["personId"] for people_node in people_nodes}
+                if len(ids) > 1:
+                    message = f"{name} Had multiple matching accounts. All other accounts, using first {people_nodes}"
+                    level = messages.ERROR
+            else:
+                message = f"{name} NOT added to training system or updated, maybe an error. {response_json}"
+                level = messages.ERROR
+        else:
+            message = (
+                f"{name} NOT added to training system, maybe an error. {response_json}"
+            )
+            level = messages.ERROR
+        if person_id:
+            for job_location_id, job_position_id, description in jobs:
+                client.post(
+                    ADD_JOB.format(
+                        person_id=person_id,
+                        location_id=job_location_id,
+                        position_id=job_position_id,
+                    )
+                )
+                message += f" Added {name} to {description}"
+    except Exception as e:
+        # Connection errors or unexpected replies only fail this member
+        message = f"{name} NOT added to training system, maybe an error. {e}"
+        level = messages.ERROR
+    return level, message
+
+
+def person_fields(user):
+    return {
+        "name": str(user),
+        "id": user.id,
+        "first": user.preferred_name if user.preferred_name else user.first_name,
+        "last": user.last_name,
+        "username": user.username,
+        "email": user.email,
+        "email_school": user.email_school,
+    }
+
+
+def assign_users(users, extra_group=None, client=None, workers=ASSIGN_WORKERS):
+    """
+    Add members to the LMS in the position of their status at the location of
+    their chapter. Every chapter, status and extra group is resolved once,
+    then the people are added concurrently within the rate limit.
+    :param extra_group: extra position at the chapter location
+    :return: [(user, level, message)] in the order of users
+    """
+    if client is None:
+        # Authenticate once, the threads would all read and refresh the key
+        client = LMSClient(header=Training.authenticate_header())
+    directory = LMSDirectory(client)
+    users = list(users)
+    results = {}
+    pending = {}
+    missing = []
+    for user in users:
+        status = user.current_status
+        status = STATUS_ALIGN.get(status, status)
+        try:
+            location_id = directory.location_id(user.chapter.name, user.chapter.slug)
+            position_id = directory.position_id(status)
+            jobs = []
+            if user.is_national_officer():
+                jobs.append(
+                    (
+                        directory.location_id(NATIONAL_LOCATION),
+                        directory.position_id("natoff"),
+                        f"extra_group=natoff and location={NATIONAL_LOCATION}",
+                    )
+                )
+            if extra_group:
+                jobs.append(
+                    (
+                        location_id,
+                        directory.position_id(extra_group),
+                        f"{extra_group=} and location={user.chapter.name}",
+                    )
+                )
+        except Exception as e:
+            results[user.pk] = (
+                messages.ERROR,
+                f"{user} NOT added to training system, maybe an error. {e}",
+            )
+            continue
+        if not location_id or not position_id:
+            message = (
+                f"Sync training is missing:<br>{location_id=} {position_id=} for {user=} should be "
+                f"{user.chapter.slug=} {status=}, Please notify the central office."
+            )
+            missing.append(message)
+            results[user.pk] = (messages.ERROR, message)
+            continue
+        pending[user.pk] = (person_fields(user), location_id, position_id, jobs)
+    if missing:
+        send_mail(
+            "Sync Training Error",
+            "<br>".join(missing),
+            "cmt@thetatau.org",
+            ["cmt@thetatau.org", "central.office@thetatau.org"],
+            fail_silently=True,
+        )
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(workers, len(pending))) as executor:
+            futures = {
+                executor.submit(add_person, client, *arguments): user_pk
+                for user_pk, arguments in pending.items()
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+    return [(user, *results[user.pk]) for user in users]
@@ -7,6 +7,9 @@ class Command(BaseCommand):
     # Show this when the user types help
     help = "Sync Trainings with LMS"
 
+    def add_arguments(self, parser):
+        parser.add_argument("-restart", action="store_true")
+
     # A command must define handle()
     def handle(self, *args, **options):
-        Training.get_progress_all_users()
+        Training.get_progress_all_users(restart=options.get("restart", False))
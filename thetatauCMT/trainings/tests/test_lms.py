@@ -0,0 +1,277 @@
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from django.contrib import messages
+from django.core.cache import cache
+from chapters.tests.factories import ChapterFactory
+from trainings import lms
+from trainings.models import Training
+
+
+class GraphQLStandIn(BaseHTTPRequestHandler):
+    """
+    The LMS queries and mutations over lists of people, locations and
+    positions, the People cursor is the index of the last person of the page
+    """
+
+    people = []
+    queries = []
+    responses = []
+    locations = {}
+    positions = {}
+    persons = {}
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        query = body["query"]
+        self.queries.append(query)
+        status = self.responses.pop(0) if self.responses else None
+        if status is not None:
+            self.send_response(status)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+        data = self.graphql(query)
+        content = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def graphql(self, query):
+        if "addLocation" in query:
+            name = re.search(r'name: "([^"]*)"', query).group(1)
+            self.locations[name] = f"location-{name}"
+            return {"data": {"addLocation": {"locationId": self.locations[name]}}}
+        if "Locations" in query:
+            name = re.search(r'name: "([^"]*)"', query).group(1)
+            nodes = (
+                [{"locationId": self.locations[name]}] if name in self.locations else []
+            )
+            return {"data": {"Locations": {"nodes": nodes}}}
+        if "addPosition" in query:
+            code = re.search(r'code: "([^"]*)"', query).group(1)
+            self.positions[code[0:8]] = f"position-{code}"
+            return {"data": {"addPosition": {"positionId": self.positions[code[0:8]]}}}
+        if "Positions" in query:
+            code = re.search(r'code: "([^"]*)"', query).group(1)
+            nodes = (
+                [{"positionId": self.positions[code]}] if code in self.positions else []
+            )
+            return {"data": {"Positions": {"nodes": nodes}}}
+        if "addPerson" in query:
+            username = re.search(r'username: "([^"]*)"', query).group(1)
+            if username in self.persons:
+                return {
+                    "errors": [{"message": "This username already exists.\n"}],
+                    "data": {"addPerson": None},
+                }
+            self.persons[username] = f"person-{username}"
+            return {"data": {"addPerson": {"personId": self.persons[username]}}}
+        if "addJob" in query:
+            return {"data": {"Person": {"addJob": {"jobId": "job"}}}}
+        if "query a" in query:
+            return {
+                "data": {
+                    field: {
+                        "nodes": (
+                            [{"username": username, "personId": self.persons[username]}]
+                            if username in self.persons
+                            else []
+                        )
+                    }
+                    for field, username in re.findall(
+                        r'(\w+): People \(\w+: "([^"]*)"', query
+                    )
+                }
+            }
+        first = int(re.search(r"first: (\d+)", query).group(1))
+        after = re.search(r'after: "(\d+)"', query)
+        start = int(after.group(1)) + 1 if after else 0
+        nodes = self.people[start : start + first]
+        end = start + len(nodes) - 1
+        return {
+            "data": {
+                "People": {
+                    "nodes": nodes,
+                    "pageInfo": {
+                        "count": len(nodes),
+                        "totalCount": len(self.people),
+                        "startCursor": str(start),
+                        "endCursor": str(end),
+                        "hasNextPage": end + 1 < len(self.people),
+                        "hasPreviousPage": start > 0,
+                    },
+                }
+            }
+        }
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def lms_server():
+    GraphQLStandIn.people = []
+    GraphQLStandIn.queries = []
+    GraphQLStandIn.responses = []
+    GraphQLStandIn.locations = {}
+    GraphQLStandIn.positions = {}
+    GraphQLStandIn.persons = {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), GraphQLStandIn)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield GraphQLStandIn, f"http://127.0.0.1:{server.server_port}/graphql/"
+    server.shutdown()
+    server.server_close()
+
+
+def person(username, external_id="", completed=False):
+    return {
+        "username": username,
+        "first": "",
+        "last": "",
+        "externalUniqueId": external_id,
+        "personId": username,
+        "progress": [
+            {
+                "completed": completed,
+                "completeTime": "2024-01-02 03:04:05" if completed else None,
+                "courseInfo": {"title": "FSL (Full Course)", "courseInfoId": "1"},
+                "progressId": f"progress-{username}",
+                "maxQuizScore": None,
+            }
+        ],
+    }
+
+
+@pytest.mark.django_db
+def test_sync_progress(lms_server, monkeypatch, chapter, user_factory):
+    standin, url = lms_server
+    monkeypatch.setattr(lms, "PAGE_SIZE", 2)
+    cache.delete(lms.CURSOR_KEY)
+    users = user_factory.create_batch(5, chapter=chapter)
+    duplicate = Training.objects.create(
+        user=users[0],
+        course_id=lms.COURSE_ID,
+        course_title=lms.COURSE_TITLE,
+        max_quiz_score=0,
+    )
+    Training.objects.create(
+        user=users[0],
+        course_id=lms.COURSE_ID,
+        course_title=lms.COURSE_TITLE,
+        max_quiz_score=0,
+    )
+    standin.people = [
+        person(users[0].username.upper(), completed=True),
+        person("unknown", str(users[1].pk)),
+        person(users[2].email),
+        person("nobody@example.com"),
+        person(users[3].email_school, completed=True),
+    ]
+    standin.responses = [429]
+    client = lms.LMSClient(url=url, header={})
+    synced = lms.sync_progress(client)
+    assert synced == 4
+    assert cache.get(lms.CURSOR_KEY) is None
+    trainings = {training.user_id: training for training in Training.objects.all()}
+    assert set(trainings) == {users[0].pk, users[1].pk, users[2].pk, users[3].pk}
+    assert not Training.objects.filter(pk=duplicate.pk).exists()
+    assert trainings[users[0].pk].completed
+    assert trainings[users[0].pk].max_quiz_score == 100
+    assert trainings[users[0].pk].progress_id == f"progress-{users[0].username.upper()}"
+    assert not trainings[users[1].pk].completed
+
+
+@pytest.mark.django_db
+def test_sync_progress_resume(lms_server, monkeypatch, chapter, user_factory):
+    standin, url = lms_server
+    monkeypatch.setattr(lms, "PAGE_SIZE", 2)
+    cache.delete(lms.CURSOR_KEY)
+    users = user_factory.create_batch(4, chapter=chapter)
+    standin.people = [person(user.username) for user in users]
+    client = lms.LMSClient(url=url, header={})
+    # the second page fails after the first was saved
+    standin.responses = [None, 500]
+    with pytest.raises(lms.LMSError):
+        lms.sync_progress(client)
+    assert Training.objects.count() == 2
+    assert cache.get(lms.CURSOR_KEY) == "1"
+    standin.queries.clear()
+    assert lms.sync_progress(client) == 2
+    assert 'after: "1"' in standin.queries[0]
+    assert cache.get(lms.CURSOR_KEY) is None
+    assert set(Training.objects.values_list("user_id", flat=True)) == {
+        user.pk for user in users
+    }
+    assert lms.sync_progress(client, restart=True) == 4
+    assert Training.objects.count() == 4
+
+
+@pytest.mark.django_db
+def test_assign_users(lms_server, chapter, user_factory):
+    standin, url = lms_server
+    cache.clear()
+    other = ChapterFactory(name="other")
+    standin.locations[chapter.name] = "location-chapter"
+    standin.positions["active"] = "position-active"
+    users = [
+        *user_factory.create_batch(3, chapter=chapter, current_status="active"),
+        *user_factory.create_batch(2, chapter=other, current_status="activepend"),
+        user_factory(chapter=other, current_status="alumni"),
+    ]
+    standin.persons[users[0].email] = "person-existing"
+    client = lms.LMSClient(url=url, header={})
+    results = lms.assign_users(
+        users, extra_group="pledge/new member educator", client=client
+    )
+    assert [user for user, _, _ in results] == users
+    assert all(level == messages.INFO for _, level, _ in results)
+    assert "already in training system" in results[0][2]
+    directory_queries = [
+        query
+        for query in standin.queries
+        if "Locations" in query or "Positions" in query
+    ]
+    # chapter, other and active, alumni, pledge/n
+    assert len(directory_queries) == 5
+    assert standin.locations["other"] == "location-other"
+    assert set(standin.persons) == {user.email for user in users}
+    assert sum("addJob" in query for query in standin.queries) == len(users)
+    standin.queries.clear()
+    results = lms.assign_users(users[3:], client=client)
+    assert all(level == messages.INFO for _, level, _ in results)
+    assert not any(
+        "Locations" in query or "Positions" in query for query in standin.queries
+    )
+
+
+@pytest.mark.django_db
+def test_assign_users_person_errors(lms_server, chapter, user_factory):
+    standin, url = lms_server
+    cache.clear()
+    standin.locations[chapter.name] = "location-chapter"
+    standin.positions["active"] = "position-active"
+    users = user_factory.create_batch(3, chapter=chapter, current_status="active")
+
+    class FailingClient(lms.LMSClient):
+        def post(self, query):
+            if users[0].email in query:
+                raise ConnectionError("LMS unreachable")
+            if users[1].email in query:
+                return {"data": None}
+            return super().post(query)
+
+    results = lms.assign_users(users, client=FailingClient(url=url, header={}))
+    assert [user for user, _, _ in results] == users
+    assert [level for _, level, _ in results] == [
+        messages.ERROR,
+        messages.ERROR,
+        messages.INFO,
+    ]
+    assert "LMS unreachable" in results[0][2]
+    assert set(standin.persons) == {users[2].email}
@@ -33,6 +33,7 @@
     ChapterCurricula,
     UserDemographic,
     MemberUpdate,
+    MemberExport,
 )
 from .resources import UserRoleChangeResource, UserResource, UserStatusChangeResource
 from .views import ExportActiveMixin
@@ -589,6 +590,11 @@ def save_formset(self, request, form, formset, change):
                 instance.save()
         formset.save()
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Groups are saved with the related objects
+        form.instance.clear_access()
+
     def badge_fix(self, request, queryset):
         if "apply" in request.POST:
             badge_file = request.FILES.get("badge_file")
@@ -705,3 +711,36 @@ class MemberUpdateAdmin(admin.ModelAdmin):
 
 
 admin.site.register(MemberUpdate, MemberUpdateAdmin)
+
+
+class MemberExportAdmin(admin.ModelAdmin):
+    list_display = ("created", "created_by", "status", "export_progress", "download")
+    list_filter = ["status"]
+    fields = [
+        "created",
+        "created_by",
+        "status",
+        "export_progress",
+        "download",
+        "error",
+    ]
+    readonly_fields = fields
+    ordering = [
+        "-created",
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+    def export_progress(self, obj):
+        return f"{obj.progress}/{obj.total} chapters"
+
+    export_progress.short_description = "progress"
+
+    def download(self, obj):
+        if obj.file:
+            return mark_safe(f'<a href="{obj.file.url}">Download</a>')
+        return ""
+
+
+admin.site.register(MemberExport, MemberExportAdmin)
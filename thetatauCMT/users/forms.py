@@ -74,6 +74,15 @@ def __init__(self, form=None, rmp_complete=False):
                             css_class="btn-secondary",
                             style="display: none;",
                         ),
+                        StrictButton(
+                            '<i class="fa fa-download"></i> Download XLSX',
+                            type="submit",
+                            value="Download XLSX",
+                            name="csv",
+                            id="download-xlsx",
+                            css_class="btn-secondary",
+                            style="display: none;",
+                        ),
                         StrictButton(
                             '<i class="fa fa-envelope-square"></i> Email ALL',
                             type="submit",
@@ -0,0 +1,35 @@
+import time
+from django.core.management import BaseCommand
+from django.test.utils import override_settings
+from users.models import MemberSearch, User
+from users.search import search_members
+
+
+# python manage.py build_member_search
+# python manage.py build_member_search -skip -benchmark "smith" "jim gaffney"
+class Command(BaseCommand):
+    # Show this when the user types help
+    help = "Build the postgres member search index and compare it with watson"
+
+    def add_arguments(self, parser):
+        parser.add_argument("-skip", action="store_true", help="Do not rebuild")
+        parser.add_argument("-benchmark", nargs="+", type=str)
+
+    # A command must define handle()
+    def handle(self, *args, **options):
+        if not options.get("skip", False):
+            started = time.perf_counter()
+            total = MemberSearch.rebuild()
+            print(f"Indexed {total} members in {time.perf_counter() - started:.1f}s")
+        for q in options.get("benchmark") or []:
+            for backend in ["watson", "postgres"]:
+                with override_settings(MEMBER_SEARCH_BACKEND=backend):
+                    started = time.perf_counter()
+                    members = search_members(User.objects.all(), q)
+                    count = members.count()
+                    first = list(members[:25])
+                    elapsed = (time.perf_counter() - started) * 1000
+                print(
+                    f"{backend:>8} {q!r}: {count} members {elapsed:.0f}ms, "
+                    f"first {', '.join(str(member) for member in first[:3])}"
+                )
@@ -4,6 +4,7 @@
 from users.notifications import OfficerMonthly, RDMonthly
 from core.notifications import GenericEmail
 from chapters.models import Chapter
+from chapters.metrics import ChapterMetrics
 from regions.models import Region
 
 
@@ -34,21 +35,25 @@ def handle(self, *args, **options):
         rdonly = options.get("rdonly", False)
         if today == 1 or override:
             change_messages = []
+            # Numbers for every active chapter, shared by the chapter and region emails
+            metrics = ChapterMetrics(
+                Chapter.objects.exclude(active=False).select_related("region")
+            )
             if rdonly:
                 chapters = []
             elif chapters_only is not None:
                 chapters = Chapter.objects.filter(slug__in=chapters_only)
             else:
-                chapters = Chapter.objects.exclude(active=False)
+                chapters = metrics.chapters.values()
             for chapter in chapters:
                 if not chapter.active:
                     continue
                 print(f"Sending message to: {chapter}")
-                result = OfficerMonthly(chapter).send()
+                result = OfficerMonthly(chapter, metrics).send()
                 change_messages.append(f"{result}: {chapter}")
                 if month in [1, 2, 3, 4, 10, 11, 12]:
                     # Avoiding the summer months
-                    actives = chapter.actives().count()
+                    actives = metrics.member_counts[chapter.pk]
                     if actives <= 30:
                         print(f"    Chapter has under 30 members: {actives} actives")
                         GenericEmail(
@@ -73,9 +78,9 @@ def handle(self, *args, **options):
                     if region.slug == "test":
                         continue
                     print(f"Sending message to: {region}")
-                    result = RDMonthly(region).send()
+                    result = RDMonthly(region, metrics).send()
                     change_messages.append(f"{result}: {region}")
-                result = RDMonthly(region="candidate_chapter").send()
+                result = RDMonthly(region="candidate_chapter", metrics=metrics).send()
                 change_messages.append(f"{result}: candidate chapter")
             change_message = "<br>".join(change_messages)
             send_mail(
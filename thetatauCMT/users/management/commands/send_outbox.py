@@ -0,0 +1,13 @@
+from django.core.management import BaseCommand
+from core.outbox import send_outbox
+
+
+# python manage.py send_outbox
+class Command(BaseCommand):
+    # Show this when the user types help
+    help = "Send the pending notifications of the outbox"
+
+    # A command must define handle()
+    def handle(self, *args, **options):
+        sent = send_outbox()
+        self.stdout.write(f"Sent {sent} notifications")
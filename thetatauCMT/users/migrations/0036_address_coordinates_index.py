@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Index for the zip radius search, core.address.addresses_in_radius
+    The Address model belongs to django-address so the index is added here
+    """
+
+    dependencies = [
+        ("address", "0003_auto_20200830_1851"),
+        ("users", "0035_memberexport"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE INDEX IF NOT EXISTS address_address_coordinates_idx "
+            "ON address_address (latitude, longitude);",
+            reverse_sql="DROP INDEX IF EXISTS address_address_coordinates_idx;",
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 3.2.15 on 2026-10-18 12:00
+
+from django.conf import settings
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0036_address_coordinates_index"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name="MemberSearch",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("document", models.TextField(default="")),
+                (
+                    "vector",
+                    django.contrib.postgres.search.SearchVectorField(null=True),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="membersearch",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["vector"], name="users_membersearch_vector"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="membersearch",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["document"],
+                name="users_membersearch_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.15 on 2026-10-18 12:00
+
+from django.db import migrations, models
+import users.models
+import utils.storages
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0037_membersearch"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="memberexport",
+            name="file",
+            field=models.FileField(
+                blank=True,
+                storage=utils.storages.get_private_storage,
+                upload_to=users.models.get_member_export_upload_path,
+            ),
+        ),
+    ]
@@ -1,11 +1,26 @@
+import io
+import os
+import csv
 import datetime
+import logging
+import tempfile
+import zipfile
+from itertools import groupby
+from operator import attrgetter
 from django.contrib.auth.models import AbstractUser, Group
+from django.contrib.postgres.aggregates import ArrayAgg
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django_userforeignkey.models.fields import UserForeignKey
-from django.db import models, IntegrityError
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import UserManager
 from django.urls import reverse
 from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator, RegexValidator
 from model_utils.fields import MonitorField
@@ -29,11 +44,16 @@
     COL_OFFICER_ALIGN,
     CHAPTER_OFFICER_CHOICES,
     CHAPTER_ROLES,
+    ADVISOR_ROLES,
     NAT_OFFICERS,
+    annotate_advisor_role,
     COUNCIL,
     EnumClass,
 )
-from chapters.models import Chapter, ChapterCurricula
+from chapters.models import Chapter, ChapterCurricula, ChapterSemesterStats
+from utils.storages import get_private_storage
+
+logger = logging.getLogger(__name__)
 
 
 class CustomUserManager(UserManager):
@@ -55,6 +75,26 @@ def create_superuser(self, email, password, **extra_fields):
         )
         self._give_superuser_natoff_roles(superuser)
 
+    def roster(self, chapters, roles=None, advisors=False):
+        """
+        Current officers of all the chapters in one query, instead of OR-ing
+        each chapter.get_current_officers() together
+        :param chapters: Chapter queryset, eg. active chapters in a region
+        :param roles: roles to include, default all chapter roles
+        :param advisors: alumni advisors and faculty advisors, annotated with role
+        """
+        if roles is None:
+            roles = ADVISOR_ROLES if advisors else CHAPTER_ROLES
+        members = models.Q(current_roles__overlap=list(roles))
+        if advisors:
+            members |= models.Q(current_status="advisor")
+        queryset = self.filter(members, chapter__in=chapters).select_related(
+            "chapter__region", "major"
+        )
+        if advisors:
+            queryset = annotate_advisor_role(queryset)
+        return queryset
+
     def _give_superuser_natoff_roles(self, superuser):
         superuser.current_roles = ["grand regent"]
         superuser.officer = True
@@ -256,6 +296,22 @@ def save(self, *args, **kwargs):
         if self.username == "":
             self.username = self.email
         super(User, self).save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "chapter" not in update_fields:
+            return
+        loaded_chapter_id = self.__dict__.pop("_loaded_chapter_id", self.chapter_id)
+        if loaded_chapter_id != self.chapter_id:
+            # The member's active time moved to the other chapter
+            Chapter.clear_actives_index(loaded_chapter_id)
+            Chapter.clear_actives_index(self.chapter_id)
+        self._loaded_chapter_id = self.chapter_id
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "chapter_id" in instance.__dict__:
+            instance._loaded_chapter_id = instance.chapter_id
+        return instance
 
     def __str__(self):
         return self.name
@@ -270,14 +326,58 @@ def get_name_with_details(self):
         major = self.major if self.major else ""
         return f"{self.name} graduated: {self.graduation_year} {self.degree} {major}"
 
+    ACCESS_TIMEOUT = 60 * 60
+
+    @staticmethod
+    def access_key(user_id):
+        return f"user_access_{user_id}"
+
+    @classmethod
+    def clear_access_cache(cls, user_id):
+        cache.delete(cls.access_key(user_id))
+
+    def clear_access(self):
+        """
+        Forget the cached groups and altered chapter/role
+        for this instance and everywhere else the user is logged in
+        """
+        self.__dict__.pop("access", None)
+        self.clear_access_cache(self.pk)
+
+    @cached_property
+    def access(self):
+        """
+        Group names and the altered chapter/role of a national officer
+        request.user is one instance for the whole request, so this is looked up
+        at most once per request, and shared between requests in the cache
+        until the roles, groups or alter change
+        :return: {"groups": set, "altered_chapter": Chapter, "altered_role": str}
+        """
+        key = self.access_key(self.pk)
+        access = cache.get(key)
+        if access is None:
+            access = {
+                "groups": set(self.groups.values_list("name", flat=True)),
+                "altered_chapter": None,
+                "altered_role": None,
+            }
+            if "natoff" in access["groups"]:
+                altered = self.altered.select_related("chapter").first()
+                if altered is not None:
+                    access["altered_chapter"] = altered.chapter
+                    access["altered_role"] = altered.role
+            cache.set(key, access, self.ACCESS_TIMEOUT)
+        return access
+
     @property
     def current_chapter(self):
         # This allows for national officers to change their chapter
         # without actually changing their chapter
         chapter = self.chapter
-        if self.groups.filter(name="natoff").exists():
-            if self.altered.all():
-                chapter = self.altered.first().chapter
+        if self.is_national_officer_group:
+            altered_chapter = self.access["altered_chapter"]
+            if altered_chapter is not None:
+                chapter = altered_chapter
         return chapter
 
     @property
@@ -360,20 +460,19 @@ def chapter_officer(self, altered=True):
         current_roles = set(self.current_roles) if self.current_roles else set()
         # officer = not current_roles.isdisjoint(CHAPTER_OFFICER)
         officer_roles = CHAPTER_OFFICER & current_roles
-        if self.is_national_officer_group:
-            if altered and self.altered.all():
-                new_role = self.altered.first().role
-                if new_role is not None and new_role != "":
-                    officer_roles.add(new_role)
+        if altered and self.is_national_officer_group:
+            new_role = self.access["altered_role"]
+            if new_role is not None and new_role != "":
+                officer_roles.add(new_role)
         return officer_roles
 
     @property
     def is_national_officer_group(self):
-        return self.groups.filter(name="natoff").exists()
+        return "natoff" in self.access["groups"]
 
     @property
     def is_chapter_officer_group(self):
-        return self.groups.filter(name="officer").exists()
+        return "officer" in self.access["groups"]
 
     @property
     def is_officer_group(self):
@@ -397,6 +496,141 @@ def is_officer(self):
     def is_advisor(self):
         return self.current_status == "advisor"
 
+    @classmethod
+    def sync_current_status_roles(cls, since=None, log=print):
+        """
+        Set the denormalized current_status and current_roles from the status
+        and role intervals, computed for all users in one aggregate query
+        :param since: datetime, only users with a status or role that started,
+            ended or was modified since, all users if None
+        :return: ids of users updated
+        """
+        users = cls.objects.all()
+        if since is not None:
+            since_date = since.date()
+            changed = (
+                models.Q(start__gte=since_date, start__lte=TODAY_END)
+                | models.Q(
+                    end__gte=since_date - datetime.timedelta(days=1), end__lt=TODAY_END
+                )
+                | models.Q(modified__gte=since)
+            )
+            users = users.filter(
+                models.Q(pk__in=UserStatusChange.objects.filter(changed).values("user"))
+                | models.Q(pk__in=UserRoleChange.objects.filter(changed).values("user"))
+            )
+        statuses = UserStatusChange.objects.filter(user=models.OuterRef("pk"))
+        current_statuses = statuses.filter(start__lte=TODAY_END, end__gte=TODAY_END)
+        users = (
+            users.annotate(
+                # We will just take the last status user ever had
+                expected_status=Coalesce(
+                    models.Subquery(
+                        current_statuses.order_by("-start").values("status")[:1]
+                    ),
+                    models.Subquery(statuses.order_by("-start").values("status")[:1]),
+                    models.Value("alumni"),
+                ),
+                expected_roles=ArrayAgg(
+                    "roles__role",
+                    filter=models.Q(
+                        roles__start__lte=TODAY_END, roles__end__gte=TODAY_END
+                    ),
+                    distinct=True,
+                ),
+            )
+            .values(
+                "pk",
+                "current_status",
+                "current_roles",
+                "expected_status",
+                "expected_roles",
+            )
+            .order_by()
+        )
+        update_users = []
+        for user in users:
+            roles = {role for role in user["expected_roles"] or [] if role is not None}
+            set_roles = set(user["current_roles"] or [])
+            if user["current_status"] == user["expected_status"] and roles == set_roles:
+                continue
+            log(
+                f"User {user['pk']} updated previous status {user['current_status']} "
+                f"roles {set_roles} new status {user['expected_status']} roles {roles}"
+            )
+            update_users.append(
+                cls(
+                    pk=user["pk"],
+                    current_status=user["expected_status"],
+                    current_roles=list(roles),
+                )
+            )
+        cls.objects.bulk_update(
+            update_users, ["current_status", "current_roles"], batch_size=1000
+        )
+        user_ids = [user.pk for user in update_users]
+        cls.sync_officer_groups(user_ids)
+        return user_ids
+
+    @classmethod
+    def officer_ids(cls, user_ids):
+        """
+        Which users are officers from their current_roles, the same as is_officer
+        :return: officer ids, national officer ids, ids of users found
+        """
+        nat_group, _ = Group.objects.get_or_create(name="natoff")
+        current_roles = dict(
+            cls.objects.filter(pk__in=user_ids).values_list("pk", "current_roles")
+        )
+        # National officers can alter their role to be an officer of a chapter
+        altered_roles = dict(
+            UserAlter.objects.filter(user__in=user_ids, user__groups=nat_group)
+            .exclude(role__isnull=True)
+            .exclude(role="")
+            .values_list("user", "role")
+        )
+        officer_ids, natoff_ids = set(), set()
+        for user_id, roles in current_roles.items():
+            roles = set(roles or [])
+            if user_id in altered_roles:
+                roles.add(altered_roles[user_id])
+            if roles & set(NAT_OFFICERS):
+                natoff_ids.add(user_id)
+                officer_ids.add(user_id)
+            elif roles & CHAPTER_OFFICER:
+                officer_ids.add(user_id)
+        return officer_ids, natoff_ids, set(current_roles)
+
+    @classmethod
+    def sync_officer_groups(cls, user_ids):
+        """
+        Set the officer flag and officer/natoff groups from current_roles
+        the same way UserRoleChange.save does for one user, in a few statements
+        Officers are added to officer (and natoff if national officer),
+        everyone else is removed from both
+        :return: officer ids
+        """
+        user_ids = set(user_ids)
+        if not user_ids:
+            return set()
+        off_group, _ = Group.objects.get_or_create(name="officer")
+        nat_group, _ = Group.objects.get_or_create(name="natoff")
+        officer_ids, natoff_ids, user_ids = cls.officer_ids(user_ids)
+        other_ids = user_ids - officer_ids
+        cls.objects.filter(pk__in=officer_ids).update(officer=True)
+        cls.objects.filter(pk__in=other_ids).update(officer=False)
+        UserGroups = cls.groups.through
+        UserGroups.objects.bulk_create(
+            [UserGroups(user_id=user_id, group=off_group) for user_id in officer_ids]
+            + [UserGroups(user_id=user_id, group=nat_group) for user_id in natoff_ids],
+            ignore_conflicts=True,
+        )
+        UserGroups.objects.filter(
+            user__in=other_ids, group__in=[off_group, nat_group]
+        ).delete()
+        cache.delete_many([cls.access_key(user_id) for user_id in user_ids])
+        return officer_ids
+
     @classmethod
     def fix_badge_numbers(cls, reader, test=False, sep="<br>"):
         updated_users = []
@@ -582,6 +816,16 @@ class UserAlter(models.Model):
     ROLES = CHAPTER_OFFICER_CHOICES + [(None, "------------")]
     role = models.CharField(max_length=50, choices=ROLES, null=True)
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.user.clear_access()
+
+    def delete(self, *args, **kwargs):
+        user = self.user
+        out = super().delete(*args, **kwargs)
+        user.clear_access()
+        return out
+
 
 class UserSemesterServiceHours(YearTermModel):
     created_by = UserForeignKey(
@@ -618,6 +862,15 @@ class UserSemesterGPA(YearTermModel):
     )
     gpa = models.FloatField()
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        ChapterSemesterStats.refresh(self.user.chapter, self.year, self.term)
+
+    def delete(self, *args, **kwargs):
+        out = super().delete(*args, **kwargs)
+        ChapterSemesterStats.refresh(self.user.chapter, self.year, self.term)
+        return out
+
 
 class UserStatusChange(StartEndModel, TimeStampedModel, EmailSignalMixin):
     class STATUS(EnumClass):
@@ -668,7 +921,40 @@ def save(self, *args, **kwargs):
         if self.start <= TODAY < self.end:
             self.user.current_status = self.status
             self.user.save(update_fields=["current_status"])
+        previous = None
+        if self.pk is not None:
+            previous = (
+                UserStatusChange.objects.filter(pk=self.pk)
+                .values("start", "end", "status")
+                .first()
+            )
         super().save(*args, **kwargs)
+        Chapter.clear_actives_index(self.user.chapter_id)
+        ChapterSemesterStats.refresh_terms(
+            self.user.chapter, self.changed_terms(previous)
+        )
+
+    def changed_terms(self, previous=None):
+        """
+        Dashboard terms whose rollup the save changed, a term only changes
+        when the status starts or stops overlapping it or the status changed
+        :param previous: start, end and status before the save
+        """
+        terms = set(ChapterSemesterStats.terms_between(self.start, self.end))
+        if previous is None:
+            return terms
+        previous_terms = set(
+            ChapterSemesterStats.terms_between(previous["start"], previous["end"])
+        )
+        if previous["status"] != self.status:
+            return terms | previous_terms
+        return terms ^ previous_terms
+
+    def delete(self, *args, **kwargs):
+        out = super().delete(*args, **kwargs)
+        Chapter.clear_actives_index(self.user.chapter_id)
+        ChapterSemesterStats.refresh_dates(self.user.chapter, self.start, self.end)
+        return out
 
 
 class UserRoleChange(StartEndModel, TimeStampedModel, EmailSignalMixin):
@@ -692,66 +978,117 @@ class UserRoleChange(StartEndModel, TimeStampedModel, EmailSignalMixin):
     def __str__(self):
         return self.role
 
-    def save(self, *args, **kwargs):
-        off_group, _ = Group.objects.get_or_create(name="officer")
-        nat_group, _ = Group.objects.get_or_create(name="natoff")
+    def save_only(self, *args, **kwargs):
         super().save(*args, **kwargs)
-        if hasattr(self.start, "date"):
-            self.start = self.start.date()
-        if hasattr(self.end, "date"):
-            self.end = self.end.date()
-        if self.start <= TOMORROW < self.end:
-            current_roles = self.user.current_roles if self.user.current_roles else []
-            if self.role not in current_roles:
-                current_roles.append(self.role)
-                self.user.current_roles = current_roles
-                self.user.save(update_fields=["current_roles"])
-        elif self.end < TODAY:
-            current_roles = self.user.current_roles if self.user.current_roles else []
-            if self.role in current_roles:
-                self.user.current_roles.remove(self.role)
-                self.user.save(update_fields=["current_roles"])
-        self.clean_group_role()
-        # Need to check current role, b/c user could have multiple
-        current_officer = self.user.is_officer
-        if current_officer:
-            self.user.officer = True
-            self.user.save(update_fields=["officer"])
-            if self.user not in off_group.user_set.all():
-                try:
-                    off_group.user_set.add(self.user)
-                except IntegrityError as e:
-                    if "unique constraint" in str(e):
-                        pass
-            if self.user.is_national_officer():
-                try:
-                    nat_group.user_set.add(self.user)
-                except IntegrityError as e:
-                    if "unique constraint" in str(e):
-                        pass
-        else:
-            self.user.officer = False
-            self.user.groups.remove(off_group)
-            self.user.groups.remove(nat_group)
-            off_group.user_set.remove(self.user)
-            nat_group.user_set.remove(self.user)
-            self.user.save()
+
+    def save(self, *args, **kwargs):
+        self.save_only(*args, **kwargs)
+        self.reconcile_roles([self])
+
+    def delete(self, *args, **kwargs):
+        out = super().delete(*args, **kwargs)
+        self.clear_officer_audits([self])
+        return out
+
+    @staticmethod
+    def clear_officer_audits(role_changes):
+        """
+        Audit.latest_officer_audits matches audits to the role dates
+        """
+        from forms.models import Audit
+
+        cache.delete_many(
+            {
+                Audit.officer_audits_key(role_change.user.chapter_id)
+                for role_change in role_changes
+            }
+        )
+
+    @classmethod
+    def save_roles(cls, role_changes):
+        """
+        Save many role changes, eg. an officer election formset, and update
+        the users' current_roles, officer flag and groups once for all of them
+        """
+        for role_change in role_changes:
+            role_change.save_only()
+        cls.reconcile_roles(role_changes)
+
+    @classmethod
+    def reconcile_roles(cls, role_changes):
+        """
+        Same result as saving each role change one by one, in a few statements:
+            current roles get the role added, ended roles get it removed
+            previous holders of the roles who are no longer officers
+                are removed from the officer group (see clean_group_role)
+            officer flag and officer/natoff groups of the users are set
+        """
+        role_changes = list(role_changes)
+        if not role_changes:
+            return
+        users = {}
+        for role_change in role_changes:
+            if hasattr(role_change.start, "date"):
+                role_change.start = role_change.start.date()
+            if hasattr(role_change.end, "date"):
+                role_change.end = role_change.end.date()
+            users.setdefault(role_change.user_id, []).append(role_change.user)
+        current_roles = dict(
+            User.objects.filter(pk__in=users).values_list("pk", "current_roles")
+        )
+        changed = set()
+        for role_change in role_changes:
+            roles = current_roles.get(role_change.user_id) or []
+            if role_change.start <= TOMORROW < role_change.end:
+                if role_change.role not in roles:
+                    roles.append(role_change.role)
+                    changed.add(role_change.user_id)
+            elif role_change.end < TODAY:
+                if role_change.role in roles:
+                    roles.remove(role_change.role)
+                    changed.add(role_change.user_id)
+            current_roles[role_change.user_id] = roles
+        User.objects.bulk_update(
+            [User(pk=pk, current_roles=current_roles[pk]) for pk in changed],
+            ["current_roles"],
+        )
+        cls.clean_group_roles(role_changes)
+        cls.clear_officer_audits(role_changes)
+        officer_ids = User.sync_officer_groups(users)
+        for user_id, user_instances in users.items():
+            for user in user_instances:
+                user.current_roles = current_roles[user_id]
+                user.officer = user_id in officer_ids
+                user.__dict__.pop("access", None)
 
     def clean_group_role(self):
+        self.clean_group_roles([self])
+
+    @classmethod
+    def clean_group_roles(cls, role_changes):
         """
         This cleans up the officer group when the role is updated
         This will leave a user in officer group until a replacement is elected
         :return:
         """
         off_group, created = Group.objects.get_or_create(name="officer")
-        previuos_users = UserRoleChange.get_role_members(self.user, self.role)
-        officer_users = off_group.user_set.all()
-        for user_role in previuos_users:
-            if user_role.user in officer_users:
-                if not user_role.user.is_officer:
-                    user_role.user.groups.remove(off_group)
-                    off_group.user_set.remove(user_role.user)
-                    user_role.user.save()
+        previous_roles = models.Q(pk__in=[])
+        for role_change in role_changes:
+            previous_roles |= models.Q(
+                role=role_change.role,
+                user__chapter=role_change.user.current_chapter,
+            )
+        previous_users = set(
+            cls.objects.filter(
+                previous_roles, end__lte=TODAY_END, user__groups=off_group
+            ).values_list("user", flat=True)
+        )
+        officer_ids, _, _ = User.officer_ids(previous_users)
+        remove_ids = previous_users - officer_ids
+        User.groups.through.objects.filter(
+            user__in=remove_ids, group=off_group
+        ).delete()
+        cache.delete_many([User.access_key(user_id) for user_id in remove_ids])
 
     @classmethod
     def get_role_members(cls, user, role):
@@ -865,3 +1202,213 @@ class OUTCOME(EnumClass):
     )
     unsubscribe_paper_gear = models.BooleanField(blank=True, null=True)
     unsubscribe_email = models.BooleanField(blank=True, null=True)
+
+
+def get_member_export_upload_path(instance, filename):
+    return os.path.join("exports", filename)
+
+
+class MemberExport(TimeStampedModel):
+    """
+    Export Chapter Actives admin action, run in the background by the
+    export_chapter_actives task, one csv per active chapter in a zip
+    """
+
+    class STATUS(EnumClass):
+        pending = ("pending", "Pending")
+        running = ("running", "Running")
+        complete = ("complete", "Complete")
+        failed = ("failed", "Failed")
+
+    MEMBER_STATUS = ["active", "activepend", "alumnipend", "away", "activeCC"]
+    CHUNK_SIZE = 2000
+
+    class Meta:
+        ordering = ["-created"]
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name="member_exports",
+        blank=True,
+        null=True,
+    )
+    status = models.CharField(
+        max_length=10, choices=[x.value for x in STATUS], default="pending"
+    )
+    progress = models.PositiveIntegerField("Chapters exported", default=0)
+    total = models.PositiveIntegerField("Chapters", default=0)
+    file = models.FileField(
+        upload_to=get_member_export_upload_path,
+        storage=get_private_storage,
+        blank=True,
+    )
+    error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"Chapter actives export {self.created:%Y-%m-%d %H:%M}"
+
+    def start(self):
+        from .tasks import export_chapter_actives
+
+        try:
+            export_chapter_actives.delay(self.pk)
+        except Exception:
+            # Without a broker (eg. pythonanywhere) export in the request
+            logger.exception("Could not start export, running it in the request")
+            self.run()
+
+    def run(self):
+        self.status = "running"
+        self.save(update_fields=["status", "modified"])
+        try:
+            self.write_zip()
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+            self.save(update_fields=["status", "error", "modified"])
+            raise
+        self.status = "complete"
+        self.save(update_fields=["status", "file", "modified"])
+        self.notify()
+
+    def members(self, chapters):
+        return (
+            User.objects.filter(
+                current_status__in=self.MEMBER_STATUS, chapter__in=chapters
+            )
+            .select_related("chapter__region", "major")
+            .order_by("chapter_id", "pk")
+        )
+
+    def write_zip(self):
+        """
+        The members of all chapters are read in one query ordered by chapter
+        and split into the chapter csv files as they are read
+        """
+        from .tables import UserTable
+
+        chapters = list(Chapter.objects.exclude(active=False).order_by("pk"))
+        self.total = len(chapters)
+        self.save(update_fields=["total", "modified"])
+        members = groupby(
+            self.members(chapters).iterator(chunk_size=self.CHUNK_SIZE),
+            key=attrgetter("chapter_id"),
+        )
+        chapter_pk, chapter_members = next(members, (None, None))
+        time_name = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        with tempfile.TemporaryFile() as file:
+            with zipfile.ZipFile(file, "w", zipfile.ZIP_DEFLATED) as zf:
+                for count, chapter in enumerate(chapters, 1):
+                    data = []
+                    if chapter_pk == chapter.pk:
+                        data = list(chapter_members)
+                        chapter_pk, chapter_members = next(members, (None, None))
+                    table = UserTable(data=data, chapter=True)
+                    name = f"{chapter}_{chapter.school}_activeexport_{time_name}.csv"
+                    with io.TextIOWrapper(
+                        zf.open(name, "w"), encoding="utf-8", newline=""
+                    ) as csv_file:
+                        csv.writer(csv_file).writerows(table.as_values())
+                    self.progress = count
+                    self.save(update_fields=["progress", "modified"])
+            file.seek(0)
+            self.file.save(
+                f"ThetaTauActiveExport_{time_name}.zip", File(file), save=False
+            )
+
+    def notify(self):
+        from core.notifications import GenericEmail
+
+        if not self.created_by or not self.created_by.email:
+            return
+        link = settings.CURRENT_URL + reverse(
+            "admin:users_memberexport_change", args=[self.pk]
+        )
+        GenericEmail(
+            emails={self.created_by.email},
+            subject="Chapter actives export complete",
+            message=(
+                "The export of the chapter actives is complete, "
+                f'<a href="{link}">download it here</a>.'
+            ),
+            cc=False,
+            reply=False,
+            addressee=self.created_by.first_name,
+        ).send()
+
+
+class MemberSearch(models.Model):
+    """
+    Denormalized search text of a member for the postgres member search,
+    see users.search. Rows are refreshed in batches after users are saved.
+    """
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="search"
+    )
+    document = models.TextField(default="")
+    vector = SearchVectorField(null=True)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["vector"], name="users_membersearch_vector"),
+            GinIndex(
+                fields=["document"],
+                name="users_membersearch_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ]
+
+    FIELDS = [
+        "name",
+        "first_name",
+        "last_name",
+        "preferred_name",
+        "nickname",
+        "maiden_name",
+        "username",
+        "email",
+        "email_school",
+        "badge_number",
+        "id",
+        "chapter__name",
+        "major__major",
+    ]
+
+    def __str__(self):
+        return self.document
+
+    @classmethod
+    def refresh(cls, user_pks):
+        """
+        Rebuild the search rows of the users, a few queries for any number
+        """
+        users = User.objects.filter(pk__in=user_pks).values_list(*cls.FIELDS)
+        searches = [
+            cls(
+                user_id=values[cls.FIELDS.index("id")],
+                document=" ".join(
+                    str(value).lower() for value in values if value not in (None, "")
+                ),
+            )
+            for values in users
+        ]
+        with transaction.atomic():
+            cls.objects.filter(user_id__in=user_pks).delete()
+            cls.objects.bulk_create(searches)
+            cls.objects.filter(user_id__in=user_pks).update(
+                vector=SearchVector("document", config="simple")
+            )
+        return len(searches)
+
+    @classmethod
+    def rebuild(cls, chunk_size=2000):
+        """
+        Refresh every member, python manage.py build_member_search
+        """
+        user_pks = list(User.objects.order_by("pk").values_list("pk", flat=True))
+        total = 0
+        for start in range(0, len(user_pks), chunk_size):
+            total += cls.refresh(user_pks[start : start + chunk_size])
+        return total
@@ -1,10 +1,10 @@
 from herald import registry
-from herald.base import EmailNotification
+from core.notifications import EmailNotification
 from tasks.models import TaskDate
 from django.conf import settings
-from django.shortcuts import reverse
 from users.models import User
 from chapters.models import Chapter
+from chapters.metrics import ChapterMetrics
 from chapters.tables import ChapterStatusTable
 
 
@@ -15,7 +15,7 @@ class MemberInfoUpdate(EmailNotification):  # extend from EmailNotification for
     subject = "[CMT] RMP & Update Member Information"  # subject of email
 
     def __init__(self, user, updater):
-        emails = set(user.emailaddress_set.values_list("email", flat=True)) | {
+        emails = {address.email for address in user.emailaddress_set.all()} | {
             user.email,
             user.email_school,
         }
@@ -47,11 +47,16 @@ class OfficerMonthly(EmailNotification):  # extend from EmailNotification for em
     template_name = "officer_monthly"  # name of template, without extension
     subject = "CMT Monthly Update"  # subject of email
 
-    def __init__(self, chapter):  # optionally customize the initialization
-        self.context = {"user": chapter}  # set context for the template rendering
-        officer_list, previous = chapter.get_current_officers_council()
+    def __init__(
+        self, chapter, metrics=None
+    ):  # optionally customize the initialization
+        if metrics is None:
+            metrics = ChapterMetrics([chapter])
+        _, previous = metrics.officers[chapter.pk]
+        tasks = metrics.task_dates[chapter.pk]
+        events = metrics.event_counts[chapter.pk]
         # set list of emails to send to
-        emails = chapter.council_emails()
+        emails = metrics.council_emails(chapter)
         self.to_emails = emails
         self.cc = []
         self.reply_to = [
@@ -65,14 +70,14 @@ def __init__(self, chapter):  # optionally customize the initialization
         self.context = {
             "previous_officers": previous,
             "chapter": chapter_name,
-            "last_month_events": chapter.events_last_month().count(),
-            "semester_events": chapter.events_semester().count(),
-            "count_members": chapter.actives().count(),
-            "count_pledges": chapter.pledges().count(),
+            "last_month_events": events["last_month"],
+            "semester_events": events["semester"],
+            "count_members": metrics.member_counts[chapter.pk],
+            "count_pledges": metrics.pledge_counts[chapter.pk],
             "balance": chapter.balance,
             "balance_date": chapter.balance_date,
-            "tasks_upcoming": TaskDate.incomplete_dates_for_chapter_next_month(chapter),
-            "tasks_overdue": TaskDate.incomplete_dates_for_chapter(chapter),
+            "tasks_upcoming": tasks["upcoming"],
+            "tasks_overdue": tasks["overdue"],
             "region_announcements": None,
             "host": settings.CURRENT_URL,
         }
@@ -88,7 +93,7 @@ class RDMonthly(EmailNotification):  # extend from EmailNotification for emails
     subject = "CMT Monthly Update Region Summary"  # subject of email
     render_types = ["html"]
 
-    def __init__(self, region):  # optionally customize the initialization
+    def __init__(self, region, metrics=None):  # optionally customize the initialization
         # Chapter, Members, Pledges, Events Last Month, Submissions Last Month, Current Balance, Tasks Overdue
         # List of tasks due next 45 days
         if region == "candidate_chapter":
@@ -102,45 +107,10 @@ def __init__(self, region):  # optionally customize the initialization
         self.reply_to = [
             "cmt@thetatau.org",
         ]
-        data = []
-        for chapter in chapters:
-            if not chapter.active:
-                continue
-            officers = chapter.get_current_officers_council_specific()
-            officer_order = {
-                0: "Regent",
-                1: "Scribe",
-                2: "Vice",
-                3: "Treasurer",
-                4: "Corresponding Secretary",
-            }
-            missing = ", ".join(
-                [
-                    officer_order[ind]
-                    for ind, officer in enumerate(officers)
-                    if officer is None
-                ]
-            )
-            host = settings.CURRENT_URL
-            link = reverse("chapters:detail", kwargs={"slug": chapter.slug})
-            link = host + link
-            data.append(
-                {
-                    "name": chapter.name,
-                    "slug": chapter.slug,
-                    "link": link,
-                    "balance": chapter.balance,
-                    "balance_date": chapter.balance_date,
-                    "officer_missing": missing,
-                    "member_count": chapter.actives().count(),
-                    "pledge_count": chapter.pledges().count(),
-                    "event_count": chapter.events_last_month().count(),
-                    "tasks_overdue": TaskDate.incomplete_dates_for_chapter(
-                        chapter
-                    ).count(),
-                    "host": host,
-                }
-            )
+        chapters = [chapter for chapter in chapters if chapter.active]
+        if metrics is None:
+            metrics = ChapterMetrics(chapters)
+        data = [metrics.status_row(chapter) for chapter in chapters]
         table = ChapterStatusTable(data=data)
         self.context = {
             "region": region,
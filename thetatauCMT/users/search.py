@@ -0,0 +1,101 @@
+"""
+Member search, settings.MEMBER_SEARCH_BACKEND selects watson or the postgres
+trigram/full text search over MemberSearch
+"""
+import logging
+import re
+import threading
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import transaction
+from django.db.models import F
+from watson import search as watson
+
+_pending = threading.local()
+logger = logging.getLogger(__name__)
+
+
+def backend():
+    return getattr(settings, "MEMBER_SEARCH_BACKEND", "watson")
+
+
+def search_terms(q):
+    """
+    Lowercase words of the search, emails and badge numbers are kept whole
+    """
+    return re.findall(r"[\w@.+-]+", q.lower())
+
+
+def prefix_query(terms):
+    """
+    Every term as a prefix, matches the start of any word of the document
+    """
+    return SearchQuery(
+        " & ".join(f"'{term}':*" for term in terms), config="simple", search_type="raw"
+    )
+
+
+def search_members(queryset, q):
+    """
+    Members of the queryset matching every term of q, best matches first
+    """
+    if backend() != "postgres":
+        return watson.filter(queryset, q, ranking=True)
+    terms = search_terms(q)
+    if not terms:
+        return queryset.none()
+    for term in terms:
+        # the trigram index makes the substring match fast
+        queryset = queryset.filter(search__document__contains=term)
+    return queryset.annotate(
+        rank=SearchRank(F("search__vector"), prefix_query(terms))
+        + TrigramSimilarity("search__document", " ".join(terms))
+    ).order_by("-rank", "pk")
+
+
+def autocomplete_members(queryset, q):
+    """
+    Members with words starting with every term of q, for the autocomplete
+    """
+    if backend() != "postgres":
+        return queryset.filter(name__icontains=q).order_by("name")
+    terms = search_terms(q)
+    if not terms:
+        return queryset.none()
+    query = prefix_query(terms)
+    return (
+        queryset.filter(search__vector=query)
+        .annotate(rank=SearchRank(F("search__vector"), query))
+        .order_by("-rank", "pk")
+    )
+
+
+def queue_refresh(user_pks):
+    """
+    Refresh the search rows of the users after the transaction commits,
+    all users saved in the transaction are refreshed by one task
+    """
+    pending = getattr(_pending, "user_pks", None)
+    if pending is None:
+        pending = _pending.user_pks = set()
+    pending.update(user_pks)
+    transaction.on_commit(flush_refresh)
+
+
+def flush_refresh():
+    user_pks = getattr(_pending, "user_pks", None)
+    _pending.user_pks = None
+    if user_pks:
+        start_refresh(sorted(user_pks))
+
+
+def start_refresh(user_pks):
+    from .tasks import refresh_member_search
+
+    try:
+        refresh_member_search.delay(user_pks)
+    except Exception:
+        logger.exception("Could not start member search refresh, refreshing now")
+        from .models import MemberSearch
+
+        MemberSearch.refresh(user_pks)
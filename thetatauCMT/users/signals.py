@@ -0,0 +1,62 @@
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_save, pre_save
+from django.dispatch import receiver
+from chapters.models import Chapter, ChapterCurricula
+from .models import User
+from .search import backend, queue_refresh
+
+# Names copied into MemberSearch.document from other models
+SEARCH_NAMES = {Chapter: ("name", "members"), ChapterCurricula: ("major", "user")}
+
+
+@receiver(post_save, sender=User)
+def refresh_member_search(sender, instance, raw=False, **kwargs):
+    if raw or backend() != "postgres":
+        return
+    queue_refresh([instance.pk])
+
+
+@receiver(pre_save, sender=Chapter)
+@receiver(pre_save, sender=ChapterCurricula)
+def remember_search_name(sender, instance, raw=False, **kwargs):
+    if raw or backend() != "postgres" or instance.pk is None:
+        return
+    field, _ = SEARCH_NAMES[sender]
+    instance._search_name = (
+        sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Chapter)
+@receiver(post_save, sender=ChapterCurricula)
+def refresh_renamed_member_search(sender, instance, raw=False, **kwargs):
+    """
+    Members of a renamed chapter or major, only when the name changed
+    """
+    if raw or "_search_name" not in instance.__dict__:
+        return
+    search_name = instance.__dict__.pop("_search_name")
+    field, members = SEARCH_NAMES[sender]
+    if search_name != getattr(instance, field):
+        queue_refresh(getattr(instance, members).values_list("pk", flat=True))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def clear_group_access(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Group changes from either side, eg. user.groups or group.user_set,
+    the officer_groups command and the Group admin
+    """
+    if action == "pre_clear" and reverse:
+        instance._cleared_user_pks = list(
+            instance.user_set.values_list("pk", flat=True)
+        )
+        return
+    if action not in {"post_add", "post_remove", "post_clear"}:
+        return
+    if not reverse:
+        instance.clear_access()
+        return
+    if action == "post_clear":
+        pk_set = instance.__dict__.pop("_cleared_user_pks", [])
+    cache.delete_many([User.access_key(pk) for pk in pk_set])
@@ -12,3 +12,35 @@ def monthly_chapter_officer_email():
         return "success"
     except Exception as e:
         print(e)
+
+
+@shared_task(name="send_notification_outbox")
+def send_notification_outbox():
+    """
+    Send the pending notifications queued by core.outbox
+    Started after each request that queues notifications and periodically by beat
+    """
+    from core.outbox import send_outbox
+
+    return send_outbox()
+
+
+@shared_task(name="export_chapter_actives")
+def export_chapter_actives(export_pk):
+    """
+    Write the zip of a MemberExport started by the Export Chapter Actives action
+    """
+    from .models import MemberExport
+
+    MemberExport.objects.get(pk=export_pk).run()
+    return "success"
+
+
+@shared_task(name="refresh_member_search")
+def refresh_member_search(user_pks):
+    """
+    Refresh the MemberSearch rows of the users saved in a transaction
+    """
+    from .models import MemberSearch
+
+    return MemberSearch.refresh(user_pks)
@@ -10,9 +10,7 @@ def user_alter_form(context):
     if request:
         user = context["request"].user
         if not user.is_anonymous and user.is_national_officer_group:
-            new_role = None
-            if user.altered.all():
-                new_role = user.altered.first().role
+            new_role = user.access["altered_role"]
             return UserAlterForm(
                 data={
                     "chapter": user.current_chapter.slug,
@@ -1,3 +1,14 @@
+import datetime
+import zipfile
+import pytest
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from chapters.models import Chapter
+from chapters.tests.factories import ChapterFactory
+from users.models import MemberExport, User, UserRoleChange
+
+
 def test_get_absolute_url(tp):
     expected_url = "/users/testuser/"
     user = tp.make_user()
@@ -8,3 +19,124 @@ def test_get_absolute_url(tp):
 def test__str__(tp):
     user = tp.make_user()
     assert "testuser" == user.__str__()
+
+
+@pytest.mark.django_db
+def test_sync_current_status_roles(user_factory):
+    officer = user_factory.create(status="active", make_officer="chapter")
+    member = user_factory.create(status="active")
+    roles = officer.current_roles
+    User.objects.filter(pk=officer.pk).update(current_roles=[], current_status="")
+    User.objects.filter(pk=member.pk).update(officer=True)
+    member.groups.add(Group.objects.get_or_create(name="officer")[0])
+    updated = User.sync_current_status_roles()
+    assert set(updated) == {officer.pk}
+    officer.refresh_from_db()
+    assert set(officer.current_roles) == set(roles)
+    assert officer.current_status == "active"
+    assert officer.officer
+    assert officer.groups.filter(name="officer").exists()
+    User.sync_officer_groups([member.pk])
+    member.refresh_from_db()
+    assert not member.officer
+    assert not member.groups.filter(name="officer").exists()
+
+
+@pytest.mark.django_db
+def test_save_roles_matches_save(chapter, user_factory):
+    today = datetime.date.today()
+    regent, scribe = user_factory.create_batch(2, chapter=chapter, status="active")
+    roles = [
+        UserRoleChange(
+            user=regent,
+            role="regent",
+            start=today - datetime.timedelta(days=10),
+            end=today + datetime.timedelta(days=300),
+        ),
+        UserRoleChange(
+            user=scribe,
+            role="scribe",
+            start=today - datetime.timedelta(days=10),
+            end=today + datetime.timedelta(days=300),
+        ),
+    ]
+    UserRoleChange.save_roles(roles)
+    for user, role in [(regent, "regent"), (scribe, "scribe")]:
+        user.refresh_from_db()
+        assert user.current_roles == [role]
+        assert user.officer
+        assert user.groups.filter(name="officer").exists()
+    roles[1].end = today - datetime.timedelta(days=2)
+    roles[1].save()
+    scribe.refresh_from_db()
+    assert scribe.current_roles == []
+    assert not scribe.officer
+    assert not scribe.groups.filter(name="officer").exists()
+
+
+@pytest.mark.django_db
+def test_roster_one_query(region, chapter_factory, user_factory):
+    chapters = [
+        chapter_factory(name=name, region=region) for name in ["alpha", "beta"]
+    ]
+    officers = set()
+    for chapter in chapters:
+        officers |= set(
+            user_factory.create_batch(
+                2, chapter=chapter, status="active", make_officer="chapter"
+            )
+        )
+        user_factory(chapter=chapter, status="active")
+    with CaptureQueriesContext(connection) as queries:
+        roster = list(User.objects.roster(Chapter.objects.filter(region=region)))
+        [(user.chapter.region.name, user.major) for user in roster]
+    assert len(queries) == 1
+    assert set(roster) == officers
+
+
+@pytest.mark.django_db
+def test_member_export(settings, tmp_path, user_factory):
+    settings.DEFAULT_FILE_STORAGE = "django.core.files.storage.FileSystemStorage"
+    settings.MEDIA_ROOT = str(tmp_path)
+    full = ChapterFactory(name="Export Full")
+    empty = ChapterFactory(name="Export Empty")
+    inactive = ChapterFactory(name="Export Inactive", active=False)
+    for chapter, current_status in [
+        (full, "active"),
+        (full, "away"),
+        (full, "alumni"),
+        (empty, "alumni"),
+        (inactive, "active"),
+    ]:
+        user = user_factory(chapter=chapter)
+        User.objects.filter(pk=user.pk).update(current_status=current_status)
+    export = MemberExport.objects.create()
+    export.run()
+    export.refresh_from_db()
+    assert export.status == "complete"
+    assert (
+        export.progress == export.total == Chapter.objects.exclude(active=False).count()
+    )
+    with zipfile.ZipFile(export.file.open()) as zf:
+        files = {name.split("_")[0]: name for name in zf.namelist()}
+        assert len(files) == export.total
+        assert "Export Inactive" not in files
+        full_rows = zf.read(files["Export Full"]).decode().splitlines()
+        empty_rows = zf.read(files["Export Empty"]).decode().splitlines()
+    assert len(full_rows) == 3
+    assert len(empty_rows) == 1
+
+
+@pytest.mark.django_db
+def test_member_export_without_broker(monkeypatch):
+    from users.tasks import export_chapter_actives
+
+    def delay(*args):
+        raise ConnectionError("broker unavailable")
+
+    ran = []
+    monkeypatch.setattr(export_chapter_actives, "delay", delay)
+    monkeypatch.setattr(MemberExport, "run", lambda self: ran.append(self.pk))
+    export = MemberExport.objects.create()
+    export.start()
+    assert ran == [export.pk]
@@ -0,0 +1,61 @@
+import pytest
+from django.test import TestCase
+from django.test.utils import override_settings
+from users.models import MemberSearch, User
+from users.search import autocomplete_members, search_members, start_refresh
+
+
+@pytest.mark.django_db
+@override_settings(MEMBER_SEARCH_BACKEND="postgres")
+def test_member_search(chapter, user_factory):
+    zanthe = user_factory(chapter=chapter, name="Quorra Zanthe", last_name="Zanthe")
+    zanthewood = user_factory(
+        chapter=chapter, name="Quill Zanthewood", last_name="Zanthewood"
+    )
+    vantry = user_factory(chapter=chapter, name="Pell Vantry", last_name="Vantry")
+    assert MemberSearch.rebuild() == User.objects.count()
+    assert set(search_members(User.objects.all(), "zanthe")) == {zanthe, zanthewood}
+    assert list(search_members(User.objects.all(), "ZANTHE quorra")) == [zanthe]
+    assert list(search_members(User.objects.all(), vantry.email)) == [vantry]
+    assert set(autocomplete_members(User.objects.all(), "zan")) == {zanthe, zanthewood}
+    assert not autocomplete_members(User.objects.all(), "anthe").exists()
+    chapter_members = User.objects.filter(chapter=chapter)
+    assert search_members(chapter_members, chapter.name).count() == 3
+    vantry.last_name = "Zanthe"
+    vantry.name = "Pell Zanthe"
+    vantry.save()
+    MemberSearch.refresh([vantry.pk])
+    assert set(search_members(User.objects.all(), "zanthe")) == {
+        zanthe,
+        zanthewood,
+        vantry,
+    }
+
+
+@pytest.mark.django_db
+@override_settings(MEMBER_SEARCH_BACKEND="postgres")
+def test_start_refresh_without_broker(monkeypatch, chapter, user_factory):
+    from users.tasks import refresh_member_search
+
+    def delay(*args):
+        raise ConnectionError("broker unavailable")
+
+    monkeypatch.setattr(refresh_member_search, "delay", delay)
+    user = user_factory(chapter=chapter, name="Pell Vantry", last_name="Vantry")
+    MemberSearch.objects.filter(user=user).delete()
+    start_refresh([user.pk])
+    assert list(search_members(User.objects.all(), "vantry")) == [user]
+
+
+@pytest.mark.django_db
+@override_settings(MEMBER_SEARCH_BACKEND="postgres")
+def test_member_search_chapter_renamed(chapter, user_factory):
+    members = user_factory.create_batch(2, chapter=chapter)
+    MemberSearch.rebuild()
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        chapter.name = "Quillon Renamed"
+        chapter.save()
+    assert set(search_members(User.objects.all(), "quillon")) == set(members)
+    with TestCase.captureOnCommitCallbacks(execute=True) as callbacks:
+        chapter.save()
+    assert not callbacks
@@ -0,0 +1,62 @@
+import pytest
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from chapters.tests.factories import ChapterFactory
+from users.models import User, UserAlter
+
+
+def group_queries(queries):
+    return [
+        query
+        for query in queries
+        if "auth_user_groups" in query["sql"] or "users_useralter" in query["sql"]
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("make_officer", ["chapter", "national"])
+def test_group_lookup_once_per_request(auto_login_user, make_officer):
+    client, user = auto_login_user(make_officer=make_officer)
+    User.clear_access_cache(user.pk)
+    for url in [
+        reverse("home"),
+        reverse("chapters:detail", kwargs={"slug": user.chapter.slug}),
+        reverse("users:list"),
+    ]:
+        User.clear_access_cache(user.pk)
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url)
+        assert 1 <= len(group_queries(queries)) <= 2, url
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url)
+        assert not group_queries(queries), url
+
+
+@pytest.mark.django_db
+def test_user_alter_clears_access(user_factory):
+    user = user_factory.create(make_officer="national")
+    assert user.is_national_officer_group
+    assert user.current_chapter == user.chapter
+    chapter = ChapterFactory()
+    UserAlter.objects.create(user=user, chapter=chapter, role="regent")
+    assert user.current_chapter == chapter
+    assert "regent" in user.chapter_officer()
+    user = User.objects.get(pk=user.pk)
+    assert user.current_chapter == chapter
+
+
+@pytest.mark.django_db
+def test_group_changes_clear_access(user_factory):
+    user = user_factory.create()
+    group, _ = Group.objects.get_or_create(name="natoff")
+    assert "natoff" not in User.objects.get(pk=user.pk).access["groups"]
+    group.user_set.add(user)
+    assert "natoff" in User.objects.get(pk=user.pk).access["groups"]
+    group.user_set.clear()
+    assert "natoff" not in User.objects.get(pk=user.pk).access["groups"]
+    user.groups.add(group)
+    assert "natoff" in User.objects.get(pk=user.pk).access["groups"]
+    user.groups.remove(group)
+    assert "natoff" not in user.access["groups"]
@@ -1,27 +1,25 @@
-import csv
 import datetime
-import zipfile
-from io import BytesIO, StringIO
 from django import forms
 from django.contrib.auth.forms import PasswordResetForm
 from django.contrib.auth.tokens import default_token_generator
 from django.contrib.sites.shortcuts import get_current_site
 from django.http.request import QueryDict
 from django.http.response import HttpResponseRedirect
-from django.http import HttpResponse
+from django.db import transaction
 from django.urls import reverse
 from django.forms.models import modelformset_factory
 from django.shortcuts import render, redirect
 from django.utils.http import is_safe_url, urlsafe_base64_encode
 from django.utils.encoding import force_bytes
+from django.utils.safestring import mark_safe
 from django.contrib import messages
 from django.views.generic import RedirectView, FormView, DetailView, UpdateView
 from crispy_forms.layout import Submit
 from allauth.account.views import LoginView
 from extra_views import FormSetView, ModelFormSetView
 import viewflow
-from watson import search as watson
-from core.address import isinradius
+from core.address import users_in_radius
+from core.export import export_format, export_response, table_values
 from core.views import (
     PagedFilteredTableView,
     RequestConfig,
@@ -32,6 +30,7 @@
 )
 from core.forms import MultiFormsView
 from core.models import BIENNIUM_YEARS, annotate_rmp_status
+from core.outbox import queue_notifications
 from dal import autocomplete
 from .models import (
     User,
@@ -41,6 +40,7 @@
     UserOrgParticipate,
     UserDemographic,
     MemberUpdate,
+    MemberExport,
 )
 from .tables import UserTable
 from .filters import UserListFilter, UserListFilterBase
@@ -58,6 +58,7 @@
     UserUpdateForm,
 )
 from .notifications import MemberInfoUpdate
+from .search import autocomplete_members, search_members
 from forms.forms import PledgeDemographicsForm
 from chapters.models import Chapter
 from submissions.tables import SubmissionTable
@@ -261,33 +262,26 @@ class UserSearchView(
     template_name = "users/user_search.html"
 
     def get(self, request, *args, **kwargs):
-        response = super().get(request, *args, **kwargs)
-        if request.GET.get("csv", "False").lower() == "download csv":
-            response = HttpResponse(content_type="text/csv")
-            context = self.get_context_data()
-            time_name = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"ThetaTauSearchExport_{time_name}.csv"
-            response["Content-Disposition"] = f'attachment; filename="{filename}"'
-            writer = csv.writer(response)
-            for row in context["table"].as_values():
-                writer.writerow(row)
-        return response
+        export = export_format(request)
+        if export:
+            self.object_list = self.get_queryset().select_related(
+                "chapter__region", "major", "address__locality", "initiation"
+            )
+            table = self.get_table(**self.get_table_kwargs())
+            return export_response(table_values(table), "ThetaTauSearchExport", export)
+        return super().get(request, *args, **kwargs)
 
     def get_queryset(self):
         queryset = User.objects.none()
         q = self.request.GET.get("q", "")
         zip = self.request.GET.get("zip", "")
         if q:
-            queryset = watson.filter(User, q)
+            queryset = search_members(User.objects.all(), q)
         if zip:
             distance = self.request.GET.get("dist", "1")
-            addressess = isinradius(zip, distance)
-            user_pks = [
-                user.pk for address in addressess for user in address.user_set.all()
-            ]
-            if not queryset:
-                queryset = User.objects
-            queryset = queryset.filter(pk__in=user_pks)
+            if not q:
+                queryset = User.objects.all()
+            queryset = users_in_radius(zip, distance, queryset)
         return queryset
 
     def get_table_kwargs(self):
@@ -301,38 +295,16 @@ def get_table_kwargs(self):
 
 class ExportActiveMixin:
     def export_chapter_actives(self, request, queryset):
-        time_name = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        zip_filename = f"ThetaTauActiveExport_{time_name}.zip"
-        zip_io = BytesIO()
-        qs = self.model._default_manager.filter(
-            current_status__in=[
-                "active",
-                "activepend",
-                "alumnipend",
-                "away",
-                "activeCC",
-            ],
+        export = MemberExport.objects.create(created_by=request.user)
+        transaction.on_commit(export.start)
+        link = reverse("admin:users_memberexport_change", args=[export.pk])
+        self.message_user(
+            request,
+            mark_safe(
+                f'Export started, <a href="{link}">follow its progress here</a>.'
+                " You will be emailed a link when it is complete."
+            ),
         )
-        with zipfile.ZipFile(zip_io, "w") as zf:
-            active_chapters = Chapter.objects.exclude(active=False)
-            total = active_chapters.count()
-            for count, chapter in enumerate(active_chapters):
-                print(f"Export {chapter} {count+1}/{total}")
-                members = qs.filter(chapter=chapter)
-                table = UserTable(data=members, chapter=True)
-                writer_file = StringIO()
-                writer = csv.writer(writer_file)
-                writer.writerows(table.as_values())
-                zf.writestr(
-                    f"{chapter}_{chapter.school}_activeexport_{time_name}.csv",
-                    writer_file.getvalue(),
-                )
-        response = HttpResponse(
-            zip_io.getvalue(), content_type="application/x-zip-compressed"
-        )
-        response["Cache-Control"] = "no-cache"
-        response["Content-Disposition"] = f"attachment; filename={zip_filename}"
-        return response
 
     export_chapter_actives.short_description = "Export Chapter Actives"
 
@@ -350,27 +322,24 @@ class UserListView(LoginRequiredMixin, PagedFilteredTableView):
     template_name = "users/user_list.html"
 
     def get(self, request, *args, **kwargs):
-        csv_action = request.GET.get("csv", "False").lower() == "download csv"
+        export = export_format(request)
         email_action = request.GET.get("email", "False").lower() == "email all"
-        if (csv_action or email_action) and not request.user.is_officer:
+        if (export or email_action) and not request.user.is_officer:
             messages.add_message(
                 self.request,
                 messages.ERROR,
                 "Only chapter officers can email members through this method.",
             )
             return super().get(request, *args, **kwargs)
-        if csv_action:
+        if export:
             self.object_list = self.get_queryset()
-            context = self.get_context_data()
-            response = HttpResponse(content_type="text/csv")
-            time_name = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"ThetaTauMemberExport_{time_name}.csv"
-            response["Content-Disposition"] = f'attachment; filename="{filename}"'
-            writer = csv.writer(response)
-            if self.object_list:
-                table = context["table"]
-                writer.writerows(table.as_values())
-                return response
+            if self.object_list.exists():
+                table = self.get_member_table(
+                    self.object_list.select_related("chapter", "major")
+                )
+                return export_response(
+                    table_values(table), "ThetaTauMemberExport", export
+                )
             else:
                 messages.add_message(
                     self.request,
@@ -378,12 +347,14 @@ def get(self, request, *args, **kwargs):
                     "All members are filtered! Clear or change filter.",
                 )
         elif email_action:
-            self.object_list = self.get_queryset()
+            self.object_list = self.get_queryset().prefetch_related("emailaddress_set")
             total = len(self.object_list)
             if self.object_list:
-                for user in self.object_list:
-                    if user.email:
-                        MemberInfoUpdate(user, request.user).send()
+                queue_notifications(
+                    MemberInfoUpdate(user, request.user)
+                    for user in self.object_list
+                    if user.email
+                )
                 messages.add_message(
                     self.request,
                     messages.INFO,
@@ -450,16 +421,19 @@ def get_queryset(self, **kwargs):
         self.filter.form.helper = self.formhelper_class(rmp_complete=True)
         return self.filter.qs
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
+    def get_member_table(self, data):
         natoff = False
         if self.request.user.is_national_officer():
             natoff = True
         admin = self.request.user.is_superuser
-        table = UserTable(data=self.object_list, natoff=natoff, admin=admin, rmp=True)
+        table = UserTable(data=data, natoff=natoff, admin=admin, rmp=True)
         table.exclude = ("current_roles",)
         RequestConfig(self.request, paginate={"per_page": 30}).configure(table)
-        context["table"] = table
+        return table
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["table"] = self.get_member_table(self.object_list)
         return context
 
 
@@ -576,7 +550,7 @@ def form_valid(self, form):
         else:
             users_chapter = User.objects.all()
             chapter_name = "Unknown"
-        users = watson.filter(users_chapter, search)
+        users = search_members(users_chapter, search)
         total = users.count()
         if total > 5:
             messages.add_message(
@@ -849,7 +823,7 @@ def get_queryset(self):
             else:
                 qs = qs.filter(chapter=chapter)
         if self.q:
-            qs = qs.filter(name__icontains=self.q)
+            return autocomplete_members(qs, self.q)
         return qs.order_by("name")
 
 
@@ -888,6 +862,7 @@ def form_valid(self, form):
             instance.save()
         else:
             form.save()
+        user.clear_access()
         return super().form_valid(form)
 
 
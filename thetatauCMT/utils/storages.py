@@ -1,3 +1,7 @@
+import datetime
+from django.core.files.storage import get_storage_class
+from django.core.signals import setting_changed
+from django.utils.functional import LazyObject, empty
 from storages.backends.gcloud import GoogleCloudStorage
 
 
@@ -9,3 +13,42 @@ class StaticRootGoogleCloudStorage(GoogleCloudStorage):
 class MediaRootGoogleCloudStorage(GoogleCloudStorage):
     location = "media"
     file_overwrite = False
+
+
+class PrivateGoogleCloudStorage(GoogleCloudStorage):
+    """
+    Files with member data, only readable through a signed url that expires
+    """
+
+    location = "private"
+    default_acl = "private"
+    querystring_auth = True
+    expiration = datetime.timedelta(days=7)
+    file_overwrite = False
+
+
+class PrivateStorage(LazyObject):
+    """
+    The private storage when the media is on GCS, otherwise the default storage
+    """
+
+    def _setup(self):
+        storage_class = get_storage_class()
+        if issubclass(storage_class, GoogleCloudStorage):
+            storage_class = PrivateGoogleCloudStorage
+        self._wrapped = storage_class()
+
+
+private_storage = PrivateStorage()
+
+
+def get_private_storage():
+    return private_storage
+
+
+def reset_private_storage(*, setting, **kwargs):
+    if setting in {"DEFAULT_FILE_STORAGE", "MEDIA_ROOT", "MEDIA_URL"}:
+        private_storage._wrapped = empty
+
+
+setting_changed.connect(reset_private_storage)